@@ -3,19 +3,22 @@ from flask_cors import CORS
 from routes.api_routes import api
 from routes.preprocessing_routes import preprocessing
 from routes.model_routes import model_routes
-from models.dataset import Dataset
+from utils.context import open_workspace, release_request
+from utils.json_provider import json_provider_class
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:5173"}})
+app.json = json_provider_class()(app)  # orjson fast path when installed
+# Credentials let the frontend send the session cookie of its workspace
+CORS(app, resources={r"/api/*": {"origins": "http://localhost:5173"}}, supports_credentials=True)
 
-# Create a single dataset instance
-dataset = Dataset()
-
-# Register blueprints with the dataset instance
+# Blueprints resolve datasets from the shared registry in models.dataset_registry
 app.register_blueprint(api, url_prefix='/api')
-preprocessing.dataset = dataset  # Share dataset with preprocessing routes
 app.register_blueprint(preprocessing, url_prefix='/api/preprocess')
 app.register_blueprint(model_routes, url_prefix='/api/model')
+# The session's workspace and the datasets a request resolved stay in use until it has finished,
+# streamed responses included
+app.before_request(open_workspace)
+app.teardown_request(release_request)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(API_DIR)
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+COLD_START = '''
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {api_dir!r})
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.get('/api/shape')
+assert response.status_code == 200, response.data
+first_request = time.perf_counter()
+print(imported - start, first_request - imported)
+'''
+
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, '-c', COLD_START.format(api_dir=API_DIR)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    import_time, first_request = output.split()
+    return float(import_time), float(first_request)
+
+
+def slowest_imports(limit):
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, {API_DIR!r}); import app'],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines()[1:]:
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Each nesting level adds two spaces: keep app and what it imports directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start benchmark for the Flask app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_times = [run[0] for run in runs]
+    first_requests = [run[1] for run in runs]
+    print(f'import app       median {statistics.median(import_times) * 1000:8.1f} ms '
+          f'min {min(import_times) * 1000:8.1f} ms')
+    print(f'first /api/shape median {statistics.median(first_requests) * 1000:8.1f} ms '
+          f'min {min(first_requests) * 1000:8.1f} ms')
+
+    print('\nslowest imports (app and its direct imports):')
+    for cumulative_us, name in slowest_imports(args.top):
+        print(f'{cumulative_us / 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
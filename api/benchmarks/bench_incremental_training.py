@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.incremental import ChunkStream  # noqa: E402
+from models.loader import DatasetLoader  # noqa: E402
+from models.ml_models import MLModel  # noqa: E402
+from models.pipeline import PreprocessingPipeline  # noqa: E402
+
+FEATURES = [f'x{i}' for i in range(8)]
+
+
+def write_table(path, rows, seed=0):
+    # Written in slices so generating the file does not need the whole table in memory either
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(size=len(FEATURES))
+    step = 500_000
+    for start in range(0, rows, step):
+        X = rng.normal(size=(min(step, rows - start), len(FEATURES)))
+        frame = pd.DataFrame(X, columns=FEATURES)
+        frame['label'] = np.where(X @ weights > 0, 'yes', 'no')
+        frame.to_csv(path, mode='a', header=start == 0, index=False)
+
+
+def full_fit(path):
+    df = DatasetLoader().load(path)
+    ml_model = MLModel()
+    ml_model.get_model('sgd', 'classification', {'random_state': 0})
+    ml_model.model.fit(df[FEATURES].to_numpy(dtype=np.float64), df['label'].to_numpy())
+    return len(df)
+
+
+def streamed_fit(path, chunk_size):
+    stream = ChunkStream(DatasetLoader(), path, PreprocessingPipeline(), FEATURES, 'label', chunk_size)
+    ml_model = MLModel()
+    ml_model.get_model('sgd', 'classification', {'random_state': 0})
+    ml_model.train_incremental(stream, stream.classes())
+    return stream.rows_trained
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full in-memory fit vs out-of-core partial_fit')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--skip-full', action='store_true', help='only run the streamed fit')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'table.csv')
+    write_table(path, args.rows)
+    print(f'{args.rows:,} rows, {os.path.getsize(path) / 2 ** 20:.0f} MiB CSV, chunks of {args.chunk_size:,}')
+    print(f"{'mode':<12} {'rows':>12} {'time':>9} {'peak memory':>13}")
+    runs = [('streamed', streamed_fit, (path, args.chunk_size))]
+    if not args.skip_full:
+        runs.insert(0, ('full fit', full_fit, (path,)))
+    for label, function, function_args in runs:
+        rows, elapsed, peak = measure(function, *function_args)
+        print(f'{label:<12} {rows:>12,} {elapsed:8.2f}s {peak / 2 ** 20:11.1f}MiB')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
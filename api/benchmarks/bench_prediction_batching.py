@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ml_models import MLModel  # noqa: E402
+from models.prediction_batcher import PredictionBatcher  # noqa: E402
+
+
+def make_model(algorithm, features, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(5000, features))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    ml_model = MLModel()
+    ml_model.get_model(algorithm, 'classification', {'n_estimators': 50} if algorithm == 'random_forest' else {})
+    ml_model.model.fit(X, y)
+    return ml_model
+
+
+def run(label, predict, clients, requests_per_client, features):
+    rows = np.random.default_rng(1).normal(size=(clients, features))
+    latencies = []
+    lock = threading.Lock()
+
+    def client(i):
+        local = []
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            predict(rows[i:i + 1])
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    print(f'{label:<28} {len(latencies) / elapsed:10.0f} req/s'
+          f'  p50 {np.percentile(latencies, 50):7.2f}ms  p99 {np.percentile(latencies, 99):7.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-batched prediction benchmark')
+    parser.add_argument('--algorithm', default='random_forest')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--features', type=int, default=10)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    ml_model = make_model(args.algorithm, args.features)
+    print(f'{args.algorithm}: {args.clients} concurrent clients x {args.requests} single-row requests')
+
+    run('per-request predict', ml_model.predict, args.clients, args.requests, args.features)
+
+    batcher = PredictionBatcher(max_batch_size=1024, max_wait_ms=args.max_wait_ms)
+    run('micro-batched predict', lambda X: batcher.predict(ml_model, X), args.clients, args.requests, args.features)
+    stats = batcher.stats()
+    print(f"mean batch rows {stats['mean_batch_rows']:.1f} over {stats['batches']} batches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.serialization import prepare_records  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def legacy_convert(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, (np.int64, np.int32, np.int16, np.int8)):
+        return int(value)
+    if isinstance(value, (np.float64, np.float32, np.float16)):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+def legacy_prepare_records(df):
+    records = df.to_dict('records')
+    return [{k: legacy_convert(v) for k, v in record.items()} for record in records]
+
+
+def make_frame(rows, columns=20, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        kind = i % 5
+        if kind == 0:
+            data[f'int_{i}'] = rng.integers(0, 1000, rows)
+        elif kind == 1:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f'float_{i}'] = values
+        elif kind == 2:
+            data[f'bool_{i}'] = rng.random(rows) < 0.5
+        elif kind == 3:
+            values = rng.choice(np.array(['red', 'green', 'blue', None], dtype=object), rows)
+            data[f'str_{i}'] = values
+        else:
+            data[f'nullable_{i}'] = pd.array(
+                np.where(rng.random(rows) < 0.1, None, rng.integers(0, 100, rows)), dtype='Int64')
+    return pd.DataFrame(data)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f'{label:<32} {time.perf_counter() - start:8.3f}s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record serialization benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--columns', type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns)
+    print(f'frame: {args.rows} rows x {args.columns} columns')
+
+    legacy = timed('legacy _prepare_records', legacy_prepare_records, df)
+    records = timed('column-wise prepare_records', prepare_records, df)
+    assert legacy == records, 'serializers disagree'
+
+    timed('json.dumps', json.dumps, records)
+    if orjson is not None:
+        timed('orjson.dumps', orjson.dumps, records)
+
+
+if __name__ == '__main__':
+    main()
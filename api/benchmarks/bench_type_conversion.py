@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.type_conversion import convert_series  # noqa: E402
+
+
+def make_columns(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    missing = rng.random(rows) < 0.05
+    whole = rng.integers(0, 1000, rows).astype(np.float64)
+    whole[missing] = np.nan
+    days = np.datetime64('2000-01-01') + rng.integers(0, 9000, rows).astype('timedelta64[D]')
+    return {
+        'int strings -> int64': (pd.Series(rng.integers(0, 10 ** 6, rows)).astype(str), 'int64'),
+        'float strings -> float64': (pd.Series(rng.normal(size=rows).round(4)).astype(str), 'float64'),
+        'whole floats with NaN -> int64': (pd.Series(whole), 'int64'),
+        'bool strings -> bool': (pd.Series(np.where(rng.random(rows) < 0.5, 'true', 'false')), 'bool'),
+        'date strings -> datetime': (pd.Series(np.datetime_as_string(days)), 'datetime')
+    }
+
+
+def legacy_cast(series, dtype):
+    # Per-cell conversion the /update-type endpoint used before the shared engine
+    if dtype == 'int64':
+        return series.map(lambda x: int(float(x)) if pd.notnull(x) else None)
+    if dtype == 'float64':
+        return series.map(lambda x: float(x) if pd.notnull(x) else None)
+    if dtype == 'bool':
+        return series.map(lambda x: bool(x) if pd.notnull(x) else None)
+    return pd.to_datetime(series, errors='coerce')
+
+
+def legacy_strict(series, dtype):
+    # The integrality check of the old update_column_type
+    numbers = pd.to_numeric(series, errors='raise')
+    if dtype == 'int64' and numbers.dropna().apply(float.is_integer).all():
+        return numbers.astype('Int64')
+    return numbers
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Column type conversion benchmark')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the vectorized engine')
+    args = parser.parse_args()
+
+    print(f'{args.rows:,} rows per column')
+    print(f"{'column':<32} {'engine':>10} {'legacy map':>12} {'legacy strict':>14}  result")
+    for label, (series, dtype) in make_columns(args.rows).items():
+        engine_time, converted = timed(convert_series, series, dtype)
+        line = f'{label:<32} {engine_time:9.2f}s'
+        if args.skip_legacy:
+            line += f"{'':>13} {'':>14}"
+        else:
+            line += f' {timed(legacy_cast, series, dtype)[0]:11.2f}s'
+            if dtype in ('int64', 'float64') and series.dtype.kind == 'f':
+                line += f' {timed(legacy_strict, series, dtype)[0]:13.2f}s'
+            else:
+                line += f"{'-':>15}"
+        print(f'{line}  {converted.dtype}')
+
+
+if __name__ == '__main__':
+    main()
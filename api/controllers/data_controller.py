@@ -1,14 +1,30 @@
-from flask import jsonify
-from models.dataset import Dataset
+from flask import Response, current_app, jsonify, stream_with_context
+from models.dataset_registry import dataset_registry
+from utils.context import current_dataset, current_workspace, dataset_id_from_request
+from utils.transport import columnar_response
 
 class DataController:
-    def __init__(self):
-        self.dataset = Dataset()
+    def __init__(self, registry=dataset_registry):
+        self._registry = registry
+
+    @property
+    def registry(self):
+        # A session's workspace has its own registry
+        workspace = current_workspace()
+        return workspace.datasets if workspace is not None else self._registry
+
+    @property
+    def dataset(self):
+        # Resolved per request so every blueprint sees the same Dataset
+        return current_dataset()
         
     def initialize_data(self):
         try:
             self.dataset.load_data()
+            self.registry.refresh_usage(dataset_id_from_request())
             return jsonify({'message': 'Dataset loaded successfully'}), 200
+        except MemoryError as e:
+            return jsonify({'error': str(e)}), 413
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -33,13 +49,19 @@ class DataController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def get_description_data(self):
+    def get_description_data(self, approximate=False):
         try:
-            description = self.dataset.get_description()
+            description = self.dataset.get_description(approximate)
             return jsonify(description), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    def get_sample_data(self, n=100):
+        try:
+            return jsonify(self.dataset.get_sample(n)), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     def get_info_data(self):
         try:
             info = self.dataset.get_info()
@@ -54,20 +76,53 @@ class DataController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def update_column_type(self, column, dtype):
+    def update_column_type(self, columns, dtype):
         try:
-            result = self.dataset.update_column_type(column, dtype)
+            result = self.dataset.update_column_type(columns, dtype)
             return jsonify(result), 200 if result['success'] else 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
             
     def get_dataset(self):
         try:
+            # Queued lazy preprocessing steps are applied before the frame is served
+            self.dataset.execute_plan()
+            response = columnar_response(self.dataset.preprocessed_df)
+            if response is not None:
+                return response
             data = self.dataset.get_dataset()
             return jsonify(data), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
             
+    def get_dataset_page(self, limit, cursor=None):
+        try:
+            self.dataset.execute_plan()
+            data = self.dataset.get_dataset_page(limit, cursor)
+            return jsonify(data), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def stream_dataset(self, chunk_size=1000, cursor=None):
+        try:
+            self.dataset.execute_plan()
+            total_rows, chunks = self.dataset.iter_dataset_chunks(chunk_size, cursor)
+            dumps = current_app.json.dumps
+
+            def generate():
+                for records in chunks:
+                    yield ''.join(dumps(record) + '\n' for record in records)
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+                'X-Total-Rows': str(total_rows)
+            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     def get_column_types(self):
         try:
             types = self.dataset.get_column_types()
@@ -75,11 +130,54 @@ class DataController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
             
-    def get_visualization_data(self, x_column, y_column=None):
+    def get_visualization_data(self, x_column, y_column=None, resolution=None, mode='auto'):
         try:
+            if resolution is not None:
+                result = self.dataset.get_visualization_data(x_column, y_column, resolution, mode)
+                if result['success']:
+                    return jsonify(result['data']), 200
+                return jsonify({'error': result['error']}), 400
+
+            result = self.dataset.get_visualization_frame(x_column, y_column)
+            if not result['success']:
+                return jsonify({'error': result['error']}), 400
+            response = columnar_response(result['data'])
+            if response is not None:
+                return response
+
             result = self.dataset.get_visualization_data(x_column, y_column)
             if result['success']:
                 return jsonify(result['data']), 200
             return jsonify({'error': result['error']}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def list_datasets(self):
+        try:
+            return jsonify(self.registry.list_datasets()), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def create_dataset(self, dataset_id, filename=None):
+        try:
+            dataset = self.registry.create(dataset_id, filename)
+            return jsonify({
+                'message': f'Dataset {dataset_id} loaded successfully',
+                'dataset_id': dataset_id,
+                'memory_usage': dataset.memory_usage()
+            }), 200
+        except (ValueError, FileNotFoundError) as e:
+            return jsonify({'error': str(e)}), 400
+        except MemoryError as e:
+            return jsonify({'error': str(e)}), 413
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def remove_dataset(self, dataset_id):
+        try:
+            self.registry.remove(dataset_id)
+            return jsonify({'message': f'Dataset {dataset_id} removed'}), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
         except Exception as e:
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,68 +1,444 @@
-from flask import jsonify
+import os
+
+from flask import Response, current_app, jsonify, stream_with_context
 import numpy as np
 import pandas as pd
-from models.ml_models import MLModel
+from models.cross_validation import cross_validate
+from models.dataset_registry import DATA_DIR
+from models.hyperparameter_search import HyperparameterSearch
+from models.incremental import ChunkStream
+from models.ml_models import INCREMENTAL_ALGORITHMS, MLModel
+from models.model_registry import model_registry
+from models.prediction_batcher import prediction_batcher
+from models.split_store import split_store
+from models.training_jobs import run_streaming_job, training_jobs
+from utils.context import current_workspace
+from utils.lazy_import import import_object
 
 class ModelController:
-    def __init__(self):
+    def __init__(self, registry=model_registry, batcher=prediction_batcher):
+        self.registry = registry
+        self.batcher = batcher
+        # Requests without a model_id use the most recently initialized model
+        self.model_id = None
         self.ml_model = MLModel()
         
     def initialize_model(self, algorithm, model_type, params):
         try:
-            self.ml_model.get_model(algorithm, model_type, params)
+            ml_model = MLModel()
+            ml_model.get_model(algorithm, model_type, params)
+            model_id = self.registry.register(ml_model)
+            workspace = current_workspace()
+            if workspace is not None:
+                workspace.use_model(model_id)
+            else:
+                self.ml_model = ml_model
+                self.model_id = model_id
+                self.registry.set_current(model_id)
             return jsonify({
-                'message': f'Successfully initialized {algorithm} {model_type} model'
+                'message': f'Successfully initialized {algorithm} {model_type} model',
+                'model_id': model_id
             }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+
+    def _current(self):
+        # In shared mode another worker may have initialized a newer model since
+        model_id = self.registry.current()
+        if model_id is not None and model_id != self.model_id:
+            self.ml_model = self.registry.draft(model_id)
+            self.model_id = model_id
+        return self.model_id
+
+    def _draft(self, model_id=None):
+        if model_id is None:
+            # A session's requests without a model_id use the model its workspace initialized last
+            workspace = current_workspace()
+            if workspace is not None:
+                if workspace.model_id is None:
+                    return None, MLModel()
+                return workspace.model_id, self.registry.draft(workspace.model_id)
+            self._current()
+            return self.model_id, self.ml_model
+        return model_id, self.registry.draft(model_id)
+
+    def _resolve(self, model_id=None, version=None):
+        if model_id is None:
+            workspace = current_workspace()
+            if workspace is not None:
+                if workspace.model_id is None:
+                    return MLModel()
+                return self.registry.get(workspace.model_id)
+            if self.registry.shared and self._current() is not None:
+                # The draft here may be older than what another worker trained and saved
+                return self.registry.get(self.model_id)
+            return self.ml_model
+        return self.registry.get(model_id, version)
+
+    def _train(self, model_id, X_train_arr, y_train_arr, split_id=None, run_async=False, pipeline=None):
+        model_id, ml_model = self._draft(model_id)
+        if ml_model.model is None:
+            return jsonify({'error': 'Model not initialized. Call /init first.'}), 400
+
+        # Fit a fresh copy so versions already saved keep their own estimator
+        estimator = import_object('sklearn.base:clone')(ml_model.model)
+        metadata = {
+            'split_id': split_id,
+            'training_samples': X_train_arr.shape[0],
+            'features_shape': X_train_arr.shape[1]
+        }
+        if run_async:
+            return self._submit_training(model_id, ml_model, estimator, X_train_arr, y_train_arr, metadata, pipeline)
+
+        ml_model.model = estimator
+        ml_model.train(X_train_arr, y_train_arr)
+        ml_model.pipeline = pipeline
+        version = self.registry.save(model_id, ml_model, **metadata)
+        return jsonify({
+            'message': 'Model trained successfully',
+            'model_id': model_id,
+            'version': version,
+            **metadata
+        }), 200
     
-    def train_model(self, X_train, y_train):
+    def _submit_training(self, model_id, ml_model, estimator, X_train_arr, y_train_arr, metadata, pipeline=None):
+        def install(fitted):
+            ml_model.model = fitted
+            ml_model.pipeline = pipeline
+            self.registry.save(model_id, ml_model, **metadata)
+
+        job_id = training_jobs.submit(estimator, X_train_arr, y_train_arr, install, metadata={
+            'model_id': model_id,
+            'algorithm': ml_model.algorithm,
+            'model_type': ml_model.model_type,
+            **metadata
+        })
+        return jsonify({
+            'message': f'Training job {job_id} submitted',
+            'job_id': job_id,
+            'model_id': model_id
+        }), 202
+
+    def train_model(self, X_train, y_train, run_async=False, model_id=None):
         try:
             # Convert inputs to numpy arrays
             X_train_arr = np.array(X_train)
             y_train_arr = np.array(y_train)
-            
-            self.ml_model.train(X_train_arr, y_train_arr)
-            
+            return self._train(model_id, X_train_arr, y_train_arr, run_async=run_async)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def train_split(self, split_id, run_async=False, model_id=None):
+        try:
+            split = split_store.get(split_id)
+            return self._train(model_id, split['X_train'], split['y_train'], split_id, run_async, split['pipeline'])
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def train_stream(self, dataset, features, target=None, model_id=None, chunk_size=None, epochs=1,
+                     classes=None, holdout=0.0, run_async=False, source=None):
+        # Out-of-core training, the dataset file is streamed through the fitted preprocessing chunk by chunk.
+        # source streams another file of the data directory instead, so the steps can be fitted on a small
+        # dataset with the same columns and the large file never has to be loaded
+        try:
+            model_id, ml_model = self._draft(model_id)
+            if ml_model.model is None:
+                return jsonify({'error': 'Model not initialized. Call /init first.'}), 400
+            if ml_model.algorithm not in INCREMENTAL_ALGORITHMS:
+                return jsonify({
+                    'error': f"Algorithm '{ml_model.algorithm}' cannot be trained from a stream. "
+                             f"Use one of: {', '.join(INCREMENTAL_ALGORITHMS)}"
+                }), 400
+            if target is None and ml_model.model_type != 'clustering':
+                return jsonify({'error': 'target is required'}), 400
+
+            # Steps fitted on the loaded frame are replayed, a dataset never loaded streams its raw columns
+            pipeline = dataset.snapshot()[1] if dataset.loaded else dataset.pipeline.copy()
+            path = dataset.filename
+            if source is not None:
+                path = os.path.join(DATA_DIR, os.path.basename(source))
+                if not os.path.isfile(path):
+                    raise LookupError(f"File '{source}' not found")
+            stream = ChunkStream(dataset.loader, path, pipeline, features, target, chunk_size, holdout)
+
+            # Fit a fresh copy so versions already saved keep their own estimator
+            model = MLModel()
+            model.algorithm = ml_model.algorithm
+            model.model_type = ml_model.model_type
+            model.model = import_object('sklearn.base:clone')(ml_model.model)
+            metadata = {'features_shape': len(features), 'streamed': True, 'epochs': epochs}
+            trained = {'model_id': model_id}
+            job_metadata = {
+                'model_id': model_id,
+                'algorithm': ml_model.algorithm,
+                'model_type': ml_model.model_type,
+                **metadata
+            }
+
+            def install(result):
+                ml_model.model = result['estimator']
+                ml_model.pipeline = stream.compiled
+                metadata.update({
+                    'training_samples': result['rows_trained'],
+                    'chunks': result['chunks'],
+                    'skipped_rows': result['rows_skipped']
+                })
+                version = self.registry.save(model_id, ml_model, **metadata)
+                trained.update(metadata, version=version)
+                trained.update({key: result[key] for key in ('holdout_samples', 'metrics') if key in result})
+                # Shows up in /jobs/<id> once an async job finishes
+                job_metadata.update(trained)
+
+            if run_async:
+                # Like train_split, the epochs run in the training pool and /jobs/<id> reports the outcome
+                job_id = training_jobs.submit_stream(model, stream, classes, epochs, install, metadata=job_metadata)
+                return jsonify({
+                    'message': f'Training job {job_id} submitted',
+                    'job_id': job_id,
+                    'model_id': model_id
+                }), 202
+
+            install(run_streaming_job(model, stream, classes, epochs, {}))
+            return jsonify({'message': 'Model trained successfully', **trained}), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except (ValueError, KeyError) as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def search(self, split_id, model_type, space, refit=True, **options):
+        try:
+            split = split_store.get(split_id)
+            search = HyperparameterSearch(model_type, space, **options)
+            dumps = current_app.json.dumps
+
+            def generate():
+                try:
+                    for event in search.run(split['X_train'], split['y_train']):
+                        best = event.get('best') if event['event'] == 'summary' else None
+                        if refit and best is not None:
+                            # Register the winner so it can be evaluated and served like any trained model
+                            ml_model = MLModel()
+                            ml_model.get_model(best['algorithm'], model_type, best['params'])
+                            ml_model.train(split['X_train'], split['y_train'])
+                            ml_model.pipeline = split['pipeline']
+                            model_id = self.registry.register(ml_model)
+                            event['model_id'] = model_id
+                            event['version'] = self.registry.save(
+                                model_id, ml_model, split_id=split_id,
+                                training_samples=split['X_train'].shape[0],
+                                search_score=best['mean_score']
+                            )
+                        yield dumps(event) + '\n'
+                except Exception as e:
+                    # The response has already started, so the failure is reported as the last event
+                    yield dumps({'event': 'error', 'error': str(e)}) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+                'X-Total-Trials': str(len(search.candidates))
+            })
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def evaluate_split(self, split_id, model_id=None, version=None):
+        try:
+            ml_model = self._resolve(model_id, version)
+            split = split_store.get(split_id)
+            X_test_arr = split['X_test']
+            y_test_arr = split['y_test']
+
+            predictions = ml_model.predict(X_test_arr)
+            metrics = ml_model.evaluate(X_test_arr, y_test_arr)
+
+            metrics['predictions'] = predictions
+            metrics['actual'] = y_test_arr.tolist()
+
+            return jsonify({'metrics': metrics}), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def cross_validate_split(self, split_id, cv=5, model_id=None, version=None, n_jobs=-1):
+        try:
+            ml_model = self._resolve(model_id, version)
+            if ml_model.model is None:
+                return jsonify({'error': 'Model not initialized. Call /init first.'}), 400
+            split = split_store.get(split_id)
+
+            fold_models, folds, summary = cross_validate(
+                ml_model.model, ml_model.model_type, split['X_train'], split['y_train'], cv, n_jobs
+            )
+            # Kept on the model so /predict with ensemble=true reuses them without refitting
+            ml_model.fold_models = fold_models
+
             return jsonify({
-                'message': 'Model trained successfully',
-                'training_samples': len(X_train),
-                'features_shape': X_train_arr.shape[1]
+                'metrics': {'folds': folds, **summary},
+                'cv': cv,
+                'split_id': split_id
             }), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
-    
-    def evaluate_model(self, X_test, y_test):
+
+    def predict_split(self, split_id, subset='test', model_id=None, version=None, ensemble=False):
         try:
+            ml_model = self._resolve(model_id, version)
+            split = split_store.get(split_id)
+            if subset not in ('train', 'test'):
+                return jsonify({'error': "subset must be 'train' or 'test'"}), 400
+
+            X = split[f'X_{subset}']
+            predictions = ml_model.predict_ensemble(X) if ensemble else ml_model.predict(X)
+            return jsonify({
+                'predictions': predictions,
+                'samples_predicted': len(predictions)
+            }), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def evaluate_model(self, X_test, y_test, model_id=None, version=None):
+        try:
+            ml_model = self._resolve(model_id, version)
             # Convert inputs to numpy arrays
             X_test_arr = np.array(X_test)
             y_test_arr = np.array(y_test)
             
             # Get predictions for visualization
-            predictions = self.ml_model.predict(X_test_arr)
+            predictions = ml_model.predict(X_test_arr)
             
             # Calculate metrics
-            metrics = self.ml_model.evaluate(X_test_arr, y_test_arr)
+            metrics = ml_model.evaluate(X_test_arr, y_test_arr)
             
             # Add predictions and actual values to metrics
             metrics['predictions'] = predictions
             metrics['actual'] = y_test_arr.tolist()
             
             return jsonify({'metrics': metrics}), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def make_prediction(self, features):
+    def make_prediction(self, features, model_id=None, version=None, ensemble=False):
         try:
+            ml_model = self._resolve(model_id, version)
             # Convert input features to numpy array
-            features_arr = np.array(features)
-            if len(features_arr.shape) == 1:
-                features_arr = features_arr.reshape(1, -1)
-                
-            predictions = self.ml_model.predict(features_arr)
+            features_arr = features if isinstance(features, np.ndarray) else np.array(features)
+
+            # Concurrent requests for the same model are coalesced into one predict call
+            predictions = self.batcher.predict(ml_model, features_arr, ensemble)
             return jsonify({
                 'predictions': predictions,
                 'samples_predicted': len(predictions)
             }), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def predict_raw(self, rows, model_id=None, version=None, ensemble=False):
+        try:
+            ml_model = self._resolve(model_id, version)
+            # Raw records or columns go through the preprocessing the model was trained with
+            features_arr = ml_model.transform_raw(pd.DataFrame(rows))
+            predictions = self.batcher.predict(ml_model, features_arr, ensemble)
+            return jsonify({
+                'predictions': predictions,
+                'samples_predicted': len(predictions)
+            }), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_prediction_stats(self):
+        try:
+            return jsonify(self.batcher.stats()), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def configure_batching(self, max_batch_size=None, max_wait_ms=None):
+        try:
+            self.batcher.configure(max_batch_size, max_wait_ms)
+            return jsonify({
+                'max_batch_size': self.batcher.max_batch_size,
+                'max_wait_ms': self.batcher.max_wait_ms
+            }), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'error': str(e)}), 500
+
+    def get_job_status(self, job_id):
+        try:
+            return jsonify(training_jobs.status(job_id)), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def list_jobs(self):
+        try:
+            return jsonify({'jobs': training_jobs.list_jobs()}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def cancel_job(self, job_id):
+        try:
+            if training_jobs.cancel(job_id):
+                return jsonify({'message': f'Cancellation requested for job {job_id}'}), 200
+            return jsonify({'error': f'Job {job_id} has already finished'}), 409
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def list_models(self):
+        try:
+            return jsonify({'models': self.registry.list_models()}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_model(self, model_id):
+        try:
+            return jsonify(self.registry.describe(model_id)), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def delete_model(self, model_id):
+        try:
+            self.registry.delete(model_id)
+            workspace = current_workspace()
+            if workspace is not None:
+                workspace.forget_model(model_id)
+            if model_id == self.model_id:
+                self.model_id = None
+                self.ml_model = MLModel()
+            return jsonify({'message': f'Model {model_id} deleted'}), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
@@ -1,19 +1,38 @@
 from flask import jsonify, request
 import pandas as pd
 import numpy as np
+from models.downsampling import reduce_columns
+from models.lazy_plan import make_op
 from models.preprocessing import DataPreprocessor
+from utils.serialization import column_to_list, prepare_records
+from utils.transport import columnar_response
 
 class PreprocessingController:
     def __init__(self, dataset):
         self.dataset = dataset
-        self.preprocessor = DataPreprocessor(dataset.preprocessed_df)
+        # Reads in this request see one published version, writes go through _write
+        self.preprocessor = DataPreprocessor(*dataset.snapshot())
+
+    def _write(self, label, operation, columns=None):
+        # operation runs on a private working copy that is published only when it reports no error
+        with self.dataset.writer() as preprocessor:
+            result = operation(preprocessor)
+            if 'error' not in result:
+                created = result.pop('columns', [])
+                if created:
+                    result['new_columns'] = len(created)
+                result['version'] = self.dataset.commit_preprocessed(
+                    preprocessor.df, label, None if columns is None else [*columns, *created],
+                    preprocessor.pipeline.steps
+                )
+            return result
     
     def get_head_data(self, n=5):
         try:
             head_data = self.preprocessor.df.head(n)
             return jsonify({
                 'columns': list(head_data.columns),
-                'data': head_data.to_dict('records')
+                'data': prepare_records(head_data)
             }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -23,7 +42,7 @@ class PreprocessingController:
             tail_data = self.preprocessor.df.tail(n)
             return jsonify({
                 'columns': list(tail_data.columns),
-                'data': tail_data.to_dict('records')
+                'data': prepare_records(tail_data)
             }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -40,14 +59,14 @@ class PreprocessingController:
 
     def get_missing_values(self):
         try:
-            missing_data = self.preprocessor.df.isna().sum()
+            profiles = self.dataset.get_profiles(preprocessed=True)
             return jsonify({
                 'data': [
                     {
                         'column': str(col),
-                        'missing_count': int(count)
+                        'missing_count': profile['missing']
                     }
-                    for col, count in missing_data.items()
+                    for col, profile in profiles.items()
                 ]
             }), 200
         except Exception as e:
@@ -67,37 +86,179 @@ class PreprocessingController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
         
-    def update_column_type(self, column, dtype):
+    def _enqueue(self, op, **params):
         try:
-            df = self.preprocessor.df
-            if dtype == 'int64':
-                df[column] = df[column].map(lambda x: int(float(x)) if pd.notnull(x) else None)
-            elif dtype == 'float64':
-                df[column] = df[column].map(lambda x: float(x) if pd.notnull(x) else None)
-            elif dtype == 'str':
-                df[column] = df[column].map(lambda x: str(x) if pd.notnull(x) else None)
-            elif dtype == 'bool':
-                df[column] = df[column].map(lambda x: bool(x) if pd.notnull(x) else None)
-            elif dtype == 'datetime':
-                df[column] = pd.to_datetime(df[column], errors='coerce')
-            
-            self.preprocessor.df = df
-            self.dataset.preprocessed_df = df
+            pending = self.dataset.plan.add(op, self.dataset.preprocessed_df.columns, **params)
+            return jsonify({
+                'message': f'{op} queued in the preprocessing plan',
+                'lazy': True,
+                'pending_steps': pending
+            }), 202
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def _materialize(self):
+        # Pending lazy steps run before anything reads the preprocessed frame for real
+        result = self.dataset.execute_plan()
+        if result is not None:
+            self.preprocessor = DataPreprocessor(*self.dataset.snapshot())
+        return result
+
+    def update_column_type(self, columns, dtype):
+        if self.dataset.plan.enabled:
+            try:
+                pending = self.dataset.plan.extend(
+                    [make_op('cast', column=column, dtype=dtype) for column in columns],
+                    self.dataset.preprocessed_df.columns
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'message': 'cast queued in the preprocessing plan',
+                'lazy': True,
+                'pending_steps': pending
+            }), 202
+        try:
+            result = self._write(
+                f"update type of {', '.join(columns)} to {dtype}",
+                lambda preprocessor: {'new_types': preprocessor.cast_columns(columns, dtype)},
+                columns
+            )
+            new_types = result['new_types']
             
             return jsonify({
                 'success': True,
-                'message': f'Column {column} converted to {dtype}',
-                'new_type': str(df[column].dtype)
+                'version': result['version'],
+                'message': f"Column {', '.join(columns)} converted to {dtype}",
+                'new_type': new_types[columns[0]],
+                'new_types': new_types
             }), 200
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 500
 
+    def run_batch(self, operations, optimize=True):
+        try:
+            ops = []
+            for number, operation in enumerate(operations, 1):
+                params = {key: value for key, value in operation.items() if key != 'op'}
+                try:
+                    ops.append(make_op(operation['op'], **params))
+                except ValueError as e:
+                    raise ValueError(f'Operation {number}: {e}')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if self.dataset.plan.enabled:
+            try:
+                pending = self.dataset.plan.extend(ops, self.dataset.preprocessed_df.columns)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'message': f'{len(ops)} operations queued in the preprocessing plan',
+                'lazy': True,
+                'pending_steps': pending
+            }), 202
+        try:
+            result = self.dataset.apply_operations(ops, f'batch ({len(ops)} operations)', optimize)
+            return jsonify({'message': f'Applied {len(ops)} operations', 'operations': len(ops), **result}), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_plan(self):
+        try:
+            return jsonify(self.dataset.plan.explain()), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def set_lazy_mode(self, enabled):
+        try:
+            self.dataset.plan.enabled = enabled
+            return jsonify({
+                'lazy': enabled,
+                'pending_steps': len(self.dataset.plan.ops)
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def execute_plan(self):
+        try:
+            result = self._materialize()
+            if result is None:
+                return jsonify({'message': 'No pending steps', 'steps': 0}), 200
+            return jsonify({'message': f"Executed {result['steps']} queued steps", **result}), 200
+        except (ValueError, KeyError) as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def discard_plan(self):
+        try:
+            discarded = len(self.dataset.plan.ops)
+            self.dataset.plan.clear()
+            return jsonify({'message': f'Discarded {discarded} queued steps'}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_history(self):
+        try:
+            return jsonify(self.dataset.history.list_versions()), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def _moved(self, version):
+        rows, columns = self.dataset.preprocessed_df.shape
+        return jsonify({
+            'message': f'Checked out version {version}',
+            'version': version,
+            'rows': int(rows),
+            'columns': int(columns)
+        }), 200
+
+    def undo(self):
+        try:
+            return self._moved(self.dataset.undo())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def redo(self):
+        try:
+            return self._moved(self.dataset.redo())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def checkout(self, version):
+        try:
+            return self._moved(self.dataset.checkout(version))
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_pipeline(self):
+        try:
+            return jsonify({'steps': self.preprocessor.pipeline.describe()}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     def get_column_preview(self, column, n=5):
         try:
-            preview_data = self.preprocessor.df[column].head(n).tolist()
+            preview_data = column_to_list(self.preprocessor.df[column].head(n))
             return jsonify({
                 'column': column,
                 'data': preview_data
@@ -105,52 +266,87 @@ class PreprocessingController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
             
-    def get_categorical_columns(self):
+    def get_categorical_columns(self, approximate=False):
         try:
+            if approximate:
+                sketches = self.dataset.get_sketches(preprocessed=True)
+                return jsonify({
+                    'columns': [
+                        {
+                            'name': column,
+                            'type': sketch.dtype,
+                            'uniqueValues': sketch.distinct_count()
+                        }
+                        for column, sketch in sketches.items()
+                        if sketch.dtype in ('object', 'category')
+                    ],
+                    'approximate': True,
+                    'error_bounds': self.dataset.preprocessed_sketches.error_bounds()
+                }), 200
+
             categorical_columns = []
-            for column in self.preprocessor.df.columns:
-                if self.preprocessor.df[column].dtype == 'object' or pd.api.types.is_categorical_dtype(self.preprocessor.df[column]):
-                    unique_values = len(self.preprocessor.df[column].unique())
+            for column, profile in self.dataset.get_profiles(preprocessed=True).items():
+                if 'unique' in profile:
                     categorical_columns.append({
                         'name': column,
-                        'type': str(self.preprocessor.df[column].dtype),
-                        'uniqueValues': unique_values
+                        'type': profile['dtype'],
+                        'uniqueValues': profile['unique']
                     })
             return jsonify({'columns': categorical_columns}), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def get_numerical_columns(self):
+    def get_numerical_columns(self, approximate=False):
         try:
+            if approximate:
+                # Min and max are tracked exactly by the sketches
+                sketches = self.dataset.get_sketches(preprocessed=True)
+                return jsonify({
+                    'columns': [
+                        {'name': column, 'min': sketch.min, 'max': sketch.max}
+                        for column, sketch in sketches.items() if sketch.numeric
+                    ],
+                    'approximate': True
+                }), 200
+
             numerical_columns = []
-            for column in self.preprocessor.df.columns:
-                if pd.api.types.is_numeric_dtype(self.preprocessor.df[column]):
+            for column, profile in self.dataset.get_profiles(preprocessed=True).items():
+                if 'min' in profile:
                     numerical_columns.append({
                         'name': column,
-                        'min': float(self.preprocessor.df[column].min()),
-                        'max': float(self.preprocessor.df[column].max())
+                        'min': profile['min'],
+                        'max': profile['max']
                     })
             return jsonify({'columns': numerical_columns}), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     def handle_missing(self, column, method):
+        if self.dataset.plan.enabled:
+            return self._enqueue('fill', column=column, method=method)
         try:
-            result = self.preprocessor.handle_missing_values(column, method)
-            self.dataset.preprocessed_df = self.preprocessor.df
+            # Dropping rows changes every column
+            result = self._write(
+                f'handle missing values in {column} ({method})',
+                lambda preprocessor: preprocessor.handle_missing_values(column, method),
+                None if method == 'remove' else [column]
+            )
             return jsonify(result), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     def remove_column(self, column):
+        if self.dataset.plan.enabled:
+            return self._enqueue('drop', column=column)
         try:
-            result = self.preprocessor.delete_column(column)
-            self.dataset.preprocessed_df = self.preprocessor.df
+            result = self._write(
+                f'delete {column}', lambda preprocessor: preprocessor.delete_column(column), [column]
+            )
             return jsonify(result), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def get_columns_data(self, column1, column2=None):
+    def get_columns_data(self, column1, column2=None, resolution=None, mode='auto'):
         try:
             start_idx = request.args.get('start_idx', default=0, type=int)
             end_idx = request.args.get('end_idx', type=int)
@@ -160,49 +356,82 @@ class PreprocessingController:
                 df = df.iloc[start_idx:end_idx]
             else:
                 df = df.iloc[start_idx:]
+
+            if resolution is not None:
+                data = reduce_columns(df[column1], df[column2] if column2 else None, resolution, mode)
+                data.update({
+                    'total_rows': len(self.preprocessor.df),
+                    'selected_rows': len(df)
+                })
+                return jsonify(data), 200
+
+            columns = [column1, column2] if column2 else [column1]
+            response = columnar_response(df[columns], metadata={
+                'total_rows': len(self.preprocessor.df),
+                'selected_rows': len(df)
+            })
+            if response is not None:
+                return response
             
             if column2:
                 data = {
-                    'column1_data': df[column1].tolist(),
-                    'column2_data': df[column2].tolist(),
+                    'column1_data': column_to_list(df[column1]),
+                    'column2_data': column_to_list(df[column2]),
                     'total_rows': len(self.preprocessor.df),
                     'selected_rows': len(df)
                 }
             else:
                 data = {
-                    'column1_data': df[column1].tolist(),
+                    'column1_data': column_to_list(df[column1]),
                     'total_rows': len(self.preprocessor.df),
                     'selected_rows': len(df)
                 }
             return jsonify(data), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def encode_column(self, column, method):
+    def encode_column(self, column, method, options=None):
+        options = options or {}
+        if self.dataset.plan.enabled:
+            return self._enqueue('encode', column=column, method=method, **options)
         try:
-            result = self.preprocessor.encode_categorical(column, method)
-            self.dataset.preprocessed_df = self.preprocessor.df
+            result = self._write(
+                f'{method} encode {column}',
+                lambda preprocessor: preprocessor.encode_categorical(column, method, **options),
+                [column]
+            )
             return jsonify(result), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     def scale_columns(self, columns, method):
+        if self.dataset.plan.enabled:
+            return self._enqueue('scale', columns=list(columns), method=method)
         try:
-            result = self.preprocessor.scale_features(columns, method)
-            self.dataset.preprocessed_df = self.preprocessor.df
+            result = self._write(
+                f'{method} scale {", ".join(columns)}',
+                lambda preprocessor: preprocessor.scale_features(columns, method),
+                columns
+            )
             return jsonify(result), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    def split_dataset(self, test_size, random_state, shuffle, stratify,features,target):
+    def split_dataset(self, test_size, random_state, shuffle, stratify,features,target, include_data=True):
         try:
+            self._materialize()
             result = self.preprocessor.split_data(
                 test_size=test_size,
                 random_state=random_state,
                 shuffle=shuffle,
                 stratify=stratify,
                 features=features,
-                target=target
+                target=target,
+                include_data=include_data
             )
             return jsonify(result), 200
         except Exception as e:
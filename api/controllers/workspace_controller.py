@@ -0,0 +1,70 @@
+from flask import jsonify
+from models.workspaces import workspaces
+from utils.context import SESSION_COOKIE, current_workspace, is_admin_request
+
+ADMIN_ONLY = {'error': 'Requires the admin token in X-Admin-Token'}
+
+class WorkspaceController:
+    def __init__(self, manager=workspaces):
+        self.manager = manager
+
+    def _owns(self, workspace_id):
+        # Session ids are the only credential, so a session only sees and removes its own workspace
+        workspace = current_workspace()
+        return is_admin_request() or (workspace is not None and workspace.workspace_id == workspace_id)
+
+    def create_workspace(self):
+        try:
+            workspace = self.manager.create()
+            response = jsonify({
+                'message': 'Workspace created',
+                'session_id': workspace.workspace_id,
+                **workspace.describe()
+            })
+            # Browsers send the cookie back, other clients can pass X-Session-ID instead
+            response.set_cookie(SESSION_COOKIE, workspace.workspace_id, httponly=True, samesite='Lax')
+            return response, 201
+        except OverflowError as e:
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def list_workspaces(self):
+        if not is_admin_request():
+            return jsonify(ADMIN_ONLY), 403
+        try:
+            return jsonify(self.manager.list_workspaces()), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def get_workspace(self, workspace_id):
+        if not self._owns(workspace_id):
+            return jsonify({'error': f"Workspace '{workspace_id}' not found"}), 404
+        try:
+            return jsonify(self.manager.describe(workspace_id)), 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def remove_workspace(self, workspace_id):
+        if not self._owns(workspace_id):
+            return jsonify({'error': f"Workspace '{workspace_id}' not found"}), 404
+        try:
+            self.manager.remove(workspace_id)
+            response = jsonify({'message': f'Workspace {workspace_id} removed'})
+            response.delete_cookie(SESSION_COOKIE)
+            return response, 200
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def spill_idle(self):
+        if not is_admin_request():
+            return jsonify(ADMIN_ONLY), 403
+        try:
+            spilled = self.manager.spill_idle()
+            return jsonify({'spilled': spilled, 'count': len(spilled)}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Run from the repository root: gunicorn -c api/gunicorn.conf.py --pythonpath api app:app
+# Workers share datasets, splits and models through MLFLOW_SHARED_DIR instead of module state.
+# The directory is created private to the server user, each user gets their own by default.
+shm = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+os.environ.setdefault('MLFLOW_SHARED_DIR', os.path.join(shm, f'mlflow-shared-{os.getuid()}'))
+
+bind = os.environ.get('MLFLOW_BIND', '127.0.0.1:5000')
+# One worker by default. Background training job status (/jobs/<id>), the lazy preprocessing plan,
+# undo/redo history and session workspaces still live in each process, so with more workers job
+# polling can 404, lazy mode depends on the worker and an undo publishes that worker's old version.
+workers = int(os.environ.get('MLFLOW_WORKERS', os.environ.get('WEB_CONCURRENCY', 1)))
+threads = int(os.environ.get('MLFLOW_THREADS', 4))
+timeout = 120
+# Set to 1 to run several workers anyway, for read-heavy serving that does not use those endpoints
+ALLOW_PER_PROCESS_STATE = os.environ.get('MLFLOW_ALLOW_PER_PROCESS_STATE') == '1'
+
+
+def on_starting(server):
+    # Checked on the final settings, so -w on the command line is caught as well
+    if server.cfg.workers > 1 and not ALLOW_PER_PROCESS_STATE:
+        raise RuntimeError(
+            f'{server.cfg.workers} workers requested, but training jobs, lazy plans, undo history and '
+            'session workspaces are kept per process. Run one worker with more MLFLOW_THREADS, or set '
+            'MLFLOW_ALLOW_PER_PROCESS_STATE=1 if clients do not rely on that state.'
+        )
@@ -1,6 +1,6 @@
-import pandas as pd
+from models.loader import DatasetLoader
 class LoadDataset:
-    def __init__(self,path):
-        self.dataset = pd.read_csv(path)
+    def __init__(self,path,loader=None):
+        self.dataset = (loader or DatasetLoader()).load(path)
     def load_data(self):
         return self.dataset
\ No newline at end of file
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def profile_column(series):
+    # Every statistic the profiling endpoints need, from one visit of the column
+    dtype = series.dtype
+    mask = series.isna().to_numpy()
+    missing = int(mask.sum())
+    profile = {
+        'dtype': str(dtype),
+        'rows': len(series),
+        'count': len(series) - missing,
+        'missing': missing,
+        'memory_usage': int(series.memory_usage(deep=True))
+    }
+
+    if pd.api.types.is_numeric_dtype(dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)[~mask]
+        has_values = len(values) > 0
+        profile['min'] = float(values.min()) if has_values else None
+        profile['max'] = float(values.max()) if has_values else None
+        if not pd.api.types.is_bool_dtype(dtype):
+            # Same figures as DataFrame.describe(), which skips boolean columns
+            quartiles = np.percentile(values, [25, 50, 75]) if has_values else [np.nan] * 3
+            profile['describe'] = [
+                float(len(values)),
+                float(values.mean()) if has_values else np.nan,
+                float(values.std(ddof=1)) if len(values) > 1 else np.nan,
+                profile['min'] if has_values else np.nan,
+                *[float(value) for value in quartiles],
+                profile['max'] if has_values else np.nan
+            ]
+    elif dtype == object or isinstance(dtype, pd.CategoricalDtype):
+        profile['unique'] = int(series.nunique(dropna=False))
+    return profile
+
+
+class ColumnProfileCache:
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, columns=None):
+        with self._lock:
+            if columns is None:
+                self._profiles.clear()
+            else:
+                for column in columns:
+                    self._profiles.pop(column, None)
+
+    def get(self, df):
+        with self._lock:
+            profiles = {}
+            for column in df.columns:
+                profile = self._profiles.get(column)
+                series = df[column]
+                # Row count and dtype guard against mutations nobody reported
+                if (profile is None or profile['rows'] != len(series)
+                        or profile['dtype'] != str(series.dtype)):
+                    profile = profile_column(series)
+                    self._profiles[column] = profile
+                profiles[column] = profile
+            for column in set(self._profiles) - set(profiles):
+                del self._profiles[column]
+            return profiles
@@ -0,0 +1,51 @@
+import numpy as np
+
+from models.ml_models import score_predictions
+from utils.lazy_import import import_object
+
+
+def make_folds(model_type, y, cv, random_state=0, n_samples=None):
+    # Optionally restricted to a fixed random subset, used by successive halving
+    positions = np.random.default_rng(random_state).permutation(len(y))[:n_samples]
+    positions.sort()
+    subset = y[positions]
+    if model_type == 'classification' and np.unique(subset, return_counts=True)[1].min() >= cv:
+        splitter = import_object('sklearn.model_selection:StratifiedKFold')
+    else:
+        splitter = import_object('sklearn.model_selection:KFold')
+    splits = splitter(n_splits=cv, shuffle=True, random_state=random_state).split(positions, subset)
+    return [(positions[train_idx], positions[test_idx]) for train_idx, test_idx in splits]
+
+
+def fit_fold(estimator, model_type, X, y, train_idx, test_idx):
+    # Runs in a joblib worker, X and y arrive as read-only memmaps when large
+    estimator.fit(X[train_idx], y[train_idx])
+    metrics = score_predictions(model_type, y[test_idx], estimator.predict(X[test_idx]))
+    return estimator, {name: float(value) for name, value in metrics.items()}
+
+
+def cross_validate(estimator, model_type, X, y, cv=5, n_jobs=-1, random_state=0):
+    if cv < 2 or cv > len(y):
+        raise ValueError(f'cv must be between 2 and the number of training samples ({len(y)})')
+
+    joblib = import_object('joblib')
+    clone = import_object('sklearn.base:clone')
+    folds = make_folds(model_type, y, cv, random_state)
+
+    # Arrays above max_nbytes are dumped once and memory-mapped read-only by every worker
+    results = joblib.Parallel(n_jobs=min(n_jobs, cv) if n_jobs > 0 else n_jobs, max_nbytes='1M', mmap_mode='r')(
+        joblib.delayed(fit_fold)(clone(estimator), model_type, X, y, train_idx, test_idx)
+        for train_idx, test_idx in folds
+    )
+
+    fold_models = [model for model, _ in results]
+    fold_metrics = [
+        {'fold': i, 'train_size': len(train_idx), 'test_size': len(test_idx), **metrics}
+        for i, ((train_idx, test_idx), (_, metrics)) in enumerate(zip(folds, results))
+    ]
+    names = list(results[0][1])
+    summary = {
+        'mean': {name: float(np.mean([metrics[name] for _, metrics in results])) for name in names},
+        'std': {name: float(np.std([metrics[name] for _, metrics in results])) for name in names}
+    }
+    return fold_models, fold_metrics, summary
@@ -1,31 +1,318 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 import pandas as pd
 import numpy as np
+from models.column_profile import DESCRIBE_INDEX, ColumnProfileCache
+from models.dataset_history import DatasetHistory
+from models.downsampling import reduce_columns
+from models.lazy_plan import LogicalPlan, optimize_ops
+from models.loader import DatasetLoader
+from models.pipeline import PreprocessingPipeline
+from models.preprocessing import DataPreprocessor
+from models.sketches import DatasetSketches
+from utils.rwlock import ReadWriteLock
+from utils.serialization import column_to_list, prepare_records
+
+DEFAULT_DATASET_PATH = 'api/data/sample.csv'
 
 class Dataset:
-    def __init__(self):
-        self.df = pd.read_csv('api/data/sample.csv')
-        self.preprocessed_df = self.df.copy()
-    
-    def _convert_to_json_serializable(self, value):
-        if pd.isna(value):
-            return None
-        if isinstance(value, (np.int64, np.int32, np.int16, np.int8)):
-            return int(value)
-        if isinstance(value, (np.float64, np.float32, np.float16)):
-            return float(value)
-        if isinstance(value, np.bool_):
-            return bool(value)
-        return value
+    def __init__(self, filename=DEFAULT_DATASET_PATH, loader=None, lazy=True, shared=None):
+        self.filename = filename
+        self.loader = loader or DatasetLoader()
+        self._df = None
+        self._preprocessed_df = None
+        self.loaded = False
+        self.raw_profiles = ColumnProfileCache()
+        self.profiles = ColumnProfileCache()
+        self.sketches = DatasetSketches()
+        self.preprocessed_sketches = self.sketches.copy()
+        # Steps applied to preprocessed_df since it was last copied from df
+        self.pipeline = PreprocessingPipeline()
+        self.history = DatasetHistory()
+        # Steps queued in lazy preprocessing mode, not yet applied to preprocessed_df
+        self.plan = LogicalPlan()
+        # Serializes writers, each builds its new version on a working copy while holding it
+        self.lock = threading.RLock()
+        # Guards publishing a version against readers taking a snapshot of frame and pipeline
+        self._state = ReadWriteLock()
+        # A SharedDataset when other worker processes publish versions of this dataset too
+        self.shared = shared
+        self._generation = 0
+        self._raw_generation = None
+        # Bytes raw and preprocessed frames may take together, set by session workspaces
+        self.memory_budget = None
+        self._raw_bytes = None
+        if not lazy:
+            self.load_data(filename)
+
+    # Frames are read on first access so startup never touches the disk
+    @property
+    def df(self):
+        if not self.loaded or self.shared is not None:
+            self._ensure_loaded()
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._raw_bytes = None
+        self.loaded = True
+        self.raw_profiles.invalidate()
 
+    @property
+    def preprocessed_df(self):
+        if not self.loaded or self.shared is not None:
+            self._ensure_loaded()
+        return self._preprocessed_df
+
+    @preprocessed_df.setter
+    def preprocessed_df(self, value):
+        self._preprocessed_df = value
+        self.loaded = True
+    
     def _prepare_records(self, df):
-        records = df.to_dict('records')
-        return [{k: self._convert_to_json_serializable(v) for k, v in record.items()} 
-                for record in records]
+        return prepare_records(df)
     
-    def load_data(self, filename='api/data/sample.csv'):
-        self.df = pd.read_csv(filename)
-        self.preprocessed_df = self.df.copy()
-        return True
+    def _ensure_loaded(self):
+        if self.shared is not None:
+            self._sync()
+        if not self.loaded:
+            with self.lock, self._exclusive():
+                # Another worker may have loaded it while we waited for the lock
+                self._sync()
+                if not self.loaded:
+                    self.load_data()
+
+    def _exclusive(self):
+        # Cross-process writer lock in shared mode, a no-op otherwise
+        return self.shared.exclusive() if self.shared is not None else nullcontext()
+
+    def _sync(self):
+        # Attach to the latest version another worker published, if there is a newer one
+        if self.shared is None or self.shared.version() == self._generation:
+            return
+        # A local writer syncs on its own under the cross-process lock, readers keep the current version
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            state = self.shared.attach(self._raw_generation)
+            if state is None or state['generation'] == self._generation:
+                return
+            with self._state.write():
+                self.filename = state['filename']
+                if state['raw_df'] is not None:
+                    self.df = state['raw_df']
+                    self.sketches = DatasetSketches()
+                    self.plan.clear()
+                    self.history.reset(state['df'], f"load (shared generation {state['generation']})")
+                else:
+                    self.history.commit(state['df'], f"{state['label']} (shared generation {state['generation']})",
+                                        None, state['pipeline_steps'])
+                self.preprocessed_df = state['df']
+                self.preprocessed_sketches = self.sketches.copy()
+                self.pipeline.steps = list(state['pipeline_steps'])
+                self.profiles.invalidate()
+                self._generation = state['generation']
+                self._raw_generation = state['raw']
+        finally:
+            self.lock.release()
+
+    def _check_budget(self, df, raw_df=None):
+        # Raises before anything is published, so the current version stays in place
+        if self.memory_budget is None:
+            return
+        if raw_df is None:
+            if self._raw_bytes is None:
+                self._raw_bytes = int(self._df.memory_usage(deep=True).sum())
+            raw_bytes = self._raw_bytes
+        else:
+            raw_bytes = int(raw_df.memory_usage(deep=True).sum())
+        usage = raw_bytes + int(df.memory_usage(deep=True).sum())
+        if usage > self.memory_budget:
+            raise MemoryError(
+                f'Dataset would use {usage} bytes, more than the workspace memory budget of {self.memory_budget} bytes'
+            )
+
+    def _publish(self, label, columns=None, raw=False):
+        # Called with self.lock and the cross-process lock held
+        if self.shared is None:
+            return
+        if self.shared.version() != self._generation:
+            # Our base is not the latest generation, so no column can be reused from it
+            columns = None
+        self._generation = self.shared.publish(
+            self._preprocessed_df, self.pipeline.steps, self.filename, label,
+            raw_df=self._df if raw else None, columns=columns
+        )
+        if raw:
+            self._raw_generation = self._generation
+
+    def load_data(self, filename=None):
+        with self.lock, self._exclusive():
+            if filename is not None:
+                self.filename = filename
+            # Sketches for approximate statistics are filled chunk by chunk while loading
+            sketches = DatasetSketches()
+            df = self.loader.load(self.filename, sketches)
+            preprocessed_df = df.copy()
+            self._check_budget(preprocessed_df, df)
+            with self._state.write():
+                self.df = df
+                self.sketches = sketches
+                self.preprocessed_df = preprocessed_df
+                self.preprocessed_sketches = sketches.copy()
+                self.pipeline.reset()
+                self.plan.clear()
+                self.history.reset(preprocessed_df)
+                self.profiles.invalidate()
+            self._publish('load', raw=True)
+            return True
+
+    def snapshot(self):
+        # Frame and pipeline of one published version, never modified afterwards
+        self._ensure_loaded()
+        with self._state.read():
+            return self._preprocessed_df, self.pipeline.copy()
+
+    @contextmanager
+    def writer(self):
+        # Yields a preprocessor on a private working copy, publish it with commit_preprocessed
+        with self.lock, self._exclusive():
+            self._ensure_loaded()
+            # The only copy of a published frame, so history versions and readers can share its columns
+            working = self._preprocessed_df.copy()
+            yield DataPreprocessor(working, self.pipeline.copy())
+
+    def get_profiles(self, preprocessed=False):
+        self._ensure_loaded()
+        # Holding the read lock keeps a concurrent publish from caching stats of a replaced frame
+        with self._state.read():
+            if preprocessed:
+                return self.profiles.get(self._preprocessed_df)
+            return self.raw_profiles.get(self._df)
+
+    def get_sketches(self, preprocessed=False):
+        self._ensure_loaded()
+        with self._state.read():
+            if preprocessed:
+                return self.preprocessed_sketches.get(self._preprocessed_df)
+            return self.sketches.get(self._df)
+
+    def invalidate_profiles(self, columns=None):
+        # Called after a mutation of preprocessed_df with the columns it touched
+        self.profiles.invalidate(columns)
+        self.preprocessed_sketches.invalidate(columns)
+
+    def commit_preprocessed(self, df, label, columns=None, pipeline_steps=None):
+        # Publish a new preprocessed_df as a history version sharing untouched columns
+        with self.lock, self._exclusive():
+            self._check_budget(df)
+            with self._state.write():
+                self.preprocessed_df = df
+                if pipeline_steps is not None:
+                    self.pipeline.steps = list(pipeline_steps)
+                self.invalidate_profiles(columns)
+                version = self.history.commit(df, label, columns, self.pipeline.steps)
+            self._publish(label, columns)
+            return version
+
+    def apply_operations(self, ops, label, optimize=True):
+        # Runs preprocessing ops with one preprocessor and publishes them as a single version
+        with self.writer() as preprocessor:
+            notes = []
+            if optimize:
+                ops, notes = optimize_ops(ops)
+            # A failing step raises before anything is published
+            touched = set()
+            rows_changed = False
+            results = []
+            started = time.perf_counter()
+            for number, op in enumerate(ops, 1):
+                kind = op['op']
+                step_started = time.perf_counter()
+                try:
+                    if kind in ('fill', 'fill_many'):
+                        methods = op['methods'] if kind == 'fill_many' else {op['column']: op['method']}
+                        preprocessor.fill_missing(methods)
+                        result = {'message': f"Missing values in {', '.join(methods)} filled"}
+                        touched.update(methods)
+                    elif kind == 'drop_rows':
+                        result = preprocessor.handle_missing_values(op['column'], 'remove')
+                        rows_changed = True
+                    elif kind in ('drop', 'drop_many'):
+                        columns = op['columns'] if kind == 'drop_many' else [op['column']]
+                        result = preprocessor.delete_columns(columns)
+                        touched.update(columns)
+                    elif kind == 'encode':
+                        options = {key: value for key, value in op.items() if key not in ('op', 'column', 'method')}
+                        result = preprocessor.encode_categorical(op['column'], op['method'], **options)
+                        touched.update([op['column'], *result.pop('columns', [])])
+                    elif kind == 'scale':
+                        result = preprocessor.scale_features(op['columns'], op['method'])
+                        touched.update(op['columns'])
+                    elif kind == 'cast':
+                        new_type = preprocessor.cast_column(op['column'], op['dtype'])
+                        result = {'message': f"Column {op['column']} converted to {op['dtype']}", 'new_type': new_type}
+                        touched.add(op['column'])
+                except (KeyError, ValueError, TypeError) as e:
+                    result = {'error': str(e)}
+                if 'error' in result:
+                    raise ValueError(f"Step {number} ({kind}) failed: {result['error']}")
+                results.append({
+                    **op,
+                    **result,
+                    'elapsed_ms': (time.perf_counter() - step_started) * 1000
+                })
+
+            version = self.commit_preprocessed(
+                preprocessor.df, label, None if rows_changed else sorted(touched), preprocessor.pipeline.steps
+            )
+            return {
+                'version': version,
+                'executed': len(ops),
+                'optimizations': notes,
+                'results': results,
+                'elapsed_ms': (time.perf_counter() - started) * 1000
+            }
+
+    def execute_plan(self):
+        with self.lock:
+            if not self.plan.ops:
+                return None
+            steps = len(self.plan.ops)
+            result = self.apply_operations(self.plan.ops, f'execute plan ({steps} steps)')
+            self.plan.clear()
+            return {'steps': steps, **result}
+
+    def _restore_version(self, move, *args):
+        self._ensure_loaded()
+        with self.lock, self._exclusive():
+            with self._state.write():
+                frame, steps, changed, version = move(*args)
+                self.preprocessed_df = frame
+                self.pipeline.steps = steps
+                if changed is None or changed:
+                    self.invalidate_profiles(changed)
+            # Other workers see the restored frame as a new generation, history stays per worker
+            self._publish(f'restore version {version}')
+            return version
+
+    def undo(self):
+        return self._restore_version(self.history.undo)
+
+    def redo(self):
+        return self._restore_version(self.history.redo)
+
+    def checkout(self, version):
+        return self._restore_version(self.history.checkout, version)
+
+    def memory_usage(self):
+        if not self.loaded:
+            return {'raw': 0, 'preprocessed': 0, 'total': 0}
+        raw = int(self._df.memory_usage(deep=True).sum())
+        preprocessed = int(self._preprocessed_df.memory_usage(deep=True).sum())
+        return {'raw': raw, 'preprocessed': preprocessed, 'total': raw + preprocessed}
     
     def get_head(self, n=5):
         head_data = self.df.head(n)
@@ -44,107 +331,187 @@ class Dataset:
     def get_shape(self):
         return {'rows': int(self.df.shape[0]), 'columns': int(self.df.shape[1])}
     
-    def get_description(self):
-        desc_data = self.df.describe()
+    def get_description(self, approximate=False):
+        if approximate:
+            sketches = self.get_sketches()
+            columns = [column for column, sketch in sketches.items()
+                       if sketch.numeric and not pd.api.types.is_bool_dtype(self.df[column].dtype)]
+            described = {column: sketches[column].describe() for column in columns}
+            return {
+                'columns': columns,
+                'data': [
+                    {str(column): described[column][position] for column in columns}
+                    for position in range(len(DESCRIBE_INDEX))
+                ],
+                'index': DESCRIBE_INDEX,
+                'approximate': True,
+                'error_bounds': self.sketches.error_bounds()
+            }
+
+        profiles = self.get_profiles()
+        columns = [column for column, profile in profiles.items() if 'describe' in profile]
+        if not columns:
+            # Without numeric columns describe() summarises the object columns instead
+            desc_data = self.df.describe()
+            return {
+                'columns': list(desc_data.columns),
+                'data': self._prepare_records(desc_data),
+                'index': list(desc_data.index)
+            }
         return {
-            'columns': list(desc_data.columns),
-            'data': self._prepare_records(desc_data),
-            'index': list(desc_data.index)
+            'columns': columns,
+            'data': [
+                {
+                    str(column): None if np.isnan(profiles[column]['describe'][position])
+                    else profiles[column]['describe'][position]
+                    for column in columns
+                }
+                for position in range(len(DESCRIBE_INDEX))
+            ],
+            'index': DESCRIBE_INDEX
         }
     
+    def get_sample(self, n=100):
+        # Uniform reservoir sample of rows, kept up to date while loading
+        positions = self.sketches.sample_positions(len(self.df), n)
+        sample = self.df.iloc[positions]
+        return {
+            'columns': list(sample.columns),
+            'data': self._prepare_records(sample),
+            'total_rows': int(len(self.df)),
+            'sample_size': int(len(sample))
+        }
+
     def get_info(self):
+        profiles = self.get_profiles()
         info_dict = {
             'columns': list(self.df.columns),
             'data': [
                 {
                     'column': str(col),
-                    'dtype': str(self.df[col].dtype),
-                    'non_null_count': int(self.df[col].count()),
-                    'memory_usage': int(self.df[col].memory_usage(deep=True))
+                    'dtype': profile['dtype'],
+                    'non_null_count': profile['count'],
+                    'memory_usage': profile['memory_usage']
                 }
-                for col in self.df.columns
+                for col, profile in profiles.items()
             ]
         }
         return info_dict
     
     def get_missing_values(self):
-        missing_data = self.df.isna().sum()
+        profiles = self.get_profiles()
         return {
-            'columns': list(missing_data.index),
+            'columns': list(profiles),
             'data': [
                 {
                     'column': str(col),
-                    'missing_count': int(count)
+                    'missing_count': profile['missing']
                 } 
-                for col, count in missing_data.items()
+                for col, profile in profiles.items()
             ]
         }
     
-    def update_column_type(self, column, dtype):
-        try:
-            if dtype == 'int64':
-                # First convert to float to handle any NaN values
-                self.preprocessed_df[column] = pd.to_numeric(self.preprocessed_df[column], errors='raise')
-                # Then convert to int if all values are whole numbers
-                if self.preprocessed_df[column].dropna().apply(float.is_integer).all():
-                    self.preprocessed_df[column] = self.preprocessed_df[column].astype('Int64')  # nullable integer type
-                else:
-                    raise ValueError("Column contains non-integer values")
-            elif dtype == 'float64':
-                self.preprocessed_df[column] = pd.to_numeric(self.preprocessed_df[column], errors='raise')
-            elif dtype == 'datetime':
-                self.preprocessed_df[column] = pd.to_datetime(self.preprocessed_df[column], errors='raise')
-            else:
-                self.preprocessed_df[column] = self.preprocessed_df[column].astype(dtype)
-            
-            return {
-                'message': f'Column {column} type updated to {dtype}',
-                'success': True,
-                'new_type': str(self.preprocessed_df[column].dtype)
-            }
-        except ValueError as e:
-            return {
-                'message': f'Conversion error: {str(e)}',
-                'success': False,
-                'error_type': 'value_error'
-            }
-        except Exception as e:
-            return {
-                'message': f'Unexpected error: {str(e)}',
-                'success': False,
-                'error_type': 'general_error'
-            }
+    def update_column_type(self, columns, dtype):
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        with self.writer() as preprocessor:
+            result = preprocessor.update_column_type(columns, dtype)
+            if result['success']:
+                result['version'] = self.commit_preprocessed(
+                    preprocessor.df, f"update type of {', '.join(columns)} to {dtype}", columns,
+                    preprocessor.pipeline.steps
+                )
+            return result
             
     def get_dataset(self):
+        df = self.preprocessed_df
         return {
-            'columns': list(self.preprocessed_df.columns),
-            'data': self._prepare_records(self.preprocessed_df)
+            'columns': list(df.columns),
+            'data': self._prepare_records(df)
         }
         
+    def _decode_cursor(self, cursor):
+        if cursor in (None, ''):
+            return 0
+        try:
+            offset = int(cursor)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid cursor '{cursor}'")
+        if offset < 0:
+            raise ValueError(f"Invalid cursor '{cursor}'")
+        return offset
+
+    def get_dataset_page(self, limit, cursor=None):
+        if limit <= 0:
+            raise ValueError('limit must be a positive integer')
+        offset = self._decode_cursor(cursor)
+        df = self.preprocessed_df
+        page = df.iloc[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            'columns': list(df.columns),
+            'data': self._prepare_records(page),
+            'total_rows': len(df),
+            'cursor': str(offset),
+            'next_cursor': str(next_offset) if next_offset < len(df) else None
+        }
+
+    def iter_dataset_chunks(self, chunk_size=1000, cursor=None):
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be a positive integer')
+        offset = self._decode_cursor(cursor)
+        # Updates publish a new frame instead of writing to this one, so the stream reads one version
+        df = self.preprocessed_df
+        chunks = (self._prepare_records(df.iloc[start:start + chunk_size])
+                  for start in range(offset, len(df), chunk_size))
+        return len(df), chunks
+
     def get_column_types(self):
+        df = self.preprocessed_df
         return {
             'columns': [
                 {
                     'name': str(col),
-                    'current_type': str(self.preprocessed_df[col].dtype)
+                    'current_type': str(df[col].dtype)
                 }
-                for col in self.preprocessed_df.columns
+                for col in df.columns
             ]
         }
     
-    def get_visualization_data(self, x_column: str, y_column: str = None):
+    def get_visualization_frame(self, x_column: str, y_column: str = None):
+        df = self.preprocessed_df
+        columns = [x_column, y_column] if y_column else [x_column]
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            return {'success': False, 'error': f'Columns not found: {missing}'}
+        return {'success': True, 'data': df[columns]}
+
+    def get_visualization_data(self, x_column: str, y_column: str = None, resolution: int = None, mode: str = 'auto'):
         try:
+            # One published frame for the whole request, a concurrent write cannot mix versions
+            df = self.preprocessed_df
+            if resolution is not None:
+                # Histogram, 2D bins, decimated series or category counts instead of raw points
+                data = reduce_columns(
+                    df[x_column],
+                    df[y_column] if y_column else None,
+                    resolution, mode
+                )
+                data['x_type'] = str(df[x_column].dtype)
+                if y_column:
+                    data['y_type'] = str(df[y_column].dtype)
+                return {'success': True, 'data': data}
+
             if y_column:
                 data = {
-                    'x': self.preprocessed_df[x_column].tolist(),
-                    'y': self.preprocessed_df[y_column].tolist(),
-                    'x_type': str(self.preprocessed_df[x_column].dtype),
-                    'y_type': str(self.preprocessed_df[y_column].dtype)
+                    'x': column_to_list(df[x_column]),
+                    'y': column_to_list(df[y_column]),
+                    'x_type': str(df[x_column].dtype),
+                    'y_type': str(df[y_column].dtype)
                 }
             else:
                 data = {
-                    'x': self.preprocessed_df[x_column].tolist(),
-                    'x_type': str(self.preprocessed_df[x_column].dtype)
+                    'x': column_to_list(df[x_column]),
+                    'x_type': str(df[x_column].dtype)
                 }
             return {'success': True, 'data': data}
         except Exception as e:
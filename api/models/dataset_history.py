@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pandas as pd
+
+
+class DatasetHistory:
+    # Linear undo/redo history of preprocessed_df, each version maps column names to Series
+    def __init__(self, max_versions=50):
+        self.max_versions = max_versions
+        self._versions = []
+        self._position = -1
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _snapshot(self, df, parent=None, columns=None):
+        # Published frames are never written to, Dataset.writer() edits a copy, so versions keep their Series
+        if parent is None or columns is None or not df.index.equals(parent['index']):
+            return {name: df[name] for name in df.columns}
+        data = {}
+        for name in df.columns:
+            # Only touched or new columns get a new entry, the rest point at the parent's Series
+            if name in columns or name not in parent['data']:
+                data[name] = df[name]
+            else:
+                data[name] = parent['data'][name]
+        return data
+
+    def _append(self, df, label, columns, pipeline_steps):
+        with self._lock:
+            parent = self._versions[self._position] if self._versions else None
+            # A commit after undo discards the redo branch
+            del self._versions[self._position + 1:]
+            data = self._snapshot(df, parent, columns)
+            version = {
+                'version': self._next_id,
+                'label': label,
+                'created_at': time.time(),
+                'data': data,
+                'columns': list(df.columns),
+                'index': df.index,
+                'changed': [
+                    name for name in df.columns if parent is None or data[name] is not parent['data'].get(name)
+                ],
+                'pipeline_steps': list(pipeline_steps or [])
+            }
+            self._next_id += 1
+            self._versions.append(version)
+            while len(self._versions) > self.max_versions:
+                self._versions.pop(0)
+            self._position = len(self._versions) - 1
+            return version['version']
+
+    def reset(self, df, label='load'):
+        with self._lock:
+            self._versions = []
+            self._position = -1
+        return self._append(df, label, None, [])
+
+    def commit(self, df, label, columns=None, pipeline_steps=None):
+        return self._append(df, label, columns, pipeline_steps)
+
+    def _materialize(self, version):
+        frame = pd.DataFrame({name: version['data'][name] for name in version['columns']}, copy=False)
+        return frame, list(version['pipeline_steps'])
+
+    def _move(self, position):
+        current = self._versions[self._position]
+        target = self._versions[position]
+        self._position = position
+        # Columns whose Series differ between the two versions need fresh stats
+        if not target['index'].equals(current['index']):
+            changed = None
+        else:
+            changed = [
+                name for name in set(current['columns']) | set(target['columns'])
+                if current['data'].get(name) is not target['data'].get(name)
+            ]
+        frame, steps = self._materialize(target)
+        return frame, steps, changed, target['version']
+
+    def undo(self):
+        with self._lock:
+            if self._position <= 0:
+                raise ValueError('Nothing to undo')
+            return self._move(self._position - 1)
+
+    def redo(self):
+        with self._lock:
+            if self._position < 0 or self._position >= len(self._versions) - 1:
+                raise ValueError('Nothing to redo')
+            return self._move(self._position + 1)
+
+    def checkout(self, version_id):
+        with self._lock:
+            for position, version in enumerate(self._versions):
+                if version['version'] == version_id:
+                    return self._move(position)
+            raise LookupError(f"Version {version_id} not found")
+
+    @property
+    def current_version(self):
+        return self._versions[self._position]['version'] if self._versions else None
+
+    def list_versions(self):
+        with self._lock:
+            return {
+                'current': self.current_version,
+                'can_undo': self._position > 0,
+                'can_redo': 0 <= self._position < len(self._versions) - 1,
+                'versions': [
+                    {
+                        'version': version['version'],
+                        'label': version['label'],
+                        'created_at': version['created_at'],
+                        'rows': len(version['index']),
+                        'columns': len(version['columns']),
+                        'changed_columns': version['changed']
+                    }
+                    for version in self._versions
+                ]
+            }
@@ -0,0 +1,268 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from models.dataset import DEFAULT_DATASET_PATH, Dataset
+from models.shared_store import shared_store
+from utils.lazy_import import import_object
+from utils.storage import private_directory
+
+DEFAULT_DATASET_ID = 'default'
+DATA_DIR = os.path.dirname(DEFAULT_DATASET_PATH)
+DATASET_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def _write_frame(df, path):
+    # Parquet keeps spill files small, frames it cannot represent (sparse or mixed columns) are pickled
+    try:
+        df.to_parquet(f'{path}.parquet')
+        return f'{path}.parquet'
+    except Exception:
+        if os.path.exists(f'{path}.parquet'):
+            os.remove(f'{path}.parquet')
+    pd.to_pickle(df, f'{path}.pkl')
+    return f'{path}.pkl'
+
+
+def _directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _read_frame(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+class DatasetRegistry:
+    def __init__(self, max_resident=4, max_memory_bytes=None, spill_dir=None, shared=shared_store,
+                 memory_budget=None):
+        self.max_resident = max_resident
+        self.max_memory_bytes = max_memory_bytes
+        # Per dataset limit enforced on load and commit, used by session workspaces
+        self.memory_budget = memory_budget
+        # Created on first spill, a fresh private temporary directory unless one is given
+        self._spill_dir = spill_dir
+        self._resident = OrderedDict()
+        self._spilled = {}
+        self._sizes = {}
+        # Requests currently using each dataset, held datasets are never spilled
+        self._holds = {}
+        self._lock = threading.RLock()
+        # With a SharedStore every worker process attaches to the same published versions
+        self.shared = shared
+
+    @property
+    def spill_dir(self):
+        with self._lock:
+            self._spill_dir = private_directory(self._spill_dir, prefix='mlflow-datasets-')
+            return self._spill_dir
+
+    def _spill_path(self, dataset_id):
+        return os.path.join(self.spill_dir, dataset_id)
+
+    def _new_dataset(self, *args, **kwargs):
+        dataset = Dataset(*args, **kwargs)
+        dataset.memory_budget = self.memory_budget
+        return dataset
+
+    def _track(self, dataset_id, dataset):
+        self._resident[dataset_id] = dataset
+        self._resident.move_to_end(dataset_id)
+        self._sizes[dataset_id] = dataset.memory_usage()['total']
+        self._evict(keep=dataset_id)
+
+    def _over_limits(self):
+        if len(self._resident) <= 1:
+            return False
+        return (len(self._resident) > self.max_resident
+                or (self.max_memory_bytes is not None and sum(self._sizes.values()) > self.max_memory_bytes))
+
+    def _evict(self, keep=None):
+        # Spill least recently used datasets until both limits hold again
+        for dataset_id in list(self._resident):
+            if not self._over_limits():
+                break
+            if dataset_id != keep and not self._holds.get(dataset_id):
+                self._spill(dataset_id)
+
+    def acquire(self, dataset_id=DEFAULT_DATASET_ID):
+        # get() for a request, the dataset stays resident until the matching release()
+        with self._lock:
+            dataset = self.get(dataset_id)
+            self._holds[dataset_id] = self._holds.get(dataset_id, 0) + 1
+            return dataset
+
+    def release(self, dataset_id):
+        with self._lock:
+            holds = self._holds.get(dataset_id, 0) - 1
+            if holds > 0:
+                self._holds[dataset_id] = holds
+                return
+            self._holds.pop(dataset_id, None)
+            dataset = self._resident.get(dataset_id)
+            if dataset is not None and not self._sizes.get(dataset_id) and dataset.loaded:
+                # Lazy datasets are tracked at 0 bytes, the request that loaded them sets the real size
+                self._sizes[dataset_id] = dataset.memory_usage()['total']
+            # Spilling was put off while the dataset was held
+            self._evict()
+
+    def _spill(self, dataset_id):
+        # Only called for datasets no request holds, so no later write can go to the evicted object
+        dataset = self._resident.pop(dataset_id)
+        self._sizes.pop(dataset_id, None)
+        if dataset.shared is not None:
+            # Its versions are already on disk, get() attaches to them again
+            return
+        path = self._spill_path(dataset_id)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        state = {'filename': dataset.filename, 'df': None, 'preprocessed_df': None, 'pipeline': dataset.pipeline.steps}
+        # Waits for a writer outside any request, like a training job, to publish first
+        with dataset.lock:
+            if dataset.loaded:
+                preprocessed_df, pipeline = dataset.snapshot()
+                state.update({
+                    'df': _write_frame(dataset.df, os.path.join(path, 'df')),
+                    'preprocessed_df': _write_frame(preprocessed_df, os.path.join(path, 'preprocessed')),
+                    'pipeline': pipeline.steps
+                })
+        # Fitted pipeline steps hold NumPy arrays and estimators, which joblib stores efficiently
+        import_object('joblib').dump(state, os.path.join(path, 'state.joblib'))
+        self._spilled[dataset_id] = path
+
+    def _restore(self, dataset_id):
+        path = self._spilled.pop(dataset_id)
+        state = import_object('joblib').load(os.path.join(path, 'state.joblib'))
+        dataset = self._new_dataset(state['filename'])
+        if state['df'] is not None:
+            dataset.df = _read_frame(state['df'])
+            dataset.preprocessed_df = _read_frame(state['preprocessed_df'])
+            dataset.history.reset(dataset.preprocessed_df, 'restore')
+        dataset.pipeline.steps = state['pipeline']
+        shutil.rmtree(path, ignore_errors=True)
+        return dataset
+
+    def get(self, dataset_id=DEFAULT_DATASET_ID):
+        with self._lock:
+            dataset = self._resident.get(dataset_id)
+            if dataset is not None:
+                self._resident.move_to_end(dataset_id)
+                return dataset
+            if dataset_id in self._spilled:
+                dataset = self._restore(dataset_id)
+            elif self.shared is not None and (dataset_id == DEFAULT_DATASET_ID
+                                              or self.shared.has_dataset(dataset_id)):
+                dataset = self._new_dataset(shared=self.shared.dataset(dataset_id))
+            elif dataset_id == DEFAULT_DATASET_ID:
+                dataset = self._new_dataset()
+            else:
+                raise LookupError(f"Dataset '{dataset_id}' not found")
+            self._track(dataset_id, dataset)
+            return dataset
+
+    def create(self, dataset_id, filename=None):
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            raise ValueError(f"Invalid dataset_id '{dataset_id}'")
+        if filename is None:
+            path = DEFAULT_DATASET_PATH
+        else:
+            # Only files inside the data directory can be registered
+            path = os.path.join(DATA_DIR, os.path.basename(filename))
+        shared = self.shared.dataset(dataset_id) if self.shared is not None else None
+        dataset = self._new_dataset(path, lazy=False, shared=shared)
+        self.register(dataset_id, dataset)
+        return dataset
+
+    def register(self, dataset_id, dataset):
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            raise ValueError(f"Invalid dataset_id '{dataset_id}'")
+        with self._lock:
+            self._discard(dataset_id)
+            self._track(dataset_id, dataset)
+
+    def _discard(self, dataset_id):
+        self._resident.pop(dataset_id, None)
+        self._sizes.pop(dataset_id, None)
+        path = self._spilled.pop(dataset_id, None)
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def remove(self, dataset_id):
+        with self._lock:
+            shared = self.shared is not None and self.shared.has_dataset(dataset_id)
+            if dataset_id not in self._resident and dataset_id not in self._spilled and not shared:
+                raise LookupError(f"Dataset '{dataset_id}' not found")
+            self._discard(dataset_id)
+            if shared:
+                self.shared.remove_dataset(dataset_id)
+
+    def refresh_usage(self, dataset_id):
+        with self._lock:
+            dataset = self._resident.get(dataset_id)
+            if dataset is not None:
+                self._sizes[dataset_id] = dataset.memory_usage()['total']
+                self._evict(keep=dataset_id)
+
+    def spill_all(self):
+        with self._lock:
+            for dataset_id in list(self._resident):
+                if not self._holds.get(dataset_id):
+                    self._spill(dataset_id)
+
+    def clear(self):
+        with self._lock:
+            for dataset_id in [*self._resident, *self._spilled]:
+                self._discard(dataset_id)
+
+    def resident_memory(self):
+        # Measured again since writes since the last load may have grown or shrunk the frames
+        with self._lock:
+            for dataset_id, dataset in self._resident.items():
+                self._sizes[dataset_id] = dataset.memory_usage()['total']
+            return sum(self._sizes.values())
+
+    def spilled_bytes(self):
+        with self._lock:
+            return sum(_directory_size(path) for path in self._spilled.values())
+
+    def list_datasets(self):
+        with self._lock:
+            datasets = []
+            for dataset_id, dataset in self._resident.items():
+                usage = dataset.memory_usage()
+                self._sizes[dataset_id] = usage['total']
+                datasets.append({
+                    'dataset_id': dataset_id,
+                    'filename': dataset.filename,
+                    'resident': True,
+                    'rows': int(len(dataset.preprocessed_df)),
+                    'columns': int(dataset.preprocessed_df.shape[1]),
+                    'memory_usage': usage
+                })
+            for dataset_id, path in self._spilled.items():
+                datasets.append({
+                    'dataset_id': dataset_id,
+                    'resident': False,
+                    'spill_path': path,
+                    'spill_size': _directory_size(path)
+                })
+            if self.shared is not None:
+                listed = {entry['dataset_id'] for entry in datasets}
+                for dataset_id in self.shared.dataset_ids():
+                    if dataset_id not in listed:
+                        datasets.append({
+                            'dataset_id': dataset_id,
+                            'resident': False,
+                            'shared_generation': self.shared.dataset(dataset_id).version()
+                        })
+            return {
+                'datasets': datasets,
+                'resident_memory': sum(self._sizes.values())
+            }
+
+
+dataset_registry = DatasetRegistry()
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+MODES = ('auto', 'histogram', 'hexbin', 'lttb', 'minmax', 'categories')
+
+
+def _is_categorical(series):
+    dtype = series.dtype
+    return (dtype == object or isinstance(dtype, pd.CategoricalDtype)
+            or pd.api.types.is_bool_dtype(dtype))
+
+
+def _as_float(series):
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype='datetime64[ns]').view('i8').astype(np.float64)
+        # NaT is the smallest int64 once viewed as integers, it has to become NaN like any other gap
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _category_labels(series):
+    return series.astype(object).where(series.notna(), None)
+
+
+def category_counts(series, top=50):
+    counts = series.value_counts(dropna=False)
+    result = {
+        'categories': [None if pd.isna(label) else str(label) for label in counts.index[:top]],
+        'counts': counts.iloc[:top].astype(int).tolist()
+    }
+    if len(counts) > top:
+        result['other_count'] = int(counts.iloc[top:].sum())
+        result['other_categories'] = int(len(counts) - top)
+    return result
+
+
+def histogram(values, bins):
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+# Corners of a pointy-top hexagon around its center, in units of (column width, row height / 3)
+HEXAGON = np.array([[0.5, -0.5], [0.5, 0.5], [0.0, 1.0], [-0.5, 0.5], [-0.5, -0.5], [0.0, -1.0]])
+
+
+def hexbin(x, y, resolution):
+    # Hexagonal bins as in matplotlib's hexbin: centers lie on two rectangular lattices offset by half a
+    # cell, each point goes to the nearer one. resolution hexagons span x, only non-empty cells are sent
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) == 0:
+        return {'x': [], 'y': [], 'counts': [], 'hexagon': []}
+    nx = resolution
+    # Rows chosen so the hexagons come out regular when the plot is about square
+    ny = max(1, int(round(nx / np.sqrt(3))))
+    x_min, x_max, y_min, y_max = x.min(), x.max(), y.min(), y.max()
+    if x_max == x_min:
+        x_min, x_max = x_min - 0.5, x_max + 0.5
+    if y_max == y_min:
+        y_min, y_max = y_min - 0.5, y_max + 0.5
+    x_size, y_size = (x_max - x_min) / nx, (y_max - y_min) / ny
+    gx, gy = (x - x_min) / x_size, (y - y_min) / y_size
+
+    # Nearest center on the integer lattice and on the one shifted by (0.5, 0.5), rows weigh 3x
+    x1, y1 = np.round(gx), np.round(gy)
+    x2, y2 = np.floor(gx) + 0.5, np.floor(gy) + 0.5
+    first = (gx - x1) ** 2 + 3.0 * (gy - y1) ** 2 < (gx - x2) ** 2 + 3.0 * (gy - y2) ** 2
+    centers = np.column_stack([np.where(first, x1, x2), np.where(first, y1, y2)])
+    centers, counts = np.unique(centers, axis=0, return_counts=True)
+    return {
+        # Cell centers in data units, each cell is drawn as its center plus the hexagon offsets
+        'x': (x_min + centers[:, 0] * x_size).tolist(),
+        'y': (y_min + centers[:, 1] * y_size).tolist(),
+        'counts': counts.tolist(),
+        'hexagon': (HEXAGON * [x_size, y_size / 3]).tolist()
+    }
+
+
+def _ordered(x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) > 1 and np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    return x, y
+
+
+def minmax_decimate(x, y, resolution):
+    # Keep the lowest and highest point of every bucket, which preserves spikes
+    x, y = _ordered(x, y)
+    buckets = max(1, resolution // 2)
+    if len(x) <= 2 * buckets:
+        return {'x': x.tolist(), 'y': y.tolist()}
+    starts = np.linspace(0, len(x), buckets + 1).astype(np.int64)[:-1]
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(np.append(starts, len(x))))
+    low = np.minimum.reduceat(y, starts)
+    high = np.maximum.reduceat(y, starts)
+    # First index per bucket that reaches the bucket minimum / maximum
+    low_index = np.flatnonzero(y == low[bucket_ids])
+    high_index = np.flatnonzero(y == high[bucket_ids])
+    low_index = low_index[np.unique(bucket_ids[low_index], return_index=True)[1]]
+    high_index = high_index[np.unique(bucket_ids[high_index], return_index=True)[1]]
+    keep = np.unique(np.concatenate([low_index, high_index]))
+    return {'x': x[keep].tolist(), 'y': y[keep].tolist()}
+
+
+def lttb(x, y, resolution):
+    # Largest-Triangle-Three-Buckets keeps the visual shape of a series
+    x, y = _ordered(x, y)
+    if resolution < 3 or len(x) <= resolution:
+        return {'x': x.tolist(), 'y': y.tolist()}
+    edges = np.linspace(1, len(x) - 1, resolution - 1).astype(np.int64)
+    keep = np.empty(resolution, dtype=np.int64)
+    keep[0], keep[-1] = 0, len(x) - 1
+    previous = 0
+    for bucket in range(resolution - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else len(x)
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        keep[bucket + 1] = previous
+    return {'x': x[keep].tolist(), 'y': y[keep].tolist()}
+
+
+def grouped_summary(labels, values, top=50):
+    frame = pd.DataFrame({'label': _category_labels(labels), 'value': values})
+    grouped = frame.groupby('label', dropna=False, sort=False)['value'].agg(['count', 'mean', 'min', 'max'])
+    grouped = grouped.sort_values('count', ascending=False)
+    head = grouped.iloc[:top]
+    return {
+        'categories': [None if pd.isna(label) else str(label) for label in head.index],
+        'counts': head['count'].astype(int).tolist(),
+        'mean': [None if np.isnan(v) else float(v) for v in head['mean']],
+        'min': [None if np.isnan(v) else float(v) for v in head['min']],
+        'max': [None if np.isnan(v) else float(v) for v in head['max']],
+        'other_categories': int(max(0, len(grouped) - top))
+    }
+
+
+def crosstab_counts(x, y, top=50):
+    x_labels = _category_labels(x)
+    y_labels = _category_labels(y)
+    x_top = x_labels.value_counts(dropna=False).index[:top]
+    y_top = y_labels.value_counts(dropna=False).index[:top]
+    table = pd.crosstab(x_labels.where(x_labels.isin(x_top), '__other__'),
+                        y_labels.where(y_labels.isin(y_top), '__other__'), dropna=False)
+    return {
+        'x_categories': [None if pd.isna(label) else str(label) for label in table.index],
+        'y_categories': [None if pd.isna(label) else str(label) for label in table.columns],
+        'counts': table.to_numpy().astype(int).tolist()
+    }
+
+
+def reduce_columns(x_series, y_series=None, resolution=100, mode='auto'):
+    if mode not in MODES:
+        raise ValueError(f"Invalid mode '{mode}', expected one of {list(MODES)}")
+    resolution = max(2, int(resolution))
+    result = {'total_points': int(len(x_series)), 'resolution': resolution}
+
+    if y_series is None:
+        if mode in ('auto', 'categories') and _is_categorical(x_series):
+            result.update(mode='categories', **category_counts(x_series, resolution))
+        elif mode in ('auto', 'histogram'):
+            if _is_categorical(x_series):
+                raise ValueError('histogram mode needs a numeric column')
+            result.update(mode='histogram', **histogram(_as_float(x_series), resolution))
+        else:
+            raise ValueError(f"Mode '{mode}' needs both x and y columns")
+        return result
+
+    x_categorical, y_categorical = _is_categorical(x_series), _is_categorical(y_series)
+    if x_categorical and y_categorical:
+        result.update(mode='categories', **crosstab_counts(x_series, y_series, resolution))
+    elif x_categorical or y_categorical:
+        labels, values = (x_series, y_series) if x_categorical else (y_series, x_series)
+        result.update(mode='categories', category_axis='x' if x_categorical else 'y',
+                      **grouped_summary(labels, _as_float(values), resolution))
+    elif mode in ('auto', 'hexbin'):
+        result.update(mode='hexbin', **hexbin(_as_float(x_series), _as_float(y_series), resolution))
+    elif mode == 'lttb':
+        result.update(mode='lttb', **lttb(_as_float(x_series), _as_float(y_series), resolution))
+    elif mode == 'minmax':
+        result.update(mode='minmax', **minmax_decimate(_as_float(x_series), _as_float(y_series), resolution))
+    else:
+        raise ValueError(f"Mode '{mode}' needs a single column")
+    return result
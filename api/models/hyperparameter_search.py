@@ -0,0 +1,186 @@
+import math
+import time
+
+import numpy as np
+
+from models.cross_validation import make_folds
+from models.ml_models import ESTIMATORS
+from utils.lazy_import import import_object
+
+STRATEGIES = ('grid', 'random', 'halving')
+DEFAULT_SCORING = {'classification': 'accuracy', 'regression': 'r2', 'clustering': 'adjusted_rand_score'}
+# Trials are only pruned once this many have finished and a median exists
+MIN_COMPLETED_FOR_PRUNING = 3
+
+
+def _sample_value(spec, rng):
+    # A list is a set of choices, a {'low', 'high', 'log', 'type'} dict is a range
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    if isinstance(spec, dict):
+        low, high = spec['low'], spec['high']
+        if spec.get('log'):
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            value = rng.uniform(low, high)
+        return int(round(value)) if spec.get('type') == 'int' else float(value)
+    return spec
+
+
+def run_trial(trial_id, model_path, params, X, y, folds, scoring, stop_below=None):
+    # Runs in a joblib worker, X and y arrive as read-only memmaps when large
+    scorer = import_object('sklearn.metrics:get_scorer')(scoring)
+    estimator_class = import_object(model_path)
+    scores = []
+    start = time.perf_counter()
+    try:
+        for train_idx, test_idx in folds:
+            estimator = estimator_class(**params)
+            estimator.fit(X[train_idx], y[train_idx])
+            scores.append(float(scorer(estimator, X[test_idx], y[test_idx])))
+            # Median stopping rule: give up once the running mean trails finished trials
+            if stop_below is not None and len(scores) < len(folds) and np.mean(scores) < stop_below:
+                return {'trial_id': trial_id, 'status': 'pruned', 'scores': scores,
+                        'fit_seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'trial_id': trial_id, 'status': 'failed', 'error': str(e), 'scores': scores,
+                'fit_seconds': time.perf_counter() - start}
+    return {'trial_id': trial_id, 'status': 'completed', 'scores': scores, 'fit_seconds': time.perf_counter() - start}
+
+
+class HyperparameterSearch:
+    def __init__(self, model_type, space, strategy='random', n_iter=10, cv=3, scoring=None,
+                 eta=3, early_stopping=True, n_jobs=-1, random_state=0):
+        if model_type not in ESTIMATORS:
+            raise ValueError(f"Invalid model type '{model_type}'")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        if not space:
+            raise ValueError('At least one algorithm is required in the search space')
+        unknown = [algorithm for algorithm in space if algorithm not in ESTIMATORS[model_type]]
+        if unknown:
+            raise ValueError(f"Invalid algorithm(s) for {model_type}: {', '.join(unknown)}")
+        if cv < 2 or eta < 2 or n_iter < 1:
+            raise ValueError('cv and eta must be at least 2 and n_iter at least 1')
+
+        self.model_type = model_type
+        self.space = space
+        self.strategy = strategy
+        self.n_iter = n_iter
+        self.cv = cv
+        self.scoring = scoring or DEFAULT_SCORING[model_type]
+        self.eta = eta
+        self.early_stopping = early_stopping
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.candidates = self._build_candidates()
+        self._finished_scores = []
+
+    def _build_candidates(self):
+        if self.strategy == 'grid':
+            parameter_grid = import_object('sklearn.model_selection:ParameterGrid')
+            candidates = []
+            for algorithm, grid in self.space.items():
+                grid = grid or {}
+                if any(isinstance(values, dict) for values in grid.values()):
+                    raise ValueError('Grid search only accepts lists of values')
+                grid = {name: values if isinstance(values, list) else [values] for name, values in grid.items()}
+                candidates.extend((algorithm, params) for params in parameter_grid(grid))
+            return candidates
+
+        rng = np.random.default_rng(self.random_state)
+        algorithms = list(self.space)
+        candidates = []
+        for i in range(self.n_iter):
+            algorithm = algorithms[i % len(algorithms)]
+            grid = self.space[algorithm] or {}
+            candidates.append((algorithm, {name: _sample_value(spec, rng) for name, spec in grid.items()}))
+        return candidates
+
+    def _stop_threshold(self):
+        if not self.early_stopping or len(self._finished_scores) < MIN_COMPLETED_FOR_PRUNING:
+            return None
+        return float(np.median(self._finished_scores))
+
+    def _run_trials(self, trials, X, y, folds, prune):
+        joblib = import_object('joblib')
+
+        # Evaluated lazily as joblib dispatches, so later trials see a tighter threshold
+        def tasks():
+            for trial_id, (algorithm, params) in trials:
+                stop_below = self._stop_threshold() if prune else None
+                yield joblib.delayed(run_trial)(
+                    trial_id, ESTIMATORS[self.model_type][algorithm], params, X, y, folds, self.scoring, stop_below
+                )
+
+        # Arrays above max_nbytes are dumped once and memory-mapped read-only by every worker
+        parallel = joblib.Parallel(
+            n_jobs=self.n_jobs, max_nbytes='1M', mmap_mode='r',
+            pre_dispatch='n_jobs', return_as='generator_unordered'
+        )
+        return parallel(tasks())
+
+    def _trial_events(self, trials, X, y, folds, prune, rung=None, n_samples=None):
+        # Results arrive in completion order and carry their own trial id
+        candidates = dict(trials)
+        for result in self._run_trials(trials, X, y, folds, prune):
+            algorithm, params = candidates[result['trial_id']]
+            mean_score = float(np.mean(result['scores'])) if result['scores'] else None
+            if result['status'] == 'completed':
+                self._finished_scores.append(mean_score)
+            yield {
+                'event': 'trial',
+                'algorithm': algorithm,
+                'params': params,
+                'rung': rung,
+                'n_samples': n_samples or len(y),
+                'mean_score': mean_score,
+                **result
+            }
+
+    def run(self, X, y):
+        start = time.perf_counter()
+        self._finished_scores = []
+        trials = []
+
+        if self.strategy == 'halving':
+            n_rungs = 1
+            while self.eta ** n_rungs <= len(self.candidates):
+                n_rungs += 1
+            min_samples = max(self.cv * 2, len(y) // self.eta ** (n_rungs - 1))
+            active = list(enumerate(self.candidates))
+            for rung in range(n_rungs):
+                n_samples = len(y) if rung == n_rungs - 1 else min(len(y), min_samples * self.eta ** rung)
+                folds = make_folds(self.model_type, y, self.cv, self.random_state, n_samples)
+                scored = []
+                for event in self._trial_events(active, X, y, folds, prune=False, rung=rung, n_samples=n_samples):
+                    trials.append(event)
+                    if event['status'] == 'completed':
+                        scored.append((event['mean_score'], event['trial_id']))
+                    yield event
+                keep = max(1, math.ceil(len(active) / self.eta))
+                promoted = {trial_id for _, trial_id in sorted(scored, reverse=True)[:keep]}
+                active = [(trial_id, candidate) for trial_id, candidate in active if trial_id in promoted]
+                yield {'event': 'rung', 'rung': rung, 'n_samples': n_samples, 'promoted': sorted(promoted)}
+                # A single survivor still gets its last rung on the full data, only all trials failing ends early
+                if not active:
+                    break
+        else:
+            folds = make_folds(self.model_type, y, self.cv, self.random_state)
+            for event in self._trial_events(list(enumerate(self.candidates)), X, y, folds, prune=True):
+                trials.append(event)
+                yield event
+
+        # The best trial is the one evaluated on the most data, then by score
+        completed = [trial for trial in trials if trial['status'] == 'completed']
+        best = max(completed, key=lambda trial: (trial['n_samples'], trial['mean_score']), default=None)
+        yield {
+            'event': 'summary',
+            'strategy': self.strategy,
+            'scoring': self.scoring,
+            'n_trials': len(trials),
+            'n_pruned': sum(trial['status'] == 'pruned' for trial in trials),
+            'n_failed': sum(trial['status'] == 'failed' for trial in trials),
+            'elapsed_seconds': time.perf_counter() - start,
+            'best': best
+        }
@@ -0,0 +1,103 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Held-out rows kept for scoring a streamed model, a bounded sample however large the table is
+MAX_HOLDOUT_ROWS = 100_000
+
+
+class ChunkStream:
+    # (X, y) chunks read from a dataset file and run through its fitted preprocessing, iterable once per epoch
+    def __init__(self, loader, path, pipeline, features, target=None, chunk_size=None, holdout=0.0, seed=0):
+        self.loader = copy.copy(loader)
+        if chunk_size is not None:
+            self.loader.chunksize = chunk_size
+        self.path = path
+        self.features = list(features)
+        self.target = target
+        self.compiled = pipeline.compile(self.features)
+        self.target_pipeline = pipeline.compile([target]) if target is not None else None
+        # Rows the loaded frame lost to remove steps are left out of every chunk as well
+        self.row_filters = pipeline.row_filters()
+        self.holdout = holdout
+        self.seed = seed
+        self.rows_read = 0
+        self.rows_trained = 0
+        self.rows_skipped = 0
+        self._holdout_X = []
+        self._holdout_y = []
+        self._holdout_rows = 0
+        self._passes = 0
+
+    def _raw_target(self):
+        # A target no preprocessing step touched keeps its labels instead of becoming floats
+        return not self.target_pipeline.ops and self.target_pipeline.inputs == {self.target}
+
+    def _row_columns(self):
+        # Columns read besides the features, for the target and for the remove steps
+        columns = set(self.target_pipeline.inputs) if self.target is not None else set()
+        for _, row_filter in self.row_filters:
+            columns.update(row_filter.inputs)
+        return sorted(columns)
+
+    def _kept(self, chunk):
+        keep = np.ones(len(chunk), dtype=bool)
+        for column, row_filter in self.row_filters:
+            keep &= pd.notna(row_filter.apply(chunk)[column])
+        return keep
+
+    def _target(self, chunk):
+        if self.target is None:
+            return None
+        if self._raw_target():
+            return chunk[self.target].to_numpy()
+        return self.target_pipeline.transform(chunk)[:, 0]
+
+    def classes(self):
+        # One pass over the target columns only, partial_fit needs every class up front
+        labels = []
+        for chunk in self.loader.iter_chunks(self.path, self._row_columns()):
+            y = self._target(chunk)[self._kept(chunk)]
+            labels.append(pd.unique(y[pd.notna(y)]))
+        if not labels:
+            raise ValueError("Dataset file has no rows")
+        return np.unique(np.concatenate(labels))
+
+    def __iter__(self):
+        columns = sorted(set(self.compiled.inputs).union(self._row_columns()))
+        first_pass = self._passes == 0
+        self._passes += 1
+        # Reseeded every pass so the same rows are held out in each epoch
+        rng = np.random.default_rng(self.seed)
+        for chunk in self.loader.iter_chunks(self.path, columns):
+            X = self.compiled.transform(chunk)
+            y = self._target(chunk)
+            # Rows a remove step dropped and rows the estimators cannot take
+            complete = self._kept(chunk) & ~np.isnan(X).any(axis=1)
+            if y is not None:
+                complete &= pd.notna(y)
+            held = rng.random(len(X)) < self.holdout if self.holdout else np.zeros(len(X), dtype=bool)
+            train = complete & ~held
+            if first_pass:
+                self.rows_read += len(X)
+                self.rows_skipped += int((~complete).sum())
+                self.rows_trained += int(train.sum())
+                self._keep_holdout(X[complete & held], None if y is None else y[complete & held])
+            yield X[train], None if y is None else y[train]
+
+    def _keep_holdout(self, X, y):
+        room = MAX_HOLDOUT_ROWS - self._holdout_rows
+        if room <= 0 or len(X) == 0:
+            return
+        self._holdout_X.append(X[:room])
+        if y is not None:
+            self._holdout_y.append(y[:room])
+        self._holdout_rows += min(room, len(X))
+
+    def holdout_set(self):
+        if not self._holdout_rows:
+            return None, None
+        X = np.concatenate(self._holdout_X)
+        y = np.concatenate(self._holdout_y) if self._holdout_y else None
+        return X, y
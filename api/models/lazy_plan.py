@@ -0,0 +1,216 @@
+import threading
+
+from models.pipeline import ENCODED_SUFFIXES, ENCODERS
+from models.type_conversion import validate_dtype
+
+FILL_METHODS = ('mean', 'median', 'mode', 'remove')
+# These scale each column on its own, so their steps can be split or merged by column
+SEPARABLE_SCALERS = ('standard', 'minmax', 'robust', 'quantile')
+# Batch requests may also name operations after their single-step endpoints
+OPERATION_ALIASES = {
+    'handle-missing-values': 'fill',
+    'delete-column': 'drop',
+    'update-type': 'cast'
+}
+REQUIRED_PARAMS = {
+    'fill': ('column', 'method'),
+    'drop': ('column',),
+    'encode': ('column', 'method'),
+    'scale': ('columns', 'method'),
+    'cast': ('column', 'dtype')
+}
+OPTIONAL_PARAMS = {
+    'encode': ('sparse', 'top_k', 'max_categories', 'n_features', 'target', 'smoothing')
+}
+
+
+def parse_bool(value):
+    # bool('false') is True, so flags sent as JSON strings are parsed explicitly
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', '1', 'yes'):
+            return True
+        if lowered in ('false', '0', 'no', ''):
+            return False
+        raise ValueError(f"Invalid boolean '{value}'")
+    if isinstance(value, bool) or value in (0, 1):
+        return bool(value)
+    raise ValueError(f"Invalid boolean {value!r}")
+
+
+def make_op(op, **params):
+    op = OPERATION_ALIASES.get(op, op)
+    if op not in REQUIRED_PARAMS:
+        raise ValueError(f"Unknown operation '{op}'")
+    missing = [name for name in REQUIRED_PARAMS[op] if not params.get(name)]
+    if missing:
+        raise ValueError(f"Operation '{op}' requires {', '.join(missing)}")
+    if op == 'fill' and params['method'] not in FILL_METHODS:
+        raise ValueError(f"Invalid missing value method '{params['method']}'")
+    if op == 'encode' and params['method'] not in ENCODERS:
+        raise ValueError('Invalid encoding method')
+    if op == 'cast':
+        validate_dtype(params['dtype'])
+    params = {
+        name: params[name] for name in REQUIRED_PARAMS[op] + OPTIONAL_PARAMS.get(op, ())
+        if params.get(name) is not None
+    }
+    if op == 'scale':
+        params['columns'] = list(params['columns'])
+    if 'sparse' in params:
+        params['sparse'] = parse_bool(params['sparse'])
+    if op == 'fill' and params['method'] == 'remove':
+        op = 'drop_rows'
+    return {'op': op, **params}
+
+
+def _creates(op, column):
+    # Whether op produces a column named `column` that did not exist before it
+    if op['op'] == 'encode':
+        if op['method'] in ENCODED_SUFFIXES:
+            return column == f"{op['column']}_{ENCODED_SUFFIXES[op['method']]}"
+        return column.startswith(f"{op['column']}_")
+    return False
+
+
+def _input_columns(op):
+    if op['op'] == 'scale':
+        return list(op['columns'])
+    return [name for name in (op.get('column'), op.get('target')) if name is not None]
+
+
+def check_columns(ops, columns, queued=()):
+    # Unknown columns are rejected when a step is queued instead of failing the whole plan later
+    earlier = list(queued)
+    for op in ops:
+        missing = [
+            name for name in _input_columns(op)
+            if name not in columns and not any(_creates(prior, name) for prior in earlier)
+        ]
+        if missing:
+            raise ValueError(f"Column(s) {', '.join(missing)} not found")
+        earlier.append(op)
+
+
+def _reads(op, column):
+    if op['op'] == 'encode':
+        return column in (op['column'], op.get('target'))
+    if op['op'] == 'drop_rows':
+        return op['column'] == column
+    if op['op'] == 'scale':
+        return op['method'] not in SEPARABLE_SCALERS and column in op['columns']
+    return False
+
+
+def push_down_drops(ops, notes):
+    # Move each drop as early as possible and remove the work it makes dead on the way
+    ops = list(ops)
+    position = 0
+    while position < len(ops):
+        op = ops[position]
+        if op['op'] != 'drop':
+            position += 1
+            continue
+        column = op['column']
+        target = position
+        while target > 0:
+            previous = ops[target - 1]
+            if _reads(previous, column) or _creates(previous, column):
+                break
+            if previous['op'] in ('fill', 'cast') and previous['column'] == column:
+                notes.append(f"removed {previous['op']} of {column}, dropped later")
+                del ops[target - 1]
+                position -= 1
+            elif previous['op'] == 'scale' and column in previous['columns']:
+                remaining = [name for name in previous['columns'] if name != column]
+                notes.append(f'removed {column} from {previous["method"]} scaling, dropped later')
+                if remaining:
+                    ops[target - 1] = {**previous, 'columns': remaining}
+                else:
+                    del ops[target - 1]
+                    position -= 1
+            target -= 1
+        if target < position:
+            notes.append(f'pushed drop of {column} before {position - target} step(s)')
+            ops.insert(target, ops.pop(position))
+        position += 1
+    return ops
+
+
+def fuse(ops, notes):
+    fused = []
+    for op in ops:
+        previous = fused[-1] if fused else None
+        if previous is not None and op['op'] == 'fill' and op['method'] != 'remove' \
+                and previous['op'] == 'fill_many':
+            if op['column'] in previous['methods']:
+                # The earlier fill left no missing values in this column
+                notes.append(f"removed repeated fill of {op['column']}")
+            else:
+                previous['methods'][op['column']] = op['method']
+            continue
+        if op['op'] == 'fill' and op['method'] != 'remove':
+            fused.append({'op': 'fill_many', 'methods': {op['column']: op['method']}})
+            continue
+        if previous is not None and op['op'] == 'scale' and previous['op'] == 'scale' \
+                and op['method'] == previous['method'] and op['method'] in SEPARABLE_SCALERS \
+                and not set(op['columns']) & set(previous['columns']):
+            previous['columns'] = previous['columns'] + op['columns']
+            notes.append(f"fused {op['method']} scaling of {', '.join(previous['columns'])}")
+            continue
+        if previous is not None and op['op'] == 'drop' and previous['op'] == 'drop_many':
+            previous['columns'].append(op['column'])
+            continue
+        if op['op'] == 'drop':
+            fused.append({'op': 'drop_many', 'columns': [op['column']]})
+            continue
+        fused.append(dict(op))
+    for op in fused:
+        if op['op'] == 'fill_many' and len(op['methods']) > 1:
+            notes.append(f"fused fills of {', '.join(op['methods'])} into one pass")
+        if op['op'] == 'drop_many' and len(op['columns']) > 1:
+            notes.append(f"fused drops of {', '.join(op['columns'])}")
+    return fused
+
+
+def optimize_ops(ops):
+    notes = []
+    ops = fuse(push_down_drops([dict(op) for op in ops], notes), notes)
+    return ops, notes
+
+
+class LogicalPlan:
+    # Preprocessing steps queued while lazy mode is on, run together on materialization
+    def __init__(self):
+        self.enabled = False
+        self.ops = []
+        self._lock = threading.Lock()
+
+    def add(self, op, available=None, **params):
+        return self.extend([make_op(op, **params)], available)
+
+    def extend(self, ops, available=None):
+        # ops come from make_op, a batch is queued all together or not at all
+        with self._lock:
+            if available is not None:
+                check_columns(ops, available, self.ops)
+            self.ops.extend(ops)
+            return len(self.ops)
+
+    def clear(self):
+        with self._lock:
+            self.ops = []
+
+    def optimize(self):
+        with self._lock:
+            ops = list(self.ops)
+        return optimize_ops(ops)
+
+    def explain(self):
+        optimized, notes = self.optimize()
+        return {
+            'enabled': self.enabled,
+            'steps': [dict(op) for op in self.ops],
+            'optimized': optimized,
+            'optimizations': notes
+        }
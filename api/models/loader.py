@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from utils.lazy_import import optional_module
+
+CSV_EXTENSIONS = ('.csv', '.txt', '.tsv')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+FEATHER_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+
+
+class DatasetLoader:
+    # Dtype optimizations are opt-in, by default a load keeps the dtypes pandas would infer
+    def __init__(self, chunksize=100_000, sample_rows=10_000, downcast_ints=False,
+                 downcast_floats=False, categorical_threshold=None, max_categories=1000,
+                 memory_map=True):
+        self.chunksize = chunksize
+        self.sample_rows = sample_rows
+        self.downcast_ints = downcast_ints
+        self.downcast_floats = downcast_floats
+        self.categorical_threshold = categorical_threshold
+        self.max_categories = max_categories
+        self.memory_map = memory_map
+
+    def load(self, path, sketches=None):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            df = self.read_parquet(path)
+        elif extension in FEATHER_EXTENSIONS:
+            df = self.read_feather(path)
+        else:
+            return self.read_csv(path, sketches)
+        if sketches is not None:
+            for start in range(0, len(df), self.chunksize):
+                sketches.update(df.iloc[start:start + self.chunksize])
+        return df
+
+    def _csv_options(self, path):
+        return {'sep': '\t'} if path.lower().endswith('.tsv') else {}
+
+    def infer_schema(self, path):
+        # Dtypes and low-cardinality string columns are decided once from a sample
+        sample = pd.read_csv(path, nrows=self.sample_rows, **self._csv_options(path))
+        dtypes = {}
+        categorical = []
+        for column in sample.columns:
+            series = sample[column]
+            if pd.api.types.is_float_dtype(series.dtype):
+                dtypes[column] = 'float64'
+            elif series.dtype == object:
+                dtypes[column] = 'object'
+                if self._is_low_cardinality(series):
+                    categorical.append(column)
+        return dtypes, categorical
+
+    def _is_low_cardinality(self, series):
+        if self.categorical_threshold is None or len(series) == 0:
+            return False
+        unique = series.nunique(dropna=True)
+        return unique <= self.max_categories and unique / len(series) <= self.categorical_threshold
+
+    def optimize(self, df, categorical=()):
+        for column in df.columns:
+            dtype = df[column].dtype
+            if self.downcast_ints and pd.api.types.is_integer_dtype(dtype) and dtype.kind in 'iu':
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+            elif self.downcast_floats and dtype.kind == 'f':
+                df[column] = pd.to_numeric(df[column], downcast='float')
+            elif column in categorical:
+                df[column] = df[column].astype('category')
+        return df
+
+    def iter_csv_chunks(self, path, schema=None, sketches=None, columns=None):
+        dtypes, categorical = schema if schema is not None else self.infer_schema(path)
+        reader = pd.read_csv(path, dtype=dtypes, chunksize=self.chunksize, usecols=columns, **self._csv_options(path))
+        for chunk in reader:
+            chunk = self.optimize(chunk, categorical)
+            if sketches is not None:
+                sketches.update(chunk)
+            yield chunk
+
+    def read_csv(self, path, sketches=None):
+        schema = self.infer_schema(path)
+        try:
+            chunks = list(self.iter_csv_chunks(path, schema, sketches))
+        except ValueError:
+            # The sample guessed a numeric dtype the rest of the file does not honour
+            if sketches is not None:
+                sketches.reset()
+            chunks = list(self.iter_csv_chunks(path, ({}, schema[1]), sketches))
+        if not chunks:
+            return pd.read_csv(path, **self._csv_options(path))
+        if len(chunks) == 1:
+            return chunks[0]
+
+        columns = {}
+        for column in chunks[0].columns:
+            parts = [chunk[column] for chunk in chunks]
+            if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+                columns[column] = pd.Series(union_categoricals(parts), name=column)
+            else:
+                columns[column] = pd.concat(parts, ignore_index=True)
+            for chunk in chunks:
+                del chunk[column]
+        return pd.DataFrame(columns)
+
+    def _require_pyarrow(self, module, kind):
+        # Parquet and Feather need the optional pyarrow package
+        reader = optional_module(module)
+        if reader is None:
+            raise ImportError(f'Reading {kind} files requires pyarrow')
+        return reader
+
+    def _table_to_pandas(self, table):
+        # Let Arrow hand over column buffers instead of consolidating into blocks
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        categorical = [column for column in df.columns if df[column].dtype == object
+                       and self._is_low_cardinality(df[column].head(self.sample_rows))]
+        return self.optimize(df, categorical)
+
+    def iter_chunks(self, path, columns=None):
+        # At most chunksize rows of the requested columns in memory at a time, whatever the file format
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            pq = self._require_pyarrow('pyarrow.parquet', 'Parquet')
+            batches = pq.ParquetFile(path, memory_map=self.memory_map).iter_batches(
+                batch_size=self.chunksize, columns=columns
+            )
+        elif extension in FEATHER_EXTENSIONS:
+            pa = self._require_pyarrow('pyarrow', 'Feather')
+            reader = pa.ipc.open_file(pa.memory_map(path) if self.memory_map else pa.OSFile(path))
+            batches = (reader.get_batch(position) for position in range(reader.num_record_batches))
+        else:
+            dtypes, _ = self.infer_schema(path)
+            # Only text columns are pinned, a numeric guess from the sample could fail on a later chunk
+            schema = ({column: dtype for column, dtype in dtypes.items() if dtype == 'object'}, ())
+            yield from self.iter_csv_chunks(path, schema, columns=columns)
+            return
+        for batch in batches:
+            # Feather files keep the record batches they were written with, often one for the whole table
+            for offset in range(0, batch.num_rows, self.chunksize):
+                chunk = batch.slice(offset, self.chunksize).to_pandas()
+                yield self.optimize(chunk[columns] if columns is not None else chunk)
+
+    def read_parquet(self, path):
+        pq = self._require_pyarrow('pyarrow.parquet', 'Parquet')
+        return self._table_to_pandas(pq.read_table(path, memory_map=self.memory_map))
+
+    def read_feather(self, path):
+        feather = self._require_pyarrow('pyarrow.feather', 'Feather')
+        return self._table_to_pandas(feather.read_table(path, memory_map=self.memory_map))
+
@@ -1,18 +1,66 @@
 import numpy as np
-from sklearn.linear_model import LogisticRegression, LinearRegression
-from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.svm import SVC, SVR
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    mean_squared_error, mean_absolute_error, r2_score
-)
+from utils.lazy_import import import_object
+
+# Estimators are imported on first use so importing the app stays cheap
+ESTIMATORS = {
+    'classification': {
+        'logistic': 'sklearn.linear_model:LogisticRegression',
+        'decision_tree': 'sklearn.tree:DecisionTreeClassifier',
+        'random_forest': 'sklearn.ensemble:RandomForestClassifier',
+        'svm': 'sklearn.svm:SVC',
+        'sgd': 'sklearn.linear_model:SGDClassifier',
+        'naive_bayes': 'sklearn.naive_bayes:GaussianNB'
+    },
+    'regression': {
+        'linear': 'sklearn.linear_model:LinearRegression',
+        'decision_tree': 'sklearn.tree:DecisionTreeRegressor',
+        'random_forest': 'sklearn.ensemble:RandomForestRegressor',
+        'svm': 'sklearn.svm:SVR',
+        'sgd': 'sklearn.linear_model:SGDRegressor'
+    },
+    'clustering': {
+        'minibatch_kmeans': 'sklearn.cluster:MiniBatchKMeans'
+    }
+}
+# Estimators with partial_fit, they can also be trained chunk by chunk from the dataset file
+INCREMENTAL_ALGORITHMS = ('sgd', 'naive_bayes', 'minibatch_kmeans')
+
+def score_predictions(model_type, y_test, y_pred):
+    sk_metrics = import_object('sklearn.metrics')
+    
+    if model_type == 'classification':
+        metrics = {
+            'accuracy': sk_metrics.accuracy_score(y_test, y_pred),
+            'precision': sk_metrics.precision_score(y_test, y_pred, average='weighted'),
+            'recall': sk_metrics.recall_score(y_test, y_pred, average='weighted'),
+            'f1': sk_metrics.f1_score(y_test, y_pred, average='weighted')
+        }
+    elif model_type == 'clustering':
+        # Agreement of the clusters with the given labels
+        metrics = {
+            'adjusted_rand': sk_metrics.adjusted_rand_score(y_test, y_pred),
+            'normalized_mutual_info': sk_metrics.normalized_mutual_info_score(y_test, y_pred),
+            'homogeneity': sk_metrics.homogeneity_score(y_test, y_pred)
+        }
+    else:  # regression
+        metrics = {
+            'mse': sk_metrics.mean_squared_error(y_test, y_pred),
+            'rmse': np.sqrt(sk_metrics.mean_squared_error(y_test, y_pred)),
+            'mae': sk_metrics.mean_absolute_error(y_test, y_pred),
+            'r2': sk_metrics.r2_score(y_test, y_pred)
+        }
+        
+    return metrics
 
 class MLModel:
     def __init__(self):
         self.model = None
         self.model_type = None
         self.algorithm = None
+        # Estimators fitted by the last cross-validation run, reused for ensembling
+        self.fold_models = []
+        # Compiled preprocessing replayed on raw rows, set when trained from a split
+        self.pipeline = None
         
     def get_model(self, algorithm, model_type, params=None):
         self.algorithm = algorithm
@@ -21,25 +69,11 @@ class MLModel:
         if params is None:
             params = {}
             
-        models = {
-            'classification': {
-                'logistic': LogisticRegression,
-                'decision_tree': DecisionTreeClassifier,
-                'random_forest': RandomForestClassifier,
-                'svm': SVC
-            },
-            'regression': {
-                'linear': LinearRegression,
-                'decision_tree': DecisionTreeRegressor,
-                'random_forest': RandomForestRegressor,
-                'svm': SVR
-            }
-        }
-        
-        model_class = models.get(model_type, {}).get(algorithm)
-        if model_class is None:
+        model_path = ESTIMATORS.get(model_type, {}).get(algorithm)
+        if model_path is None:
             raise ValueError(f"Invalid algorithm '{algorithm}' or model type '{model_type}'")
             
+        model_class = import_object(model_path)
         self.model = model_class(**params)
         return self.model
     
@@ -54,32 +88,65 @@ class MLModel:
         print("model trained")
         return True
     
+    def train_incremental(self, batches, classes=None, epochs=1):
+        # batches yields (X, y) chunks and is iterated once per epoch, y is None for clustering
+        if self.model is None:
+            raise ValueError("Model not initialized. Call get_model first.")
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError(f"Algorithm '{self.algorithm}' cannot be trained incrementally")
+        if self.model_type == 'classification' and classes is None:
+            raise ValueError("classes are required to train a classifier incrementally")
+
+        chunks = 0
+        for _ in range(epochs):
+            for X, y in batches:
+                if len(X) == 0:
+                    continue
+                if self.model_type == 'classification':
+                    self.model.partial_fit(X, y, classes=classes)
+                elif self.model_type == 'clustering':
+                    self.model.partial_fit(X)
+                else:
+                    self.model.partial_fit(X, y)
+                chunks += 1
+        if chunks == 0:
+            raise ValueError("No complete rows to train on")
+        return chunks
+
     def predict(self, X):
         if self.model is None:
             raise ValueError("Model not trained yet")
             
         predictions = self.model.predict(X)
         return predictions.tolist()
+
+    def transform_raw(self, frame):
+        if self.pipeline is None:
+            raise ValueError("Model has no preprocessing pipeline. Train it from a split to predict raw rows.")
+        return self.pipeline.transform(frame)
+
+    def predict_ensemble(self, X):
+        if not self.fold_models:
+            raise ValueError("No cross-validation fold models cached. Evaluate with cv first.")
+
+        if self.model_type == 'regression':
+            return np.mean([model.predict(X) for model in self.fold_models], axis=0).tolist()
+
+        # Soft voting when every fold exposes probabilities over the same classes
+        classes = self.fold_models[0].classes_
+        if all(hasattr(model, 'predict_proba') and np.array_equal(model.classes_, classes)
+               for model in self.fold_models):
+            probabilities = np.mean([model.predict_proba(X) for model in self.fold_models], axis=0)
+            return classes[probabilities.argmax(axis=1)].tolist()
+
+        votes = np.stack([model.predict(X) for model in self.fold_models])
+        labels = np.unique(votes)
+        counts = (votes[..., None] == labels).sum(axis=0)
+        return labels[counts.argmax(axis=1)].tolist()
     
     def evaluate(self, X_test, y_test):
         if self.model is None:
             raise ValueError("Model not trained yet")
             
         y_pred = self.model.predict(X_test)
-        
-        if self.model_type == 'classification':
-            metrics = {
-                'accuracy': accuracy_score(y_test, y_pred),
-                'precision': precision_score(y_test, y_pred, average='weighted'),
-                'recall': recall_score(y_test, y_pred, average='weighted'),
-                'f1': f1_score(y_test, y_pred, average='weighted')
-            }
-        else:  # regression
-            metrics = {
-                'mse': mean_squared_error(y_test, y_pred),
-                'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-                'mae': mean_absolute_error(y_test, y_pred),
-                'r2': r2_score(y_test, y_pred)
-            }
-            
-        return metrics
\ No newline at end of file
+        return score_predictions(self.model_type, y_test, y_pred)
@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from models.ml_models import MLModel
+from models.shared_store import shared_store
+from utils.lazy_import import import_object
+
+MODEL_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class ModelRegistry:
+    def __init__(self, root=None, cache_size=8, shared=shared_store):
+        self.root = root or os.environ.get('MLFLOW_MODEL_DIR', 'api/model_store')
+        self.cache_size = cache_size
+        # Models initialized but not trained yet live here until their first save
+        self._drafts = {}
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        # In shared mode drafts and the current model are files too, so every worker process sees them
+        self.shared = shared is not None
+
+    def _model_dir(self, model_id):
+        if not MODEL_ID_PATTERN.match(model_id):
+            raise LookupError(f"Model '{model_id}' not found")
+        return os.path.join(self.root, model_id)
+
+    def _artifact_path(self, model_id, version):
+        return os.path.join(self._model_dir(model_id), f'v{version}.joblib')
+
+    def _read_meta(self, model_id):
+        path = os.path.join(self._model_dir(model_id), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, model_id, meta):
+        path = os.path.join(self._model_dir(model_id), 'meta.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _dump(self, ml_model, path):
+        # Uncompressed dumps so NumPy arrays can be memory-mapped on load
+        import_object('joblib').dump({
+            'model': ml_model.model,
+            'algorithm': ml_model.algorithm,
+            'model_type': ml_model.model_type,
+            'pipeline': ml_model.pipeline
+        }, f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+
+    def _load(self, path):
+        state = import_object('joblib').load(path, mmap_mode='r')
+        ml_model = MLModel()
+        ml_model.model = state['model']
+        ml_model.algorithm = state['algorithm']
+        ml_model.model_type = state['model_type']
+        ml_model.pipeline = state.get('pipeline')
+        return ml_model
+
+    def _draft_path(self, model_id):
+        return os.path.join(self._model_dir(model_id), 'draft.joblib')
+
+    def _saved_draft(self, model_id):
+        # A draft registered by another worker or released from memory before anyone trained it
+        if not os.path.exists(self._draft_path(model_id)):
+            return None
+        self._drafts[model_id] = self._load(self._draft_path(model_id))
+        return self._drafts[model_id]
+
+    def _remember(self, key, ml_model):
+        self._cache[key] = ml_model
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def register(self, ml_model):
+        model_id = uuid.uuid4().hex
+        with self._lock:
+            self._drafts[model_id] = ml_model
+            if self.shared:
+                os.makedirs(self._model_dir(model_id), exist_ok=True)
+                self._dump(ml_model, self._draft_path(model_id))
+        return model_id
+
+    def release(self, model_id):
+        # Drops a model from memory, an untrained draft is written to disk first so draft() can reload it
+        with self._lock:
+            ml_model = self._drafts.pop(model_id, None)
+            if ml_model is not None and ml_model.model is not None and not self._read_meta(model_id):
+                os.makedirs(self._model_dir(model_id), exist_ok=True)
+                self._dump(ml_model, self._draft_path(model_id))
+            for key in [key for key in self._cache if key[0] == model_id]:
+                del self._cache[key]
+
+    def set_current(self, model_id):
+        # The model requests without a model_id use, shared by all workers in shared mode
+        if self.shared:
+            path = os.path.join(self.root, 'current')
+            os.makedirs(self.root, exist_ok=True)
+            with open(f'{path}.tmp', 'w') as f:
+                f.write(model_id or '')
+            os.replace(f'{path}.tmp', path)
+
+    def current(self):
+        if not self.shared:
+            return None
+        path = os.path.join(self.root, 'current')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return f.read().strip() or None
+
+    def draft(self, model_id):
+        # The working copy that /train fits, rebuilt from the latest version after a restart. It keeps the
+        # fitted estimator like save() does, training always fits a clone and get() may return the draft
+        with self._lock:
+            if model_id not in self._drafts and self._saved_draft(model_id) is None:
+                saved = self.get(model_id)
+                ml_model = MLModel()
+                ml_model.model = saved.model
+                ml_model.algorithm = saved.algorithm
+                ml_model.model_type = saved.model_type
+                ml_model.pipeline = saved.pipeline
+                self._drafts[model_id] = ml_model
+            return self._drafts[model_id]
+
+    def save(self, model_id, ml_model, **metadata):
+        with self._lock:
+            os.makedirs(self._model_dir(model_id), exist_ok=True)
+            meta = self._read_meta(model_id) or {
+                'model_id': model_id,
+                'algorithm': ml_model.algorithm,
+                'model_type': ml_model.model_type,
+                'versions': []
+            }
+            version = len(meta['versions']) + 1
+            self._dump(ml_model, self._artifact_path(model_id, version))
+            meta['versions'].append({'version': version, 'saved_at': time.time(), **metadata})
+            self._write_meta(model_id, meta)
+            if os.path.exists(self._draft_path(model_id)):
+                # From now on drafts are rebuilt from the latest version
+                os.remove(self._draft_path(model_id))
+            self._drafts[model_id] = ml_model
+            # Versions hold their own wrapper so retraining the draft leaves them untouched
+            saved = MLModel()
+            saved.model = ml_model.model
+            saved.algorithm = ml_model.algorithm
+            saved.model_type = ml_model.model_type
+            saved.pipeline = ml_model.pipeline
+            self._remember((model_id, version), saved)
+            return version
+
+    def get(self, model_id, version=None):
+        with self._lock:
+            if version is None:
+                # Another worker may have trained a newer version than this process's draft
+                if model_id in self._drafts and not self.shared:
+                    return self._drafts[model_id]
+                meta = self._read_meta(model_id)
+                if meta is None or not meta['versions']:
+                    draft = self._drafts.get(model_id) or self._saved_draft(model_id)
+                    if draft is not None:
+                        return draft
+                    raise LookupError(f"Model '{model_id}' not found")
+                version = meta['versions'][-1]['version']
+            version = int(version)
+
+            key = (model_id, version)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            path = self._artifact_path(model_id, version)
+            if not os.path.exists(path):
+                raise LookupError(f"Model '{model_id}' version {version} not found")
+            ml_model = self._load(path)
+            self._remember(key, ml_model)
+            return ml_model
+
+    def describe(self, model_id):
+        with self._lock:
+            meta = self._read_meta(model_id)
+            if meta is None:
+                ml_model = self._drafts.get(model_id) or self._saved_draft(model_id)
+                if ml_model is None:
+                    raise LookupError(f"Model '{model_id}' not found")
+                meta = {
+                    'model_id': model_id,
+                    'algorithm': ml_model.algorithm,
+                    'model_type': ml_model.model_type,
+                    'versions': []
+                }
+            meta['cached_versions'] = sorted(v for m, v in self._cache if m == model_id)
+            return meta
+
+    def list_models(self):
+        with self._lock:
+            models = []
+            saved = set()
+            if os.path.isdir(self.root):
+                for model_id in sorted(os.listdir(self.root)):
+                    draft = os.path.exists(os.path.join(self.root, model_id, 'draft.joblib'))
+                    if MODEL_ID_PATTERN.match(model_id) and (self._read_meta(model_id) or draft):
+                        saved.add(model_id)
+                        models.append(self.describe(model_id))
+            for model_id in self._drafts:
+                if model_id not in saved:
+                    models.append(self.describe(model_id))
+            return models
+
+    def delete(self, model_id):
+        with self._lock:
+            model_dir = self._model_dir(model_id)
+            found = self._drafts.pop(model_id, None) is not None
+            for key in [key for key in self._cache if key[0] == model_id]:
+                del self._cache[key]
+            if os.path.isdir(model_dir):
+                for name in os.listdir(model_dir):
+                    os.remove(os.path.join(model_dir, name))
+                os.rmdir(model_dir)
+                found = True
+            if not found:
+                raise LookupError(f"Model '{model_id}' not found")
+            if self.current() == model_id:
+                self.set_current(None)
+
+
+model_registry = ModelRegistry()
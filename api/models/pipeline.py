@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from models.type_conversion import convert_series
+from utils.lazy_import import import_object
+
+
+def _affine(kind, scaler):
+    # Per-column (a, b) so that transform(x) == x * a + b, None for scalers that mix columns
+    if kind == 'standard':
+        scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+        mean = scaler.mean_ if scaler.mean_ is not None else 0.0
+        return 1.0 / scale, -mean / scale
+    if kind == 'minmax':
+        return scaler.scale_, scaler.min_
+    if kind == 'robust':
+        scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+        center = scaler.center_ if scaler.center_ is not None else 0.0
+        return 1.0 / scale, -center / scale
+    return None
+
+
+def _cast(values, dtype):
+    converted = convert_series(pd.Series(values), dtype, errors='coerce')
+    if pd.api.types.is_numeric_dtype(converted.dtype) and not pd.api.types.is_bool_dtype(converted.dtype):
+        return converted.to_numpy(dtype=np.float64, na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(converted.dtype):
+        return converted.to_numpy()
+    return converted.to_numpy(dtype=object, na_value=None)
+
+
+# Encoders that keep the source column and add one derived column
+ENCODED_SUFFIXES = {'label': 'encoded', 'frequency': 'freq', 'target': 'target'}
+ENCODERS = ('label', 'onehot', 'hashing', 'frequency', 'target')
+
+
+def encoded_columns(step):
+    column = step['column']
+    if step['kind'] == 'onehot':
+        names = [f'{column}_{category}' for category in step['categories']]
+        return names + [f'{column}_other'] if step.get('other') else names
+    if step['kind'] == 'hashing':
+        return [f'{column}_hash_{bucket}' for bucket in range(step['n_features'])]
+    return [f"{column}_{ENCODED_SUFFIXES[step['kind']]}"]
+
+
+def category_codes(values, categories, other=False):
+    # -1 for missing values, and for unseen values unless they go to the "other" bucket
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+    if other:
+        codes[(codes == -1) & ~pd.isna(values)] = len(categories)
+    return codes
+
+
+def hash_codes(values, n_features):
+    # Each distinct value is hashed once, rows pick up their bucket through the factorized codes
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        # All missing, FeatureHasher cannot transform an empty list
+        return np.full(len(codes), -1)
+    hasher = import_object('sklearn.feature_extraction:FeatureHasher')(
+        n_features=n_features, input_type='string', alternate_sign=False
+    )
+    buckets = hasher.transform([[str(value)] for value in uniques]).indices
+    return np.append(buckets, -1)[codes]
+
+
+def lookup_codes(values, categories, table, default):
+    # Category to number mapping, unseen and missing values get the default
+    codes = pd.Categorical(values, categories=categories).codes
+    return np.append(np.asarray(table, dtype=np.float64), default)[codes]
+
+
+def target_means(categories, y, smoothing):
+    # Category means are shrunk towards the overall mean, rare categories mostly get the prior
+    prior = float(y.mean())
+    stats = y.groupby(categories, observed=True).agg(['sum', 'count'])
+    return (stats['sum'] + smoothing * prior) / (stats['count'] + smoothing), prior
+
+
+class PreprocessingPipeline:
+    # Fitted preprocessing steps in the order they were applied to preprocessed_df
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+
+    def record(self, kind, **params):
+        self.steps.append({'kind': kind, **params})
+
+    def copy(self):
+        return PreprocessingPipeline(self.steps)
+
+    def reset(self):
+        self.steps = []
+
+    def describe(self):
+        described = []
+        for step in self.steps:
+            entry = {'kind': step['kind']}
+            for key in ('column', 'columns', 'dtype', 'method'):
+                if key in step:
+                    entry[key] = step[key]
+            described.append(entry)
+        return described
+
+    def compile(self, features):
+        return CompiledPipeline(self.steps, features)
+
+    def row_filters(self):
+        # (column, steps before it) for each remove step, a row goes if the column is missing at that point
+        return [
+            (step['column'], CompiledPipeline(self.steps[:position], [step['column']]))
+            for position, step in enumerate(self.steps) if step['kind'] == 'drop_rows'
+        ]
+
+
+class CompiledPipeline:
+    def __init__(self, steps, features):
+        self.features = list(features)
+        kept, self.inputs = self._prune(steps, self.features)
+        self.ops = self._fuse(kept)
+
+    @staticmethod
+    def _prune(steps, features):
+        # Walk backwards from the model features and keep only the steps that feed them
+        needed = set(features)
+        kept = []
+        for step in reversed(steps):
+            kind = step['kind']
+            if kind in ('fill', 'cast'):
+                if step['column'] in needed:
+                    kept.append(step)
+            elif kind in ENCODERS:
+                outputs = set(encoded_columns(step))
+                if outputs & needed:
+                    kept.append(step)
+                    needed -= outputs
+                    needed.add(step['column'])
+            elif kind == 'scale':
+                touched = [column for column in step['columns'] if column in needed]
+                if not touched:
+                    continue
+                affine = _affine(step['method'], step['scaler'])
+                if affine is None:
+                    kept.append(step)
+                    needed.update(step['columns'])
+                    continue
+                a = np.broadcast_to(affine[0], len(step['columns']))
+                b = np.broadcast_to(affine[1], len(step['columns']))
+                positions = [step['columns'].index(column) for column in touched]
+                kept.append({
+                    'kind': 'affine',
+                    'columns': touched,
+                    'a': [float(a[position]) for position in positions],
+                    'b': [float(b[position]) for position in positions]
+                })
+            # Column drops and row removal have nothing to replay on incoming rows
+        kept.reverse()
+        return kept, needed
+
+    @staticmethod
+    def _fuse(steps):
+        # Consecutive affine scalings of a column collapse into one multiply-add
+        ops = []
+        pending = {}
+
+        def flush(columns):
+            for column in columns:
+                if column in pending:
+                    a, b = pending.pop(column)
+                    ops.append(('affine', column, a, b))
+
+        for step in steps:
+            kind = step['kind']
+            if kind == 'affine':
+                for column, a, b in zip(step['columns'], step['a'], step['b']):
+                    prev_a, prev_b = pending.get(column, (1.0, 0.0))
+                    pending[column] = (prev_a * a, prev_b * a + b)
+            elif kind == 'scale':
+                flush(step['columns'])
+                ops.append(('scaler', step['columns'], step['scaler']))
+            else:
+                flush([step['column']])
+                ops.append((kind, step))
+        flush(list(pending))
+        return ops
+
+    def transform(self, frame):
+        columns = self.apply(frame)
+        return np.column_stack([np.asarray(columns[feature], dtype=np.float64) for feature in self.features])
+
+    def apply(self, frame):
+        # Every input and derived column as a NumPy array, transform() stacks the features of them
+        missing = [column for column in self.inputs if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing input column(s): {', '.join(sorted(missing))}")
+
+        columns = {column: frame[column].to_numpy() for column in self.inputs}
+        for op in self.ops:
+            kind = op[0]
+            if kind == 'affine':
+                _, column, a, b = op
+                columns[column] = columns[column].astype(np.float64) * a + b
+            elif kind == 'scaler':
+                _, names, scaler = op
+                block = scaler.transform(pd.DataFrame({name: columns[name] for name in names}))
+                for position, name in enumerate(names):
+                    columns[name] = block[:, position]
+            else:
+                step = op[1]
+                column = step['column']
+                values = columns[column]
+                if kind == 'fill':
+                    mask = pd.isna(values)
+                    if mask.any():
+                        values = values.copy()
+                        values[mask] = step['value']
+                    columns[column] = values
+                elif kind == 'cast':
+                    columns[column] = _cast(values, step['dtype'])
+                elif kind == 'label':
+                    # Unseen categories map to -1 instead of failing the whole batch
+                    columns[f'{column}_encoded'] = pd.Categorical(values, categories=step['classes']).codes
+                elif kind in ('onehot', 'hashing'):
+                    if kind == 'onehot':
+                        codes = category_codes(values, step['categories'], step.get('other', False))
+                    else:
+                        codes = hash_codes(values, step['n_features'])
+                    for position, name in enumerate(encoded_columns(step)):
+                        columns[name] = codes == position
+                elif kind in ('frequency', 'target'):
+                    columns[encoded_columns(step)[0]] = lookup_codes(
+                        values, step['categories'], step['table'], step['default']
+                    )
+        return columns
@@ -0,0 +1,178 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Latencies of the most recent requests kept for percentile reporting
+STATS_WINDOW = 10_000
+# A request gives up waiting for its batch after this long instead of hanging its thread
+PREDICT_TIMEOUT_SECONDS = float(os.environ.get('MLFLOW_PREDICT_TIMEOUT_SECONDS', 60))
+
+
+class PendingPrediction:
+    def __init__(self, ml_model, X, ensemble):
+        self.ml_model = ml_model
+        self.X = X
+        self.ensemble = ensemble
+        self.submitted_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PredictionBatcher:
+    def __init__(self, max_batch_size=1024, max_wait_ms=2.0, timeout=PREDICT_TIMEOUT_SECONDS):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=STATS_WINDOW)
+        self._completed = deque(maxlen=STATS_WINDOW)
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._requests = 0
+        self._rows = 0
+        self._batches = 0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+                self._worker.start()
+
+    def predict(self, ml_model, X, ensemble=False):
+        # Blocks the calling request thread until its rows come back from a shared batch
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2:
+            raise ValueError('Features must be one row or a list of rows')
+        pending = PendingPrediction(ml_model, X, ensemble)
+        self._ensure_worker()
+        self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            raise TimeoutError(f'Prediction did not finish within {self.timeout:g} seconds')
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0].X)
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.X)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                # Only requests for the same model and feature count can share a predict call
+                groups = {}
+                for pending in batch:
+                    key = (id(pending.ml_model), pending.ensemble, pending.X.shape[1])
+                    groups.setdefault(key, []).append(pending)
+                for group in groups.values():
+                    self._predict_group(group)
+            except Exception as e:
+                # Fails the requests of this batch, the worker keeps serving the next one
+                for pending in batch:
+                    if not pending.done.is_set():
+                        pending.error = e
+                        pending.done.set()
+
+    def _predict(self, group):
+        ml_model, ensemble = group[0].ml_model, group[0].ensemble
+        X = group[0].X if len(group) == 1 else np.concatenate([pending.X for pending in group])
+        predictions = ml_model.predict_ensemble(X) if ensemble else ml_model.predict(X)
+        start = 0
+        for pending in group:
+            pending.result = predictions[start:start + len(pending.X)]
+            start += len(pending.X)
+
+    def _predict_group(self, group):
+        rows = sum(len(pending.X) for pending in group)
+        try:
+            self._predict(group)
+        except Exception as e:
+            if len(group) == 1:
+                group[0].error = e
+            else:
+                # One bad payload must not fail the requests it was coalesced with, so each is retried alone
+                for pending in group:
+                    try:
+                        self._predict([pending])
+                    except Exception as single_error:
+                        pending.error = single_error
+
+        finished_at = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._batch_sizes.append(rows)
+            self._requests += len(group)
+            self._rows += rows
+            for pending in group:
+                self._latencies.append(finished_at - pending.submitted_at)
+                self._completed.append((finished_at, len(pending.X)))
+        for pending in group:
+            pending.done.set()
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            completed = list(self._completed)
+            batch_sizes = list(self._batch_sizes)
+            totals = {'requests': self._requests, 'rows': self._rows, 'batches': self._batches}
+
+        # Throughput over the window of recent requests
+        if len(completed) > 1:
+            elapsed = completed[-1][0] - completed[0][0]
+            rows = sum(n for _, n in completed[1:])
+            throughput = {
+                'requests_per_second': (len(completed) - 1) / elapsed if elapsed else None,
+                'rows_per_second': rows / elapsed if elapsed else None
+            }
+        else:
+            throughput = {'requests_per_second': None, 'rows_per_second': None}
+
+        return {
+            **totals,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'mean_batch_rows': float(np.mean(batch_sizes)) if batch_sizes else None,
+            'latency_ms': {
+                'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'max': float(latencies.max()) if len(latencies) else None
+            },
+            **throughput
+        }
+
+    def configure(self, max_batch_size=None, max_wait_ms=None):
+        if max_batch_size is not None:
+            if max_batch_size < 1:
+                raise ValueError('max_batch_size must be at least 1')
+            self.max_batch_size = max_batch_size
+        if max_wait_ms is not None:
+            if max_wait_ms < 0:
+                raise ValueError('max_wait_ms must not be negative')
+            self.max_wait_ms = max_wait_ms
+
+
+prediction_batcher = PredictionBatcher(
+    max_batch_size=int(os.environ.get('MLFLOW_MAX_BATCH_SIZE', 1024)),
+    max_wait_ms=float(os.environ.get('MLFLOW_MAX_BATCH_WAIT_MS', 2.0))
+)
@@ -1,30 +1,40 @@
+import os
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, StandardScaler, MinMaxScaler, RobustScaler, Normalizer, QuantileTransformer
-from sklearn.model_selection import train_test_split
+from utils.serialization import column_to_list, prepare_records
+from models.pipeline import (
+    PreprocessingPipeline, category_codes, encoded_columns, hash_codes, lookup_codes, target_means
+)
+from models.split_store import split_store
+from models.type_conversion import convert_columns
+from utils.lazy_import import import_object
+
+# Scalers are imported on first use so importing the app stays cheap
+SCALERS = {
+    'standard': ('sklearn.preprocessing:StandardScaler', {}),
+    'minmax': ('sklearn.preprocessing:MinMaxScaler', {}),
+    'robust': ('sklearn.preprocessing:RobustScaler', {}),
+    'normalizer': ('sklearn.preprocessing:Normalizer', {}),
+    'quantile': ('sklearn.preprocessing:QuantileTransformer', {'output_distribution': 'normal'})
+}
+
+# One-hot encoding refuses columns with more categories than this unless top_k is given
+MAX_ONEHOT_CATEGORIES = int(os.environ.get('MLFLOW_MAX_ONEHOT_CATEGORIES', 200))
+# Target encoding of the frame is fitted out of fold over this many folds
+TARGET_ENCODING_FOLDS = 5
 
 
 class DataPreprocessor:
-    def __init__(self, df):
+    def __init__(self, df, pipeline=None):
         self.df = df
         self.label_encoders = {}
         self.scalers = {}
-
-    def _convert_to_json_serializable(self, value):
-        if pd.isna(value):
-            return None
-        if isinstance(value, (np.int64, np.int32, np.int16, np.int8)):
-            return int(value)
-        if isinstance(value, (np.float64, np.float32, np.float16)):
-            return float(value)
-        if isinstance(value, np.bool_):
-            return bool(value)
-        return value
+        # Fitted steps are recorded here so they can be replayed on raw rows at predict time
+        self.pipeline = pipeline if pipeline is not None else PreprocessingPipeline()
 
     def _prepare_records(self, df):
-        records = df.to_dict('records')
-        return [{k: self._convert_to_json_serializable(v) for k, v in record.items()} 
-                for record in records]
+        return prepare_records(df)
 
     def get_head(self, n=5):
         head_data = self.df.head(n)
@@ -56,32 +66,16 @@ class DataPreprocessor:
             ]
         }
 
-    def update_column_type(self, column, dtype):
+    def update_column_type(self, columns, dtype):
+        # Strict conversion, values that do not convert cleanly fail the whole request
+        columns = [columns] if isinstance(columns, str) else list(columns)
         try:
-            if dtype == 'int64':
-                # First convert to float to handle any NaN values
-                self.df[column] = pd.to_numeric(
-                    self.df[column], errors='raise')
-                # Then convert to int if all values are whole numbers
-                if self.df[column].dropna().apply(float.is_integer).all():
-                    self.df[column] = self.df[column].astype(
-                        'Int64')  # nullable integer type
-                else:
-                    raise ValueError("Column contains non-integer values")
-            elif dtype == 'float64':
-                self.df[column] = pd.to_numeric(
-                    self.df[column], errors='raise')
-            elif dtype == 'datetime':
-                self.df[column] = pd.to_datetime(
-                    self.df[column], errors='raise')
-            else:
-                self.df[column] = self.df[column].astype(
-                    dtype)
-
+            new_types = self.cast_columns(columns, dtype, errors='raise')
             return {
-                'message': f'Column {column} type updated to {dtype}',
+                'message': f"Column {', '.join(columns)} type updated to {dtype}",
                 'success': True,
-                'new_type': str(self.df[column].dtype)
+                'new_type': new_types[columns[0]],
+                'new_types': new_types
             }
         except ValueError as e:
             return {
@@ -97,97 +91,244 @@ class DataPreprocessor:
             }
 
     def handle_missing_values(self, column, method='mean'):
-        if method == 'mean':
-            value = self.df[column].mean()
-        elif method == 'median':
-            value = self.df[column].median()
-        elif method == 'mode':
-            value = self.df[column].mode()[0]
-        elif method == 'remove':
+        if method == 'remove':
             self.df.dropna(subset=[column], inplace=True)
+            self.pipeline.record('drop_rows', column=column)
             return {'message': f'Rows with NaN in {column} removed'}
 
-        if method != 'remove':
-            self.df[column].fillna(value, inplace=True)
+        self.fill_missing({column: method})
         return {'message': f'Missing values in {column} handled using {method}'}
 
+    def fill_missing(self, methods):
+        # Fill values for several columns are computed first and applied in one fillna pass
+        values = {}
+        for column, method in methods.items():
+            if method == 'mean':
+                values[column] = self.df[column].mean()
+            elif method == 'median':
+                values[column] = self.df[column].median()
+            elif method == 'mode':
+                values[column] = self.df[column].mode()[0]
+            else:
+                raise ValueError(f"Invalid missing value method '{method}'")
+        self.df = self.df.fillna(values)
+        for column, value in values.items():
+            self.pipeline.record('fill', column=column, method=methods[column], value=value)
+
     def delete_column(self, column):
         if column in self.df.columns:
             self.df.drop(columns=[column], inplace=True)
+            self.pipeline.record('drop', column=column)
             return {'message': f'Column {column} deleted successfully'}
         return {'error': f'Column {column} not found'}
 
+    def delete_columns(self, columns):
+        missing = [column for column in columns if column not in self.df.columns]
+        if missing:
+            return {'error': f"Column(s) {', '.join(missing)} not found"}
+        self.df.drop(columns=columns, inplace=True)
+        for column in columns:
+            self.pipeline.record('drop', column=column)
+        return {'message': f"Columns {', '.join(columns)} deleted successfully"}
+
+    def cast_column(self, column, dtype):
+        return self.cast_columns([column], dtype)[column]
+
+    def cast_columns(self, columns, dtype, errors='coerce'):
+        self.df = convert_columns(self.df, columns, dtype, errors)
+        for column in columns:
+            self.pipeline.record('cast', column=column, dtype=dtype)
+        return {column: str(self.df[column].dtype) for column in columns}
+
     def get_column_values(self, column1, column2=None):
         print("colum ",column1,column2)
         if column2:
             return {
-                'column1': self.df[column1].tolist(),
-                'column2': self.df[column2].tolist()
+                'column1': column_to_list(self.df[column1]),
+                'column2': column_to_list(self.df[column2])
             }
-        return {'values': self.df[column1].tolist()}
+        return {'values': column_to_list(self.df[column1])}
 
-    def encode_categorical(self, column, method='label'):
+    def encode_categorical(self, column, method='label', sparse=False, top_k=None, max_categories=None,
+                           n_features=32, target=None, smoothing=10.0):
+        if column not in self.df.columns:
+            # e.g. a column an earlier one-hot or hashing step already replaced
+            raise ValueError(f"Column '{column}' not found")
         if method == 'label':
-            le = LabelEncoder()
+            le = import_object('sklearn.preprocessing:LabelEncoder')()
             self.df[f'{column}_encoded'] = le.fit_transform(self.df[column])
             self.label_encoders[column] = le
-            return {'message': f'Label encoding applied to {column}'}
+            self.pipeline.record('label', column=column, method=method, classes=le.classes_)
+            return {'message': f'Label encoding applied to {column}', 'columns': [f'{column}_encoded']}
         elif method == 'onehot':
-            encoded = pd.get_dummies(self.df[column], prefix=column)
-            self.df = pd.concat([self.df, encoded], axis=1)
-            self.df.drop(columns=[column], inplace=True)
-            return {'message': f'One-hot encoding applied to {column}'}
-        return {'error': 'Invalid encoding method'}
+            values = self.df[column]
+            categories = values.astype('category').cat.categories
+            other = False
+            if top_k is not None:
+                if int(top_k) < 1:
+                    return {'error': 'top_k must be a positive integer'}
+                # The most frequent categories keep their own column, the rest share one
+                frequent = values.value_counts().index[:int(top_k)]
+                other = len(categories) > len(frequent)
+                categories = categories[categories.isin(frequent)]
+            else:
+                limit = int(max_categories or MAX_ONEHOT_CATEGORIES)
+                if len(categories) > limit:
+                    return {'error': f'{column} has {len(categories)} categories, more than the one-hot limit of '
+                                     f'{limit}. Use top_k, hashing or frequency encoding, or raise max_categories.'}
+            step = {'kind': 'onehot', 'column': column, 'method': method,
+                    'categories': categories.tolist(), 'other': other}
+            codes = category_codes(values, categories, other)
+        elif method == 'hashing':
+            if int(n_features) < 1:
+                return {'error': 'n_features must be a positive integer'}
+            step = {'kind': 'hashing', 'column': column, 'method': method, 'n_features': int(n_features)}
+            codes = hash_codes(self.df[column], int(n_features))
+        elif method == 'frequency':
+            frequencies = self.df[column].value_counts(normalize=True)
+            return self._encode_lookup('frequency', column, frequencies, 0.0)
+        elif method == 'target':
+            if target is None or target not in self.df.columns:
+                return {'error': 'Target encoding needs an existing target column'}
+            y = self.df[target]
+            if not pd.api.types.is_numeric_dtype(y):
+                return {'error': f'Target encoding needs a numeric target, {target} is {y.dtype}'}
+            # The recorded step uses every row, it only encodes rows that arrive at predict time
+            means, prior = target_means(self.df[column], y, float(smoothing))
+            values = self._out_of_fold_target(self.df[column], y, float(smoothing))
+            return self._encode_lookup('target', column, means, prior, values=values,
+                                       target=target, smoothing=float(smoothing))
+        else:
+            return {'error': 'Invalid encoding method'}
+
+        # One-hot and hashing replace the column with one indicator column per code
+        names = encoded_columns(step)
+        encoded = self._indicator_frame(codes, names, bool(sparse))
+        self.df = pd.concat([self.df.drop(columns=[column]), encoded], axis=1)
+        self.pipeline.record(**step)
+        label = 'One-hot' if method == 'onehot' else 'Hashing'
+        return {
+            'message': f'{label} encoding applied to {column}',
+            'columns': names,
+            'sparse': bool(sparse)
+        }
+
+    def _indicator_frame(self, codes, names, sparse):
+        if not sparse:
+            return pd.DataFrame(codes[:, None] == np.arange(len(names)), index=self.df.index, columns=names)
+        # Only the set entries are stored, one per row at most
+        rows = np.flatnonzero(codes >= 0)
+        matrix = import_object('scipy.sparse:csc_matrix')(
+            (np.ones(len(rows), dtype=np.uint8), (rows, codes[rows])), shape=(len(codes), len(names))
+        )
+        return pd.DataFrame.sparse.from_spmatrix(matrix, index=self.df.index, columns=names)
+
+    def _out_of_fold_target(self, categories, y, smoothing):
+        # Each row is encoded with means of the other folds, so its own label never leaks into its feature
+        folds = min(TARGET_ENCODING_FOLDS, len(y))
+        if folds < 2:
+            return None
+        assignment = np.random.default_rng(0).permutation(np.arange(len(y)) % folds)
+        values = np.empty(len(y), dtype=np.float64)
+        for fold in range(folds):
+            held = assignment == fold
+            means, prior = target_means(categories[~held], y[~held], smoothing)
+            values[held] = lookup_codes(categories[held], means.index.tolist(), means.to_numpy(dtype=np.float64), prior)
+        return values
+
+    def _encode_lookup(self, kind, column, mapping, default, values=None, **params):
+        step = {
+            'kind': kind, 'column': column, 'method': kind,
+            'categories': mapping.index.tolist(), 'table': mapping.to_numpy(dtype=np.float64),
+            'default': default, **params
+        }
+        name = encoded_columns(step)[0]
+        if values is None:
+            values = lookup_codes(self.df[column], step['categories'], step['table'], default)
+        self.df[name] = values
+        self.pipeline.record(**step)
+        return {'message': f'{kind.capitalize()} encoding applied to {column}', 'columns': [name]}
 
     def scale_features(self, columns, method='standard'):
         try:
-            if method == 'standard':
-                scaler = StandardScaler()
-            elif method == 'minmax':
-                scaler = MinMaxScaler()
-            elif method == 'robust':
-                scaler = RobustScaler()
-            elif method == 'normalizer':
-                scaler = Normalizer()
-            elif method == 'quantile':
-                scaler = QuantileTransformer(output_distribution='normal')
-            else:
+            if method not in SCALERS:
                 return {'error': 'Invalid scaling method'}
+            scaler_path, scaler_params = SCALERS[method]
+            scaler = import_object(scaler_path)(**scaler_params)
 
             self.df[columns] = scaler.fit_transform(self.df[columns])
             self.scalers[tuple(columns)] = scaler
+            self.pipeline.record('scale', columns=list(columns), method=method, scaler=scaler)
             return {'message': f'{method} scaling applied to {columns}'}
         except Exception as e:
             return {'error': str(e)}
 
-    def split_data(self, test_size=0.2, random_state=42, shuffle=True, stratify=False, features=None, target=None):
+    def _to_array(self, frame):
+        sparse_columns = [name for name, dtype in frame.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+        if sparse_columns:
+            return self._to_sparse_matrix(frame, sparse_columns)
+        if all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+            return frame.to_numpy(dtype=np.float64, na_value=np.nan)
+        return frame.to_numpy()
+
+    def _to_sparse_matrix(self, frame, sparse_columns):
+        # Sparse encoded columns reach the model as CSR without being densified
+        sp = import_object('scipy.sparse')
+        dense_columns = [name for name in frame.columns if name not in set(sparse_columns)]
+        blocks = [frame[sparse_columns].sparse.to_coo()]
+        if dense_columns:
+            blocks.append(sp.csr_matrix(frame[dense_columns].to_numpy(dtype=np.float64, na_value=np.nan)))
+        matrix = sp.hstack(blocks, format='csr', dtype=np.float64)
+        positions = {name: position for position, name in enumerate(sparse_columns + dense_columns)}
+        return matrix[:, [positions[name] for name in frame.columns]]
+
+    def split_data(self, test_size=0.2, random_state=42, shuffle=True, stratify=False, features=None, target=None, include_data=True):
         try:
             if features is None or target is None:
                 raise ValueError("Features and target must be specified")
 
             X = self.df[features]
             y = self.df[target]
+            if isinstance(y, pd.DataFrame):
+                y = y.iloc[:, 0]
 
             stratify_param = y if stratify else None
 
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y,
+            # Split row positions so the feature matrix is sliced once as NumPy
+            train_test_split = import_object('sklearn.model_selection:train_test_split')
+            train_idx, test_idx = train_test_split(
+                np.arange(len(X)),
                 test_size=test_size,
                 random_state=random_state,
                 shuffle=shuffle,
                 stratify=stratify_param
             )
 
-            return {
-                'X_train': X_train.to_dict('records'),
-                'X_test': X_test.to_dict('records'),
-                'y_train': y_train.tolist(),
-                'y_test': y_test.tolist(),
-                'train_size': len(X_train),
-                'test_size': len(X_test),
+            X_arr = self._to_array(X)
+            y_arr = y.to_numpy()
+            split_id = split_store.save(
+                X_arr[train_idx], X_arr[test_idx],
+                y_arr[train_idx], y_arr[test_idx],
+                features, target,
+                # Models trained on this split replay exactly these steps on raw rows
+                pipeline=self.pipeline.compile(features)
+            )
+
+            result = {
+                'split_id': split_id,
+                'train_size': len(train_idx),
+                'test_size': len(test_idx),
                 'features': features,
                 'target': target
             }
+            if include_data:
+                result.update({
+                    'X_train': self._prepare_records(X.iloc[train_idx]),
+                    'X_test': self._prepare_records(X.iloc[test_idx]),
+                    'y_train': column_to_list(y.iloc[train_idx]),
+                    'y_test': column_to_list(y.iloc[test_idx])
+                })
+            return result
         except Exception as e:
             raise ValueError(f"Error splitting dataset: {str(e)}")
 
@@ -0,0 +1,262 @@
+import fcntl
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from utils.lazy_import import import_object
+from utils.storage import private_directory
+
+# Serving mode for several worker processes, enabled by pointing MLFLOW_SHARED_DIR at a local directory
+SHARED_DIR_ENV = 'MLFLOW_SHARED_DIR'
+# Generations older than this are deleted, workers still holding their columns keep the mapping
+KEEP_GENERATIONS = 2
+ATTACH_RETRIES = 5
+# NumPy dtypes written as .npy files and memory-mapped by readers, other columns are pickled in others.pkl
+MAPPED_KINDS = 'biufcmM'
+GENERATION_PATTERN = re.compile(r'^g(\d+)$')
+
+
+class VersionCounter:
+    # 8-byte generation number in a memory-mapped file, read by every worker without locking
+    def __init__(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._map = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+
+    def get(self):
+        return struct.unpack_from('<q', self._map)[0]
+
+    def set(self, value):
+        struct.pack_into('<q', self._map, 0, value)
+
+
+def _mapped(series):
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in MAPPED_KINDS
+
+
+def write_frame(df, path, reuse=None):
+    # reuse maps column names to .npy files of the previous generation holding the same data
+    os.makedirs(path)
+    names = list(df.columns)
+    files = []
+    others = {}
+    for position in range(len(names)):
+        series = df.iloc[:, position]
+        if not _mapped(series):
+            files.append(None)
+            others[position] = series
+            continue
+        name = f'c{position}.npy'
+        source = (reuse or {}).get(names[position])
+        if source is not None and os.path.exists(source):
+            # Hard links let consecutive generations share untouched columns on disk
+            os.link(source, os.path.join(path, name))
+        else:
+            np.save(os.path.join(path, name), series.to_numpy(), allow_pickle=False)
+        files.append(name)
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        index_meta = {'start': index.start, 'stop': index.stop, 'step': index.step, 'name': index.name}
+    else:
+        index_meta = None
+        others['index'] = index
+    if others:
+        pd.to_pickle(others, os.path.join(path, 'others.pkl'))
+    # Layout is plain JSON, only column data NumPy cannot map goes through pickle
+    with open(os.path.join(path, 'frame.json'), 'w') as handle:
+        json.dump({'names': names, 'files': files, 'index': index_meta}, handle)
+    return names, files
+
+
+def read_frame(path):
+    with open(os.path.join(path, 'frame.json')) as handle:
+        meta = json.load(handle)
+    others = {}
+    if meta['index'] is None or None in meta['files']:
+        others = pd.read_pickle(os.path.join(path, 'others.pkl'))
+    if meta['index'] is None:
+        index = others['index']
+    else:
+        index = pd.RangeIndex(meta['index']['start'], meta['index']['stop'], meta['index']['step'],
+                              name=meta['index']['name'])
+    columns = []
+    for position, (name, file) in enumerate(zip(meta['names'], meta['files'])):
+        if file is None:
+            series = others[position]
+        else:
+            # np.asarray keeps the mapping but drops the memmap subclass, so results are plain arrays
+            values = np.asarray(np.load(os.path.join(path, file), mmap_mode='r'))
+            series = pd.Series(values, index=index, copy=False)
+        columns.append(series.rename(name))
+    if not columns:
+        return pd.DataFrame(index=index)
+    # concat keeps one block per column instead of consolidating them into copies
+    return pd.concat(columns, axis=1, copy=False)
+
+
+class SharedDataset:
+    # Published versions of one dataset in root/<dataset_id>, one directory per generation
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.counter = VersionCounter(os.path.join(path, 'version'))
+        self._lock_path = os.path.join(path, 'lock')
+        # flock is per open file, so nested use within this process is tracked here
+        self._local_lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+
+    @contextmanager
+    def exclusive(self):
+        # Cross-process writer lock, reentrant for the thread holding it
+        with self._local_lock:
+            if self._depth == 0:
+                self._lock_file = open(self._lock_path, 'a')
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def version(self):
+        return self.counter.get()
+
+    def _generation_path(self, generation):
+        return os.path.join(self.path, f'g{generation}')
+
+    def _raw_path(self, generation):
+        return os.path.join(self.path, f'raw{generation}')
+
+    def publish(self, df, pipeline_steps, filename, label, raw_df=None, columns=None):
+        # Call under exclusive(), columns lists what changed since the current generation or None
+        previous = self.version()
+        generation = previous + 1
+        state = self._read_state(previous) if previous else None
+        if raw_df is not None or state is None:
+            raw = generation
+            write_frame(raw_df if raw_df is not None else df, f'{self._raw_path(raw)}.tmp')
+            os.rename(f'{self._raw_path(raw)}.tmp', self._raw_path(raw))
+        else:
+            raw = state['raw']
+        reuse = None
+        if state is not None and columns is not None and raw_df is None:
+            unchanged = set(df.columns) - set(columns)
+            reuse = {
+                name: os.path.join(self._generation_path(previous), file)
+                for name, file in zip(state['names'], state['files'])
+                if file is not None and name in unchanged
+            }
+        tmp_path = f'{self._generation_path(generation)}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        names, files = write_frame(df, tmp_path, reuse)
+        with open(os.path.join(tmp_path, 'state.json'), 'w') as handle:
+            json.dump({
+                'generation': generation,
+                'raw': raw,
+                'names': names,
+                'files': files,
+                'filename': filename,
+                'label': label
+            }, handle)
+        # Fitted steps hold NumPy arrays and estimators, stored with joblib like spilled datasets
+        import_object('joblib').dump(list(pipeline_steps or []), os.path.join(tmp_path, 'pipeline.joblib'))
+        os.rename(tmp_path, self._generation_path(generation))
+        # Readers only look at a generation once the counter points at it
+        self.counter.set(generation)
+        self._collect(generation, raw)
+        return generation
+
+    def _read_state(self, generation, pipeline=False):
+        path = self._generation_path(generation)
+        with open(os.path.join(path, 'state.json')) as handle:
+            state = json.load(handle)
+        if pipeline:
+            state['pipeline_steps'] = import_object('joblib').load(os.path.join(path, 'pipeline.joblib'))
+        return state
+
+    def _collect(self, generation, raw):
+        kept = range(generation - KEEP_GENERATIONS + 1, generation + 1)
+        keep_raw = {raw}
+        for older in kept:
+            if older > 0 and older != generation and os.path.isdir(self._generation_path(older)):
+                keep_raw.add(self._read_state(older)['raw'])
+        for name in os.listdir(self.path):
+            match = GENERATION_PATTERN.match(name)
+            if match and int(match.group(1)) not in kept:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+            elif name.startswith('raw') and name[3:].isdigit() and int(name[3:]) not in keep_raw:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def attach(self, raw_generation=None):
+        # Maps the latest generation, raw frame only when it differs from raw_generation
+        for _ in range(ATTACH_RETRIES):
+            generation = self.version()
+            if generation == 0:
+                return None
+            try:
+                state = self._read_state(generation, pipeline=True)
+                state['df'] = read_frame(self._generation_path(generation))
+                state['raw_df'] = None if state['raw'] == raw_generation else read_frame(self._raw_path(state['raw']))
+                return state
+            except FileNotFoundError:
+                # A writer collected this generation while we were reading it
+                continue
+        raise RuntimeError(f'Could not attach to shared dataset in {self.path}')
+
+
+class SharedStore:
+    def __init__(self, root):
+        # Every worker unpickles files from here, so it must belong to the server user alone
+        self.root = private_directory(root)
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        root = os.environ.get(SHARED_DIR_ENV)
+        return cls(root) if root else None
+
+    def dataset(self, dataset_id):
+        with self._lock:
+            if dataset_id not in self._datasets:
+                self._datasets[dataset_id] = SharedDataset(os.path.join(self.root, 'datasets', dataset_id))
+            return self._datasets[dataset_id]
+
+    def has_dataset(self, dataset_id):
+        return os.path.exists(os.path.join(self.root, 'datasets', dataset_id, 'version')) \
+            and self.dataset(dataset_id).version() > 0
+
+    def dataset_ids(self):
+        root = os.path.join(self.root, 'datasets')
+        if not os.path.isdir(root):
+            return []
+        return sorted(name for name in os.listdir(root) if self.has_dataset(name))
+
+    def remove_dataset(self, dataset_id):
+        with self._lock:
+            self._datasets.pop(dataset_id, None)
+        shutil.rmtree(os.path.join(self.root, 'datasets', dataset_id), ignore_errors=True)
+
+    def path(self, *parts):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+
+shared_store = SharedStore.from_env()
@@ -0,0 +1,250 @@
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def _bit_length(values):
+    # Exact bit length of uint64 values, float64 is exact below 2**32
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        high_bits = np.floor(np.log2(high)) + 1
+        low_bits = np.floor(np.log2(low)) + 1
+    return np.where(high > 0, 32 + high_bits, np.where(low > 0, low_bits, 0)).astype(np.int64)
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_array(np.asarray(values))
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        remainder = hashes << p
+        # Position of the first set bit in the remaining 64 - p bits
+        ranks = np.minimum(64 - _bit_length(remainder) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, ranks)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is far more accurate for small cardinalities
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class KLLSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        # Empirical normalized rank error bound of KLL for two-sided queries
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd leftover stays behind, the rest is halved and promoted
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantiles(self, fractions):
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return [None] * len(fractions)
+        weights = np.concatenate([np.full(len(values), 2.0 ** level) for level, values in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        targets = np.asarray(fractions) * cumulative[-1]
+        positions = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(items) - 1)
+        return [float(value) for value in items[positions]]
+
+
+class ReservoirSample:
+    def __init__(self, size=1000, seed=None):
+        self.size = size
+        self.seen = 0
+        self.positions = np.empty(0, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, count):
+        # Algorithm R over row positions, vectorized per chunk
+        positions = np.arange(self.seen, self.seen + count, dtype=np.int64)
+        free = max(0, self.size - len(self.positions))
+        self.positions = np.concatenate([self.positions, positions[:free]])
+        rest = positions[free:]
+        if len(rest):
+            slots = (self.rng.random(len(rest)) * (rest + 1)).astype(np.int64)
+            accepted = slots < self.size
+            # Later rows overwrite earlier ones, as in the sequential algorithm
+            self.positions[slots[accepted]] = rest[accepted]
+        self.seen += count
+
+
+class ColumnSketch:
+    def __init__(self, dtype, precision=14, k=200):
+        self.dtype = str(dtype)
+        self.rows = 0
+        self.missing = 0
+        self.numeric = pd.api.types.is_numeric_dtype(dtype)
+        self.distinct = None if self.numeric else HyperLogLog(precision)
+        self.quantiles = KLLSketch(k) if self.numeric else None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, series):
+        mask = series.isna().to_numpy()
+        self.rows += len(series)
+        self.missing += int(mask.sum())
+        if not self.numeric:
+            self.distinct.update(series.to_numpy(dtype=object)[~mask])
+            return
+
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)[~mask]
+        if len(values) == 0:
+            return
+        self.quantiles.update(values)
+        # Chan et al. parallel update keeps mean/variance exact across chunks
+        count, mean = len(values), float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def distinct_count(self):
+        # Missing values count as one value, like len(series.unique())
+        return int(round(self.distinct.estimate())) + (1 if self.missing else 0)
+
+    def describe(self):
+        quartiles = self.quantiles.quantiles([0.25, 0.5, 0.75])
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+        return [float(self.count), self.mean if self.count else None, std,
+                self.min, *quartiles, self.max]
+
+
+class DatasetSketches:
+    def __init__(self, precision=14, k=200, sample_size=1000, chunksize=100_000):
+        self.precision = precision
+        self.k = k
+        self.chunksize = chunksize
+        self.columns = {}
+        self.sample = ReservoirSample(sample_size)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.columns = {}
+            self.sample = ReservoirSample(self.sample.size)
+
+    def update(self, chunk):
+        # Fed one chunk at a time while the dataset loads
+        with self._lock:
+            for column in chunk.columns:
+                sketch = self.columns.get(column)
+                if sketch is None:
+                    sketch = self.columns[column] = ColumnSketch(chunk[column].dtype, self.precision, self.k)
+                sketch.update(chunk[column])
+            self.sample.update(len(chunk))
+
+    def build_column(self, series):
+        sketch = ColumnSketch(series.dtype, self.precision, self.k)
+        for start in range(0, len(series), self.chunksize):
+            sketch.update(series.iloc[start:start + self.chunksize])
+        return sketch
+
+    def copy(self):
+        # Column sketches are never updated after loading, so sharing them is safe
+        other = DatasetSketches(self.precision, self.k, self.sample.size, self.chunksize)
+        other.columns = dict(self.columns)
+        other.sample = self.sample
+        return other
+
+    def sample_positions(self, rows, n):
+        with self._lock:
+            if self.sample.seen != rows:
+                self.sample = ReservoirSample(self.sample.size)
+                self.sample.update(rows)
+            positions = self.sample.positions
+            if n < len(positions):
+                positions = self.sample.rng.choice(positions, n, replace=False)
+            return np.sort(positions)
+
+    def invalidate(self, columns=None):
+        with self._lock:
+            if columns is None:
+                self.columns.clear()
+            else:
+                for column in columns:
+                    self.columns.pop(column, None)
+
+    def get(self, df):
+        with self._lock:
+            sketches = {}
+            for column in df.columns:
+                sketch = self.columns.get(column)
+                series = df[column]
+                if sketch is None or sketch.rows != len(series) or sketch.dtype != str(series.dtype):
+                    sketch = self.columns[column] = self.build_column(series)
+                sketches[column] = sketch
+            return sketches
+
+    def error_bounds(self):
+        return {
+            'distinct_relative_error': 1.04 / math.sqrt(1 << self.precision),
+            'quantile_rank_error': 2.296 / self.k ** 0.9723
+        }
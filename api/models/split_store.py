@@ -0,0 +1,89 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from models.shared_store import shared_store
+from utils.lazy_import import import_object
+
+
+class SplitStore:
+    def __init__(self, max_splits=8, shared=shared_store):
+        self.max_splits = max_splits
+        self._splits = OrderedDict()
+        self._lock = threading.Lock()
+        # With a SharedStore splits are also written to disk so any worker can train on them
+        self.shared = shared
+
+    def _shared_path(self, split_id):
+        return self.shared.path('splits', f'{split_id}.joblib')
+
+    def _publish(self, split_id, split):
+        # Uncompressed so other workers memory-map the arrays instead of reading them
+        path = self._shared_path(split_id)
+        import_object('joblib').dump(split, f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+        try:
+            saved = sorted(
+                (entry for entry in os.scandir(os.path.dirname(path)) if entry.name.endswith('.joblib')),
+                key=lambda entry: entry.stat().st_mtime
+            )
+            for entry in saved[:-self.max_splits]:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            # Another worker pruned the same files
+            pass
+
+    def _attach(self, split_id):
+        if self.shared is None or not split_id.isalnum():
+            return None
+        path = self._shared_path(split_id)
+        if not os.path.exists(path):
+            return None
+        return import_object('joblib').load(path, mmap_mode='r')
+
+    def save(self, X_train, X_test, y_train, y_test, features, target, pipeline=None):
+        split_id = uuid.uuid4().hex
+        split = {
+            'X_train': X_train,
+            'X_test': X_test,
+            'y_train': y_train,
+            'y_test': y_test,
+            'features': list(features),
+            'target': target,
+            'pipeline': pipeline
+        }
+        if self.shared is not None:
+            self._publish(split_id, split)
+        with self._lock:
+            self._splits[split_id] = split
+            # Keep only the most recent splits resident
+            while len(self._splits) > self.max_splits:
+                self._splits.popitem(last=False)
+        return split_id
+
+    def get(self, split_id):
+        with self._lock:
+            split = self._splits.get(split_id)
+            if split is not None:
+                self._splits.move_to_end(split_id)
+                return split
+        split = self._attach(split_id)
+        if split is None:
+            raise LookupError(f"Unknown split_id '{split_id}'. Please split the dataset again.")
+        with self._lock:
+            self._splits[split_id] = split
+            while len(self._splits) > self.max_splits:
+                self._splits.popitem(last=False)
+        return split
+
+    def delete(self, split_id):
+        with self._lock:
+            found = self._splits.pop(split_id, None) is not None
+        if self.shared is not None and split_id.isalnum() and os.path.exists(self._shared_path(split_id)):
+            os.remove(self._shared_path(split_id))
+            found = True
+        return found
+
+
+split_store = SplitStore()
@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+# Ensembles are grown in this many warm-started steps to report progress
+PROGRESS_STEPS = 10
+# Finished jobs stay visible in /jobs for this long, and at most this many of them are kept
+JOB_TTL_SECONDS = float(os.environ.get('MLFLOW_JOB_TTL_SECONDS', 3600))
+MAX_FINISHED_JOBS = int(os.environ.get('MLFLOW_MAX_FINISHED_JOBS', 1000))
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+def _fit_in_steps(estimator, X, y, state):
+    params = estimator.get_params()
+    total = params.get('n_estimators')
+    if 'warm_start' not in params or not isinstance(total, int) or total < 2:
+        estimator.fit(X, y)
+        return estimator
+
+    estimator.set_params(warm_start=True)
+    step = max(1, total // PROGRESS_STEPS)
+    for n_estimators in list(range(step, total, step)) + [total]:
+        if state.get('cancel_requested'):
+            raise TrainingCancelled()
+        estimator.set_params(n_estimators=n_estimators)
+        estimator.fit(X, y)
+        state['progress'] = n_estimators / total
+    estimator.set_params(warm_start=False)
+    return estimator
+
+
+def run_training_job(estimator, X, y, state):
+    # Runs in a worker process, state is a Manager dict shared with the server
+    state['status'] = 'running'
+    state['started_at'] = time.time()
+    if state.get('cancel_requested'):
+        raise TrainingCancelled()
+    estimator = _fit_in_steps(estimator, X, y, state)
+    state['progress'] = 1.0
+    return estimator
+
+
+class _CancellableBatches:
+    # Iterated once per epoch like the stream it wraps, stops between chunks once cancelled
+    def __init__(self, batches, state):
+        self.batches = batches
+        self.state = state
+
+    def __iter__(self):
+        for batch in self.batches:
+            if self.state.get('cancel_requested'):
+                raise TrainingCancelled()
+            yield batch
+
+
+def run_streaming_job(model, stream, classes, epochs, state):
+    # Trains an MLModel from a ChunkStream and scores it on the held-out rows, also run inline for sync requests
+    state['status'] = 'running'
+    state['started_at'] = time.time()
+    if state.get('cancel_requested'):
+        raise TrainingCancelled()
+    if model.model_type == 'classification' and classes is None:
+        classes = stream.classes()
+    chunks = model.train_incremental(_CancellableBatches(stream, state), classes, epochs)
+    result = {
+        'estimator': model.model,
+        'chunks': chunks,
+        'rows_trained': stream.rows_trained,
+        'rows_skipped': stream.rows_skipped
+    }
+    X_holdout, y_holdout = stream.holdout_set()
+    if X_holdout is not None and y_holdout is not None:
+        result['holdout_samples'] = len(X_holdout)
+        result['metrics'] = model.evaluate(X_holdout, y_holdout)
+    state['progress'] = 1.0
+    return result
+
+
+class TrainingJobQueue:
+    def __init__(self, jobs_per_core=1, max_workers=None, ttl_seconds=JOB_TTL_SECONDS,
+                 max_finished=MAX_FINISHED_JOBS):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) * jobs_per_core)
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self._context = multiprocessing.get_context('spawn')
+        self._executor = None
+        self._manager = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self):
+        # Worker processes are only spawned once the first job arrives
+        if self._executor is None:
+            self._manager = self._context.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+
+    def submit(self, estimator, X, y, on_complete=None, metadata=None):
+        return self._submit(run_training_job, (estimator, X, y), on_complete, metadata)
+
+    def submit_stream(self, model, stream, classes, epochs, on_complete=None, metadata=None):
+        # The worker reads the dataset file itself, on_complete gets run_streaming_job's result
+        return self._submit(run_streaming_job, (model, stream, classes, epochs), on_complete, metadata)
+
+    def _submit(self, function, args, on_complete, metadata):
+        with self._lock:
+            self._ensure_pool()
+            self._prune()
+            job_id = uuid.uuid4().hex
+            state = self._manager.dict({
+                'status': 'queued',
+                'progress': 0.0,
+                'started_at': None,
+                'cancel_requested': False
+            })
+            future = self._executor.submit(function, *args, state)
+            job = {
+                'job_id': job_id,
+                'state': state,
+                'future': future,
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'status': None,
+                'error': None,
+                'metadata': metadata or {}
+            }
+            self._jobs[job_id] = job
+        future.add_done_callback(lambda done: self._finish(job, done, on_complete))
+        return job_id
+
+    def _finish(self, job, future, on_complete):
+        try:
+            self._complete(job, future, on_complete)
+        finally:
+            # Set last, a job only counts as finished for pruning once its status is final
+            job['finished_at'] = time.time()
+
+    def _complete(self, job, future, on_complete):
+        if future.cancelled() or job['state'].get('cancel_requested'):
+            job['status'] = 'cancelled'
+            return
+        try:
+            result = future.result()
+        except (CancelledError, TrainingCancelled):
+            job['status'] = 'cancelled'
+            return
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            return
+        if on_complete is not None:
+            # Runs in the executor's callback thread, which would swallow the error and leave the job running
+            try:
+                on_complete(result)
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                return
+        job['status'] = 'completed'
+
+    def _prune(self):
+        # Oldest jobs first, each one finished drops its shared state with it
+        finished = [job for job in self._jobs.values() if job['finished_at'] is not None]
+        expired = time.time() - self.ttl_seconds
+        excess = len(finished) - self.max_finished
+        for position, job in enumerate(finished):
+            if position < excess or job['finished_at'] < expired:
+                del self._jobs[job['job_id']]
+
+    def _get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise LookupError(f"Training job '{job_id}' not found")
+        return job
+
+    def status(self, job_id):
+        return self._describe(self._get(job_id))
+
+    def _describe(self, job):
+        state = dict(job['state'])
+        status = job['status'] or ('cancelling' if state['cancel_requested'] else state['status'])
+        started_at = state['started_at']
+        end = job['finished_at'] or time.time()
+        return {
+            'job_id': job['job_id'],
+            'status': status,
+            'progress': 1.0 if status == 'completed' else state['progress'],
+            'queued_seconds': (started_at or end) - job['submitted_at'],
+            'elapsed_seconds': end - started_at if started_at else 0.0,
+            'error': job['error'],
+            **job['metadata']
+        }
+
+    def list_jobs(self):
+        with self._lock:
+            self._prune()
+            jobs = list(self._jobs.values())
+        return [self._describe(job) for job in jobs]
+
+    def cancel(self, job_id):
+        job = self._get(job_id)
+        if job['future'].done():
+            return False
+        # Queued jobs never start, running ensembles stop at the next step
+        job['state']['cancel_requested'] = True
+        job['future'].cancel()
+        return True
+
+
+training_jobs = TrainingJobQueue()
@@ -0,0 +1,151 @@
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Types with their own conversion rules, anything else goes through astype
+CAST_TYPES = ('int64', 'float64', 'str', 'bool', 'datetime', 'Int64', 'Float64', 'boolean', 'string', 'category')
+TRUE_TOKENS = ('true', 't', 'yes', 'y', '1')
+FALSE_TOKENS = ('false', 'f', 'no', 'n', '0')
+MAX_CACHED_FORMATS = 256
+DATETIME_SAMPLE_ROWS = 1000
+
+# Guessed datetime formats keyed by the shape of the sample value, e.g. '0000-00-00 00:00'
+_datetime_formats = {}
+
+
+def validate_dtype(dtype):
+    if dtype in CAST_TYPES:
+        return dtype
+    try:
+        pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        raise ValueError(f"Unsupported type '{dtype}'")
+    return dtype
+
+
+def _numeric(series, errors, integer=False):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series.astype('Int64')
+    if pd.api.types.is_string_dtype(series.dtype) and pd.api.types.infer_dtype(series) == 'string':
+        # NumPy parses clean numeric strings much faster than to_numeric, which handles the rest.
+        # Only for text, astype(int64) would silently truncate Python floats in an object column
+        for dtype in ((np.int64, np.float64) if integer else (np.float64,)):
+            try:
+                return series.astype(dtype)
+            except (TypeError, ValueError, OverflowError):
+                pass
+    return pd.to_numeric(series, errors=errors)
+
+
+def _to_integer(series, dtype, errors):
+    numbers = _numeric(series, errors, integer=True)
+    if pd.api.types.is_integer_dtype(numbers.dtype):
+        if dtype == 'Int64' or numbers.hasnans:
+            return numbers.astype('Int64')
+        return numbers.astype(np.int64)
+
+    values = numbers.to_numpy(dtype=np.float64, na_value=np.nan)
+    # Casting these to int64 would wrap around to INT64_MIN
+    out_of_range = np.isfinite(values) & ((values >= 2.0 ** 63) | (values < -2.0 ** 63))
+    missing = ~np.isfinite(values)
+    whole = np.trunc(values)
+    if errors == 'raise':
+        if np.isinf(values).any():
+            raise ValueError('Column contains infinite values')
+        if out_of_range.any():
+            raise ValueError('Column contains values outside the int64 range')
+        if not np.array_equal(whole[~missing], values[~missing]):
+            raise ValueError('Column contains non-integer values')
+    # Lenient conversion truncates fractions and turns infinities and out of range values into missing values
+    missing |= out_of_range
+    whole[missing] = 0
+    if dtype == 'Int64' or missing.any():
+        return pd.Series(pd.arrays.IntegerArray(whole.astype(np.int64), missing),
+                         index=series.index, name=series.name)
+    return pd.Series(whole.astype(np.int64), index=series.index, name=series.name)
+
+
+def _to_float(series, dtype, errors):
+    numbers = _numeric(series, errors)
+    return numbers.astype('Float64' if dtype == 'Float64' else np.float64)
+
+
+def _to_boolean(series, dtype, errors):
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy(dtype=bool, na_value=False)
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan) != 0
+    else:
+        # Text is matched against the tokens once per distinct value
+        codes, uniques = pd.factorize(series)
+        text = pd.Index(uniques).astype(str).str.strip().str.lower()
+        truthy = text.isin(TRUE_TOKENS)
+        unknown = ~(truthy | text.isin(FALSE_TOKENS))
+        if unknown.any():
+            if errors == 'raise':
+                raise ValueError(f'Column contains non-boolean values such as {uniques[unknown.argmax()]!r}')
+            missing = missing | np.append(unknown, False)[codes]
+        values = np.append(truthy, False)[codes]
+    if dtype == 'boolean' or missing.any():
+        return pd.Series(pd.arrays.BooleanArray(values, missing), index=series.index, name=series.name)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _datetime_format(sample):
+    shape = re.sub(r'\d', '0', sample)
+    fmt = _datetime_formats.get(shape)
+    if fmt is None and shape not in _datetime_formats:
+        if len(_datetime_formats) >= MAX_CACHED_FORMATS:
+            _datetime_formats.clear()
+        fmt = guess_datetime_format(sample)
+        # Another thread may clear the cache at any time, so the local value is returned
+        _datetime_formats[shape] = fmt
+    return fmt
+
+
+def _to_datetime(series, errors):
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return pd.to_datetime(series, errors=errors)
+    sample = series.iloc[:DATETIME_SAMPLE_ROWS].dropna()
+    if sample.empty:
+        sample = series.dropna()
+    fmt = _datetime_format(str(sample.iloc[0])) if not sample.empty else None
+    if fmt is not None:
+        try:
+            parsed = pd.to_datetime(series, format=fmt, errors=errors)
+            # With errors='coerce' rows the guessed format does not fit come back as NaT instead of raising
+            if parsed.isna().sum() == series.isna().sum():
+                return parsed
+        except (TypeError, ValueError):
+            # A format guessed from one value did not fit them all
+            pass
+    return pd.to_datetime(series, format='mixed', errors=errors)
+
+
+def convert_series(series, dtype, errors='raise'):
+    # errors='raise' rejects values that do not convert cleanly, 'coerce' turns them into missing values
+    validate_dtype(dtype)
+    if dtype in ('int64', 'Int64'):
+        return _to_integer(series, dtype, errors)
+    if dtype in ('float64', 'Float64'):
+        return _to_float(series, dtype, errors)
+    if dtype in ('bool', 'boolean'):
+        return _to_boolean(series, dtype, errors)
+    if dtype == 'datetime':
+        return _to_datetime(series, errors)
+    if dtype == 'str':
+        return series.astype(str).where(series.notna(), None)
+    return series.astype(dtype)
+
+
+def convert_columns(df, columns, dtype, errors='raise'):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Column(s) {', '.join(missing)} not found")
+    converted = {column: convert_series(df[column], dtype, errors) for column in columns}
+    return df.assign(**converted)
@@ -0,0 +1,224 @@
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from models.dataset_registry import DatasetRegistry
+from models.model_registry import model_registry
+from utils.storage import private_directory
+
+WORKSPACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+# Bytes one dataset of a workspace may use for its raw and preprocessed frames
+WORKSPACE_MEMORY_BYTES = int(os.environ.get('MLFLOW_WORKSPACE_MEMORY_BYTES', 512 * 1024 * 1024))
+# Workspaces without a request for this long are spilled to disk and reloaded on their next request
+WORKSPACE_IDLE_SECONDS = float(os.environ.get('MLFLOW_WORKSPACE_IDLE_SECONDS', 600))
+MAX_WORKSPACES = int(os.environ.get('MLFLOW_MAX_WORKSPACES', 1000))
+
+
+class Workspace:
+    # Datasets, preprocessing state and current model of one session
+    def __init__(self, workspace_id, spill_dir, memory_budget):
+        self.workspace_id = workspace_id
+        self.spill_dir = spill_dir
+        self.memory_budget = memory_budget
+        # Budget applies to each dataset, the registry spills older datasets once their sum is over it
+        self.datasets = DatasetRegistry(
+            max_memory_bytes=memory_budget, spill_dir=spill_dir, shared=None, memory_budget=memory_budget
+        )
+        self.model_id = None
+        self.model_ids = []
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        # Requests currently running in this workspace, a busy workspace is never spilled
+        self.active = 0
+        self.closed = False
+        self.lock = threading.RLock()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def acquire(self):
+        # Waits for a spill in progress, the request then restores what it needs
+        with self.lock:
+            if self.closed:
+                raise LookupError(f"Session '{self.workspace_id}' not found")
+            self.active += 1
+            self.touch()
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+            self.touch()
+
+    def use_model(self, model_id):
+        with self.lock:
+            self.model_id = model_id
+            if model_id not in self.model_ids:
+                self.model_ids.append(model_id)
+
+    def forget_model(self, model_id):
+        with self.lock:
+            if model_id in self.model_ids:
+                self.model_ids.remove(model_id)
+            if self.model_id == model_id:
+                self.model_id = None
+
+    def spill(self, models, idle_seconds):
+        # Frames go to Parquet or pickle files, untrained model drafts to joblib
+        with self.lock:
+            # A request may have started since the sweep picked this workspace
+            if self.closed or self.active or time.monotonic() - self.last_used < idle_seconds:
+                return False
+            self.datasets.spill_all()
+            for model_id in self.model_ids:
+                models.release(model_id)
+            return True
+
+    def close(self, models):
+        with self.lock:
+            self.closed = True
+            self.datasets.clear()
+            for model_id in self.model_ids:
+                models.release(model_id)
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def describe(self):
+        return {
+            'workspace_id': self.workspace_id,
+            'created_at': self.created_at,
+            'idle_seconds': time.monotonic() - self.last_used,
+            'memory_budget': self.memory_budget,
+            'resident_memory': self.datasets.resident_memory(),
+            'spilled_bytes': self.datasets.spilled_bytes(),
+            'model_id': self.model_id,
+            'model_ids': list(self.model_ids)
+        }
+
+
+class WorkspaceManager:
+    def __init__(self, root=None, memory_budget=WORKSPACE_MEMORY_BYTES, idle_seconds=WORKSPACE_IDLE_SECONDS,
+                 max_workspaces=MAX_WORKSPACES, models=model_registry):
+        # Created on first use, a fresh private temporary directory unless one is given
+        self._root = root
+        self.memory_budget = memory_budget
+        self.idle_seconds = idle_seconds
+        self.max_workspaces = max_workspaces
+        self.models = models
+        self._workspaces = OrderedDict()
+        self._idle = set()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        with self._lock:
+            self._root = private_directory(self._root, prefix='mlflow-workspaces-')
+            return self._root
+
+    def _spill_dir(self, workspace_id):
+        return os.path.join(self.root, workspace_id)
+
+    def create(self):
+        # The only way to get a workspace, ids a client makes up are never accepted
+        workspace_id = uuid.uuid4().hex
+        workspace = Workspace(workspace_id, self._spill_dir(workspace_id), self.memory_budget)
+        with self._lock:
+            closed = self._make_room()
+            self._workspaces[workspace_id] = workspace
+        for old in closed:
+            old.close(self.models)
+        return workspace
+
+    def _make_room(self):
+        # Only workspaces idle for a whole idle period make way for a new one, active sessions are never closed
+        closed = []
+        now = time.monotonic()
+        while len(self._workspaces) >= self.max_workspaces:
+            workspace_id, workspace = next(iter(self._workspaces.items()))
+            if workspace.active or now - workspace.last_used < self.idle_seconds:
+                raise OverflowError(f'All {self.max_workspaces} workspaces are in use')
+            del self._workspaces[workspace_id]
+            self._idle.discard(workspace_id)
+            closed.append(workspace)
+        return closed
+
+    def acquire(self, workspace_id):
+        # The workspace of one request, pair with release() when the request ends
+        if not WORKSPACE_ID_PATTERN.match(workspace_id):
+            raise ValueError(f"Invalid session id '{workspace_id}'")
+        with self._lock:
+            workspace = self._workspaces.get(workspace_id)
+            if workspace is None:
+                raise LookupError(f"Session '{workspace_id}' not found, create one with POST /api/workspaces")
+            self._workspaces.move_to_end(workspace_id)
+            self._idle.discard(workspace_id)
+            workspace.touch()
+            idle = self._collect_idle()
+        workspace.acquire()
+        for other in idle:
+            self._spill(other)
+        return workspace
+
+    def release(self, workspace):
+        workspace.release()
+
+    def _spill(self, workspace):
+        if not workspace.spill(self.models, self.idle_seconds):
+            with self._lock:
+                self._idle.discard(workspace.workspace_id)
+            return False
+        return True
+
+    def _collect_idle(self):
+        # Sweeps at most a few times per idle period so a request rarely pays for it
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_seconds / 10:
+            return []
+        self._last_sweep = now
+        idle = []
+        for workspace_id, workspace in self._workspaces.items():
+            if now - workspace.last_used < self.idle_seconds:
+                # Ordered by last use, everything after this was used even more recently
+                break
+            if workspace_id not in self._idle and not workspace.active:
+                self._idle.add(workspace_id)
+                idle.append(workspace)
+        return idle
+
+    def spill_idle(self):
+        with self._lock:
+            self._last_sweep = 0
+            idle = self._collect_idle()
+        return [workspace.workspace_id for workspace in idle if self._spill(workspace)]
+
+    def describe(self, workspace_id):
+        with self._lock:
+            workspace = self._workspaces.get(workspace_id)
+        if workspace is None:
+            raise LookupError(f"Workspace '{workspace_id}' not found")
+        return workspace.describe()
+
+    def remove(self, workspace_id):
+        with self._lock:
+            workspace = self._workspaces.pop(workspace_id, None)
+            self._idle.discard(workspace_id)
+        if workspace is None:
+            raise LookupError(f"Workspace '{workspace_id}' not found")
+        workspace.close(self.models)
+
+    def list_workspaces(self):
+        with self._lock:
+            workspaces = list(self._workspaces.values())
+        described = [workspace.describe() for workspace in workspaces]
+        return {
+            'workspaces': described,
+            'resident_memory': sum(entry['resident_memory'] for entry in described),
+            'memory_budget': self.memory_budget,
+            'idle_seconds': self.idle_seconds
+        }
+
+
+workspaces = WorkspaceManager()
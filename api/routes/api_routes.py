@@ -1,8 +1,11 @@
 from flask import Blueprint, request
 from controllers.data_controller import DataController
+from controllers.workspace_controller import WorkspaceController
+from utils.context import flag
 
 api = Blueprint('api', __name__)
 controller = DataController()
+workspace_controller = WorkspaceController()
 
 @api.route('/load', methods=['POST'])
 def load_data():
@@ -24,7 +27,16 @@ def get_shape():
 
 @api.route('/describe', methods=['GET'])
 def get_description():
-    return controller.get_description_data()
+    try:
+        approximate = flag(request.args, 'approx', False)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return controller.get_description_data(approximate)
+
+@api.route('/sample', methods=['GET'])
+def get_sample():
+    n = request.args.get('n', default=100, type=int)
+    return controller.get_sample_data(n)
 
 @api.route('/info', methods=['GET'])
 def get_info():
@@ -37,14 +49,28 @@ def get_missing_values():
 @api.route('/update-type', methods=['POST'])
 def update_type():
     data = request.get_json()
-    column = data.get('column')
+    columns = data.get('columns') or ([data['column']] if data.get('column') else [])
     dtype = data.get('dtype')
-    if not column or not dtype:
+    if not columns or not dtype:
         return {'error': 'Column and dtype are required'}, 400
-    return controller.update_column_type(column, dtype)
+    return controller.update_column_type(columns, dtype)
 
 @api.route('/dataset', methods=['GET'])
 def get_dataset():
+    cursor = request.args.get('cursor')
+    try:
+        stream = flag(request.args, 'stream', False)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    if stream:
+        chunk_size = request.args.get('chunk_size', default=1000, type=int)
+        return controller.stream_dataset(chunk_size, cursor)
+
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return {'error': 'limit must be a positive integer'}, 400
+    if limit is not None or cursor is not None:
+        return controller.get_dataset_page(1000 if limit is None else limit, cursor)
     return controller.get_dataset()
 
 @api.route('/column-types', methods=['GET'])
@@ -55,8 +81,49 @@ def get_column_types():
 def get_visualization_data():
     x_column = request.args.get('x_column')
     y_column = request.args.get('y_column', None)
+    # Passing a resolution returns bins/decimated points instead of every value
+    resolution = request.args.get('resolution', type=int)
+    mode = request.args.get('mode', default='auto')
     
     if not x_column:
         return {'error': 'x_column is required'}, 400
         
-    return controller.get_visualization_data(x_column, y_column)
\ No newline at end of file
+    return controller.get_visualization_data(x_column, y_column, resolution, mode)
+
+@api.route('/datasets', methods=['GET'])
+def list_datasets():
+    return controller.list_datasets()
+
+@api.route('/datasets', methods=['POST'])
+def create_dataset():
+    data = request.get_json()
+    dataset_id = data.get('dataset_id')
+    if not dataset_id:
+        return {'error': 'dataset_id is required'}, 400
+    return controller.create_dataset(dataset_id, data.get('filename'))
+
+@api.route('/datasets/<dataset_id>', methods=['DELETE'])
+def remove_dataset(dataset_id):
+    return controller.remove_dataset(dataset_id)
+
+# Session workspaces: pass the returned session_id as X-Session-ID, ?session_id= or the cookie.
+# Listing and sweeping all workspaces needs MLFLOW_ADMIN_TOKEN in X-Admin-Token.
+@api.route('/workspaces', methods=['POST'])
+def create_workspace():
+    return workspace_controller.create_workspace()
+
+@api.route('/workspaces', methods=['GET'])
+def list_workspaces():
+    return workspace_controller.list_workspaces()
+
+@api.route('/workspaces/spill-idle', methods=['POST'])
+def spill_idle_workspaces():
+    return workspace_controller.spill_idle()
+
+@api.route('/workspaces/<workspace_id>', methods=['GET'])
+def get_workspace(workspace_id):
+    return workspace_controller.get_workspace(workspace_id)
+
+@api.route('/workspaces/<workspace_id>', methods=['DELETE'])
+def remove_workspace(workspace_id):
+    return workspace_controller.remove_workspace(workspace_id)
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
+import numpy as np
 from controllers.model_controller import ModelController
+from utils.context import current_dataset, flag
 
 model_routes = Blueprint('model', __name__)
 controller = ModelController()
@@ -21,6 +23,19 @@ def init_model():
 @model_routes.route('/train', methods=['POST'])
 def train_model():
     data = request.get_json()
+    try:
+        # async=true queues the fit on the training process pool and returns a job_id
+        run_async = flag(data, 'async', False)
+        # stream=true trains incremental estimators chunk by chunk from the dataset file
+        stream = flag(data, 'stream', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    model_id = data.get('model_id')
+    if data.get('split_id'):
+        return controller.train_split(data['split_id'], run_async, model_id)
+    if stream:
+        return train_stream(data, model_id, run_async)
+
     X_train = data.get('X_train', [])
     y_train = data.get('y_train', [])
     features = data.get('features', [])
@@ -35,11 +50,76 @@ def train_model():
     # Convert list of dictionaries to feature matrix
     X_train_matrix = [[row[feature] for feature in features] for row in X_train]
         
-    return controller.train_model(X_train_matrix, y_train)
+    return controller.train_model(X_train_matrix, y_train, run_async, model_id)
+
+def train_stream(data, model_id, run_async=False):
+    features = data.get('features')
+    if not features or not isinstance(features, list):
+        return jsonify({'error': 'features are required'}), 400
+    try:
+        chunk_size = int(data['chunk_size']) if data.get('chunk_size') is not None else None
+        epochs = int(data.get('epochs', 1))
+        holdout = float(data.get('holdout', 0.0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'chunk_size and epochs must be integers, holdout a number'}), 400
+    if (chunk_size is not None and chunk_size <= 0) or epochs <= 0 or not 0 <= holdout < 1:
+        return jsonify({'error': 'chunk_size and epochs must be positive and holdout in [0, 1)'}), 400
+    return controller.train_stream(
+        current_dataset(), features, data.get('target'), model_id, chunk_size, epochs, data.get('classes'), holdout,
+        run_async, data.get('source')
+    )
+
+@model_routes.route('/search', methods=['POST'])
+def search():
+    data = request.get_json()
+    split_id = data.get('split_id')
+    model_type = data.get('model_type')
+    # space maps algorithm names to {param: [choices]} or {param: {'low', 'high', 'log', 'type'}}
+    space = data.get('space')
+
+    if not split_id or not model_type or not space:
+        return jsonify({
+            'error': 'split_id, model_type and space are required'
+        }), 400
+
+    try:
+        early_stopping = flag(data, 'early_stopping', True)
+        refit = flag(data, 'refit', True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        options = {
+            'strategy': data.get('strategy', 'random'),
+            'n_iter': int(data.get('n_iter', 10)),
+            'cv': int(data.get('cv', 3)),
+            'scoring': data.get('scoring'),
+            'eta': int(data.get('eta', 3)),
+            'early_stopping': early_stopping,
+            'n_jobs': int(data.get('n_jobs', -1)),
+            'random_state': int(data.get('random_state', 0))
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'n_iter, cv, eta, n_jobs and random_state must be integers'}), 400
+
+    return controller.search(split_id, model_type, space, refit, **options)
 
 @model_routes.route('/evaluate', methods=['POST'])
 def evaluate_model():
     data = request.get_json()
+    # model_id/version select a registered model, otherwise the last initialized one is used
+    model_id = data.get('model_id')
+    version = data.get('version')
+    if data.get('split_id') and data.get('cv'):
+        # cv=k runs k-fold cross-validation on the training part of the split
+        try:
+            cv = int(data['cv'])
+            n_jobs = int(data.get('n_jobs', -1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'cv and n_jobs must be integers'}), 400
+        return controller.cross_validate_split(data['split_id'], cv, model_id, version, n_jobs)
+    if data.get('split_id'):
+        return controller.evaluate_split(data['split_id'], model_id, version)
+
     X_test = data.get('X_test', [])
     y_test = data.get('y_test', [])
     features = data.get('features', [])
@@ -52,16 +132,43 @@ def evaluate_model():
     # Convert list of dictionaries to feature matrix
     X_test_matrix = [[row[feature] for feature in features] for row in X_test]
         
-    return controller.evaluate_model(X_test_matrix, y_test)
+    return controller.evaluate_model(X_test_matrix, y_test, model_id, version)
 
 @model_routes.route('/predict', methods=['POST'])
 def predict():
+    if request.mimetype == 'application/octet-stream':
+        return predict_binary()
+
     data = request.get_json()
+    model_id = data.get('model_id')
+    version = data.get('version')
+    try:
+        # ensemble=true averages the fold models cached by the last cross-validation
+        ensemble = flag(data, 'ensemble', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if data.get('split_id'):
+        return controller.predict_split(data['split_id'], data.get('subset', 'test'), model_id, version, ensemble)
+    # rows holds untransformed records or columns, preprocessed with the model's pipeline
+    if data.get('rows'):
+        return controller.predict_raw(data['rows'], model_id, version, ensemble)
+
     features_data = data.get('features', [])
     feature_names = data.get('feature_names', [])
     
     if not features_data or not feature_names:
         return jsonify({'error': 'Features and feature names are required'}), 400
+
+    # Columnar input: {'features': {name: [values, ...]}} stacked in feature_names order
+    if isinstance(features_data, dict):
+        missing = [name for name in feature_names if name not in features_data]
+        if missing:
+            return jsonify({'error': f"Missing feature column(s): {', '.join(missing)}"}), 400
+        try:
+            features_matrix = np.column_stack([np.asarray(features_data[name], dtype=np.float64) for name in feature_names])
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return controller.make_prediction(features_matrix, model_id, version, ensemble)
         
     # Convert list of dictionaries to feature matrix if needed
     if isinstance(features_data[0], dict):
@@ -69,4 +176,69 @@ def predict():
     else:
         features_matrix = features_data
         
-    return controller.make_prediction(features_matrix)
\ No newline at end of file
+    return controller.make_prediction(features_matrix, model_id, version, ensemble)
+
+def predict_binary():
+    # Raw little-endian row-major floats, shaped by the n_features query argument
+    dtype = request.args.get('dtype', 'float64')
+    if dtype not in ('float32', 'float64'):
+        return jsonify({'error': "dtype must be 'float32' or 'float64'"}), 400
+    n_features = request.args.get('n_features', type=int)
+    if not n_features or n_features < 1:
+        return jsonify({'error': 'n_features is required for binary input'}), 400
+
+    body = request.get_data()
+    itemsize = np.dtype(dtype).itemsize
+    if not body or len(body) % (itemsize * n_features):
+        return jsonify({'error': f'Body size must be a multiple of {itemsize * n_features} bytes'}), 400
+
+    try:
+        ensemble = flag(request.args, 'ensemble', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    features_matrix = np.frombuffer(body, dtype=np.dtype(dtype).newbyteorder('<')).reshape(-1, n_features)
+    return controller.make_prediction(
+        features_matrix,
+        request.args.get('model_id'),
+        request.args.get('version'),
+        ensemble
+    )
+
+@model_routes.route('/predict/stats', methods=['GET'])
+def prediction_stats():
+    return controller.get_prediction_stats()
+
+@model_routes.route('/predict/config', methods=['POST'])
+def configure_batching():
+    data = request.get_json()
+    try:
+        max_batch_size = int(data['max_batch_size']) if 'max_batch_size' in data else None
+        max_wait_ms = float(data['max_wait_ms']) if 'max_wait_ms' in data else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_batch_size must be an integer and max_wait_ms a number'}), 400
+    return controller.configure_batching(max_batch_size, max_wait_ms)
+
+@model_routes.route('/jobs', methods=['GET'])
+def list_jobs():
+    return controller.list_jobs()
+
+@model_routes.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    return controller.get_job_status(job_id)
+
+@model_routes.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    return controller.cancel_job(job_id)
+
+@model_routes.route('/models', methods=['GET'])
+def list_models():
+    return controller.list_models()
+
+@model_routes.route('/models/<model_id>', methods=['GET'])
+def get_model(model_id):
+    return controller.get_model(model_id)
+
+@model_routes.route('/models/<model_id>', methods=['DELETE'])
+def delete_model(model_id):
+    return controller.delete_model(model_id)
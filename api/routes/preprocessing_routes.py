@@ -1,55 +1,65 @@
 from flask import Blueprint, request, jsonify
 from controllers.preprocessing_controller import PreprocessingController
+from models.lazy_plan import parse_bool
+from utils.context import current_dataset, flag
 
 preprocessing = Blueprint('preprocessing', __name__)
-preprocessing.dataset = None  # Will be set by app.py
 
 @preprocessing.route('/head', methods=['GET'])
 def get_head():
     n = request.args.get('n', default=5, type=int)
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_head_data(n)
 
 @preprocessing.route('/tail', methods=['GET'])
 def get_tail():
     n = request.args.get('n', default=5, type=int)
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_tail_data(n)
 
 @preprocessing.route('/shape', methods=['GET'])
 def get_shape():
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_shape_data()
 
 @preprocessing.route('/missing', methods=['GET'])
 def get_missing_values():
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_missing_values()
 
 @preprocessing.route('/column-types', methods=['GET'])
 def get_column_types():
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_column_types()
 
 @preprocessing.route('/update-type', methods=['POST'])
 def update_column_type():
     data = request.get_json()
-    column = data.get('column')
+    # Either one column or a list of columns converted to the same dtype
+    columns = data.get('columns') or ([data['column']] if data.get('column') else [])
     dtype = data.get('dtype')
-    if not column or not dtype:
+    if not columns or not dtype:
         return jsonify({'error': 'Column and dtype are required'}), 400
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.update_column_type(column, dtype)
+    controller = PreprocessingController(current_dataset())
+    return controller.update_column_type(columns, dtype)
 
 @preprocessing.route('/categorical-columns', methods=['GET'])
 def get_categorical_columns():
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.get_categorical_columns()
+    try:
+        approximate = flag(request.args, 'approx', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    controller = PreprocessingController(current_dataset())
+    return controller.get_categorical_columns(approximate)
 
 @preprocessing.route('/numerical-columns', methods=['GET'])
 def get_numerical_columns():
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.get_numerical_columns()
+    try:
+        approximate = flag(request.args, 'approx', False)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    controller = PreprocessingController(current_dataset())
+    return controller.get_numerical_columns(approximate)
 
 @preprocessing.route('/handle-missing-values', methods=['POST'])
 def handle_missing():
@@ -59,7 +69,7 @@ def handle_missing():
     if not column:
         return jsonify({'error': 'Column name is required'}), 400
         
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.handle_missing(column, method)
 
 @preprocessing.route('/delete-column', methods=['POST'])
@@ -69,18 +79,20 @@ def delete_column():
     if not column:
         return jsonify({'error': 'Column name is required'}), 400
         
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.remove_column(column)
 
 @preprocessing.route('/get-columns', methods=['GET'])
 def get_columns():
     column1 = request.args.get('column1')
     column2 = request.args.get('column2')
+    resolution = request.args.get('resolution', type=int)
+    mode = request.args.get('mode', default='auto')
     if not column1:
         return jsonify({'error': 'At least one column name is required'}), 400
         
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.get_columns_data(column1, column2)
+    controller = PreprocessingController(current_dataset())
+    return controller.get_columns_data(column1, column2, resolution, mode)
 
 @preprocessing.route('/preview-column', methods=['GET'])
 def preview_column():
@@ -89,19 +101,29 @@ def preview_column():
     if not column:
         return jsonify({'error': 'Column name is required'}), 400
         
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.get_column_preview(column, n)
 
 @preprocessing.route('/encode', methods=['POST'])
 def encode_column():
     data = request.get_json()
     column = data.get('column')
-    method = data.get('method', 'label')  # label or onehot
+    method = data.get('method', 'label')  # label, onehot, hashing, frequency or target
     if not column:
         return jsonify({'error': 'Column name is required'}), 400
-        
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.encode_column(column, method)
+    # onehot: sparse, top_k, max_categories; hashing: n_features, sparse; target: target, smoothing
+    try:
+        options = {
+            key: cast(data[key])
+            for key, cast in (('sparse', parse_bool), ('top_k', int), ('max_categories', int),
+                              ('n_features', int), ('target', str), ('smoothing', float))
+            if data.get(key) is not None
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid encoding option'}), 400
+
+    controller = PreprocessingController(current_dataset())
+    return controller.encode_column(column, method, options)
 
 @preprocessing.route('/scale', methods=['POST'])
 def scale_features():
@@ -111,18 +133,95 @@ def scale_features():
     if not columns:
         return jsonify({'error': 'Columns list is required'}), 400
         
-    controller = PreprocessingController(preprocessing.dataset)
+    controller = PreprocessingController(current_dataset())
     return controller.scale_columns(columns, method)
 
+@preprocessing.route('/batch', methods=['POST'])
+def run_batch():
+    # Ordered operations, e.g. {"op": "fill", "column": "Age", "method": "median"}, applied as one version
+    data = request.get_json()
+    operations = data.get('operations')
+    if not operations or not isinstance(operations, list):
+        return jsonify({'error': 'A non-empty operations list is required'}), 400
+    if not all(isinstance(operation, dict) and isinstance(operation.get('op'), str) for operation in operations):
+        return jsonify({'error': "Every operation must be an object with an 'op' name"}), 400
+    try:
+        optimize = flag(data, 'optimize', True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    controller = PreprocessingController(current_dataset())
+    return controller.run_batch(operations, optimize)
+
+@preprocessing.route('/plan', methods=['GET'])
+def get_plan():
+    controller = PreprocessingController(current_dataset())
+    return controller.get_plan()
+
+@preprocessing.route('/plan', methods=['DELETE'])
+def discard_plan():
+    controller = PreprocessingController(current_dataset())
+    return controller.discard_plan()
+
+@preprocessing.route('/lazy', methods=['POST'])
+def set_lazy_mode():
+    # While enabled, mutating endpoints queue steps until /execute, /split or /api/dataset
+    data = request.get_json()
+    try:
+        enabled = flag(data, 'enabled', True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    controller = PreprocessingController(current_dataset())
+    return controller.set_lazy_mode(enabled)
+
+@preprocessing.route('/execute', methods=['POST'])
+def execute_plan():
+    controller = PreprocessingController(current_dataset())
+    return controller.execute_plan()
+
+@preprocessing.route('/history', methods=['GET'])
+def get_history():
+    controller = PreprocessingController(current_dataset())
+    return controller.get_history()
+
+@preprocessing.route('/undo', methods=['POST'])
+def undo():
+    controller = PreprocessingController(current_dataset())
+    return controller.undo()
+
+@preprocessing.route('/redo', methods=['POST'])
+def redo():
+    controller = PreprocessingController(current_dataset())
+    return controller.redo()
+
+@preprocessing.route('/checkout', methods=['POST'])
+def checkout():
+    data = request.get_json()
+    try:
+        version = int(data['version'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'An integer version is required'}), 400
+    controller = PreprocessingController(current_dataset())
+    return controller.checkout(version)
+
+@preprocessing.route('/pipeline', methods=['GET'])
+def get_pipeline():
+    controller = PreprocessingController(current_dataset())
+    return controller.get_pipeline()
+
 @preprocessing.route('/split', methods=['POST'])
 def split_dataset():
     data = request.get_json()
     test_size = float(data.get('test_size', 0.2))
     random_state = int(data.get('random_state', 42))
-    shuffle = bool(data.get('shuffle', True))
-    stratify = bool(data.get('stratify', False))
     features = data.get('features', [])
     target = data.get('target', [])
+    try:
+        shuffle = flag(data, 'shuffle', True)
+        stratify = flag(data, 'stratify', False)
+        # Set include_data to false to keep the split on the server and use split_id
+        include_data = flag(data, 'include_data', True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    controller = PreprocessingController(preprocessing.dataset)
-    return controller.split_dataset(test_size, random_state, shuffle, stratify,features,target)
\ No newline at end of file
+    controller = PreprocessingController(current_dataset())
+    return controller.split_dataset(test_size, random_state, shuffle, stratify,features,target, include_data)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+# Dataset paths like api/data/sample.csv are relative to the repository root
+os.chdir(os.path.dirname(API_DIR))
+# Saved models go to a scratch directory, set before the registries are created on import
+os.environ.setdefault('MLFLOW_MODEL_DIR', tempfile.mkdtemp(prefix='mlflow-test-models-'))
+os.environ.pop('MLFLOW_SHARED_DIR', None)
+
+
+@pytest.fixture
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def dataset_id():
+    # A fresh copy of the sample dataset per test, requests select it with the X-Dataset-ID header
+    from models.dataset_registry import dataset_registry
+    dataset_id = f'test-{uuid.uuid4().hex[:12]}'
+    dataset_registry.create(dataset_id)
+    yield dataset_id
+    try:
+        dataset_registry.remove(dataset_id)
+    except LookupError:
+        pass
+
+
+@pytest.fixture
+def headers(dataset_id):
+    return {'X-Dataset-ID': dataset_id}
@@ -0,0 +1,74 @@
+import pytest
+
+from models.dataset_registry import dataset_registry
+
+OPERATIONS = [
+    {'op': 'handle-missing-values', 'column': 'Age', 'method': 'median'},
+    {'op': 'encode', 'column': 'Sex', 'method': 'label'},
+    {'op': 'encode', 'column': 'Embarked', 'method': 'onehot'},
+    {'op': 'scale', 'columns': ['Age', 'Fare'], 'method': 'minmax'},
+    {'op': 'delete-column', 'column': 'Name'},
+    {'op': 'update-type', 'column': 'Pclass', 'dtype': 'float'},
+]
+ENDPOINTS = {
+    'handle-missing-values': ('handle-missing-values', ('column', 'method')),
+    'encode': ('encode', ('column', 'method')),
+    'scale': ('scale', ('columns', 'method')),
+    'delete-column': ('delete-column', ('column',)),
+    'update-type': ('update-type', ('column', 'dtype')),
+}
+
+
+@pytest.fixture
+def other(dataset_id):
+    # A second copy of the sample for the step-by-step run
+    dataset_registry.create(f'{dataset_id}-steps')
+    yield {'X-Dataset-ID': f'{dataset_id}-steps'}
+    dataset_registry.remove(f'{dataset_id}-steps')
+
+
+@pytest.mark.parametrize('optimize', [True, False])
+def test_batch_equals_the_single_steps(client, headers, other, optimize):
+    response = client.post('/api/preprocess/batch', headers=headers,
+                           json={'operations': OPERATIONS, 'optimize': optimize})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['operations'] == 6 and len(body['results']) == body['executed']
+
+    for operation in OPERATIONS:
+        path, names = ENDPOINTS[operation['op']]
+        payload = {name: operation[name] for name in names}
+        if path == 'update-type':
+            payload = {'columns': [operation['column']], 'dtype': operation['dtype']}
+        assert client.post(f'/api/preprocess/{path}', headers=other, json=payload).status_code == 200
+
+    batched = dataset_registry.get(headers['X-Dataset-ID']).preprocessed_df
+    stepped = dataset_registry.get(other['X-Dataset-ID']).preprocessed_df
+    assert sorted(batched.columns) == sorted(stepped.columns)
+    assert batched[stepped.columns].equals(stepped)
+    # One version for the whole batch
+    history = client.get('/api/preprocess/history', headers=headers).get_json()
+    assert len(history['versions']) == 2
+
+
+def test_failing_step_publishes_nothing(client, headers):
+    operations = OPERATIONS[:2] + [{'op': 'encode', 'column': 'Sex', 'method': 'target', 'target': 'Name'}]
+    response = client.post('/api/preprocess/batch', headers=headers, json={'operations': operations})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Step 3 (encode) failed')
+    assert 'Sex_encoded' not in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+    assert len(client.get('/api/preprocess/history', headers=headers).get_json()['versions']) == 1
+
+
+@pytest.mark.parametrize('body, message', [
+    ({}, 'non-empty operations'),
+    ({'operations': [{'column': 'Age'}]}, "'op' name"),
+    ({'operations': [{'op': 'explode', 'column': 'Age'}]}, "Operation 1: Unknown operation 'explode'"),
+    ({'operations': [{'op': 'drop', 'column': 'Age'}, {'op': 'scale', 'method': 'minmax'}]},
+     'Operation 2: Operation \'scale\' requires columns'),
+    ({'operations': [{'op': 'drop', 'column': 'Age'}], 'optimize': 'sometimes'}, "'optimize' must be"),
+])
+def test_invalid_batches(client, headers, body, message):
+    response = client.post('/api/preprocess/batch', headers=headers, json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.column_profile import DESCRIBE_INDEX, ColumnProfileCache, profile_column
+from models.dataset import Dataset
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'ints': [3, 1, 2, 5],
+        'floats': [0.5, np.nan, 2.0, 4.0],
+        'flags': [True, False, True, True],
+        'text': ['a', 'b', None, 'a'],
+        'empty': [np.nan] * 4
+    })
+
+
+def test_profile_matches_pandas(frame):
+    for column in ('ints', 'floats'):
+        profile = profile_column(frame[column])
+        expected = frame[column].describe().reindex(DESCRIBE_INDEX)
+        np.testing.assert_allclose(profile['describe'], expected.to_numpy())
+        assert profile['missing'] == frame[column].isna().sum()
+        assert profile['memory_usage'] == frame[column].memory_usage(deep=True)
+    assert profile_column(frame['text'])['unique'] == 3
+    assert 'describe' not in profile_column(frame['flags'])
+    empty = profile_column(frame['empty'])
+    assert empty['min'] is None and empty['count'] == 0
+
+
+def test_cache_reuses_profiles_until_invalidated(frame):
+    cache = ColumnProfileCache()
+    first = cache.get(frame)
+    assert cache.get(frame)['ints'] is first['ints']
+    cache.invalidate(['ints'])
+    second = cache.get(frame)
+    assert second['ints'] is not first['ints']
+    assert second['text'] is first['text']
+    cache.invalidate()
+    assert cache.get(frame)['text'] is not first['text']
+
+
+def test_cache_notices_unreported_changes(frame):
+    cache = ColumnProfileCache()
+    cache.get(frame)
+    # A new dtype or row count is recomputed even without invalidate()
+    frame['ints'] = frame['ints'].astype(str)
+    assert cache.get(frame)['ints']['dtype'] == 'object'
+    assert cache.get(frame.head(2))['floats']['rows'] == 2
+    assert set(cache.get(frame[['ints']])) == {'ints'}
+
+
+def test_dataset_statistics_follow_changes():
+    dataset = Dataset('api/data/sample.csv')
+    description = dataset.get_description()
+    expected = dataset.df.describe()
+    assert description['columns'] == list(expected.columns)
+    assert description['data'][1]['Age'] == pytest.approx(expected.loc['mean', 'Age'])
+
+    with dataset.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'mean')
+        dataset.commit_preprocessed(preprocessor.df, 'fill Age', ['Age'], preprocessor.pipeline.steps)
+    profiles = dataset.get_profiles(preprocessed=True)
+    assert profiles['Age']['missing'] == 0
+    # The raw frame keeps its own cache
+    assert dataset.get_profiles()['Age']['missing'] == 22
+
+
+def test_missing_endpoint_after_fill(client, headers):
+    def missing():
+        data = client.get('/api/preprocess/missing', headers=headers).get_json()['data']
+        return {entry['column']: entry['missing_count'] for entry in data}
+
+    assert missing()['Age'] == 22
+    response = client.post('/api/preprocess/handle-missing-values', headers=headers,
+                           json={'column': 'Age', 'method': 'median'})
+    assert response.status_code == 200
+    assert missing()['Age'] == 0
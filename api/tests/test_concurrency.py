@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+from models.dataset import Dataset
+from utils.rwlock import ReadWriteLock
+
+
+def _start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def read():
+        with lock.read():
+            # Only passes if all three readers hold the lock at once
+            barrier.wait()
+
+    threads = [_start(read) for _ in range(3)]
+    for thread in threads:
+        thread.join(5)
+    assert not barrier.broken
+
+
+def test_writer_waits_for_readers_and_blocks_new_ones():
+    lock = ReadWriteLock()
+    written = threading.Event()
+    late_read = threading.Event()
+    lock.acquire_read()
+
+    def write():
+        with lock.write():
+            written.set()
+
+    def read():
+        with lock.read():
+            late_read.set()
+
+    writer = _start(write)
+    while not lock._waiting_writers:
+        time.sleep(0.01)
+    # A waiting writer holds back readers that arrive after it
+    reader = _start(read)
+    assert not written.wait(0.2)
+    assert not late_read.is_set()
+
+    lock.release_read()
+    writer.join(5)
+    reader.join(5)
+    assert written.is_set() and late_read.is_set()
+
+
+def test_reentrant_reads_and_writes():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write():
+            # A writer may read under its own lock
+            with lock.read():
+                pass
+        assert lock._writer == threading.get_ident()
+    assert lock._writer is None
+
+    with lock.read():
+        with lock.read():
+            pass
+    assert lock._readers == 0
+
+
+def test_upgrading_a_read_lock_raises():
+    lock = ReadWriteLock()
+    with lock.read():
+        with pytest.raises(RuntimeError, match='upgrade'):
+            lock.acquire_write()
+    assert lock._waiting_writers == 0
+    with lock.write():
+        pass
+
+
+def test_snapshot_is_not_modified_by_writers():
+    dataset = Dataset()
+    frame, pipeline = dataset.snapshot()
+    rows, missing = len(frame), int(frame['Age'].isna().sum())
+
+    with dataset.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'remove')
+        dataset.commit_preprocessed(preprocessor.df, 'remove Age', None, preprocessor.pipeline.steps)
+
+    assert (len(frame), int(frame['Age'].isna().sum())) == (rows, missing)
+    assert pipeline.steps == []
+    current, current_pipeline = dataset.snapshot()
+    assert current is not frame
+    assert len(current) == rows - missing
+    assert [step['kind'] for step in current_pipeline.steps] == ['drop_rows']
+
+
+def test_failed_writer_publishes_nothing():
+    dataset = Dataset()
+    before, _ = dataset.snapshot()
+    with pytest.raises(ValueError):
+        with dataset.writer() as preprocessor:
+            preprocessor.delete_column('Name')
+            preprocessor.fill_missing({'Age': 'bogus'})
+    after, pipeline = dataset.snapshot()
+    assert after is before
+    assert 'Name' in after.columns and pipeline.steps == []
+
+
+def test_concurrent_readers_see_whole_versions():
+    dataset = Dataset()
+    columns = list(dataset.snapshot()[0].columns)
+    errors = []
+    stop = threading.Event()
+
+    def write():
+        try:
+            for _ in range(20):
+                with dataset.writer() as preprocessor:
+                    # Each version is either the full frame or the one without Name, never half of a change
+                    if 'Name' in preprocessor.df.columns:
+                        preprocessor.delete_column('Name')
+                    else:
+                        preprocessor.df = dataset.df.copy()
+                        preprocessor.pipeline.reset()
+                    dataset.commit_preprocessed(preprocessor.df, 'toggle Name', None, preprocessor.pipeline.steps)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def read():
+        try:
+            while not stop.is_set():
+                frame, pipeline = dataset.snapshot()
+                dropped = [step['column'] for step in pipeline.steps if step['kind'] == 'drop']
+                assert list(frame.columns) == [column for column in columns if column not in dropped]
+                dataset.get_profiles(preprocessed=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [_start(read) for _ in range(4)] + [_start(write)]
+    for thread in threads:
+        thread.join(30)
+    assert not errors
+    # An even number of toggles ends on the full frame
+    assert list(dataset.snapshot()[0].columns) == columns
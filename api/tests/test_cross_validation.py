@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from models.cross_validation import cross_validate, make_folds
+
+
+def test_folds_partition_the_rows():
+    y = np.array([0] * 30 + [1] * 10)
+    folds = make_folds('classification', y, 5)
+    tests = np.concatenate([test_idx for _, test_idx in folds])
+    assert sorted(tests.tolist()) == list(range(40))
+    for train_idx, test_idx in folds:
+        assert not set(train_idx) & set(test_idx)
+        # Stratified, every fold keeps the 3:1 class ratio
+        assert y[test_idx].sum() == 2
+
+
+def test_folds_of_a_subset():
+    y = np.arange(100) % 2
+    folds = make_folds('classification', y, 3, n_samples=30)
+    rows = np.concatenate([test_idx for _, test_idx in folds])
+    assert len(rows) == 30 and len(set(rows.tolist())) == 30
+    # A class too rare to stratify falls back to plain k-fold
+    assert len(make_folds('classification', np.array([0] * 9 + [1]), 3)) == 3
+
+
+def test_cross_validate_scores_every_fold():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 2))
+    y = X @ [1.0, -2.0] + 0.5
+    models, folds, summary = cross_validate(LinearRegression(), 'regression', X, y, cv=5, n_jobs=1)
+    assert len(models) == 5 and len({id(model) for model in models}) == 5
+    assert [fold['test_size'] for fold in folds] == [10] * 5
+    assert summary['mean']['r2'] == pytest.approx(1.0)
+    assert summary['mean']['mse'] == pytest.approx(np.mean([fold['mse'] for fold in folds]))
+
+
+@pytest.mark.parametrize('cv', [1, 51])
+def test_invalid_fold_count(cv):
+    with pytest.raises(ValueError):
+        cross_validate(LogisticRegression(), 'classification', np.zeros((50, 1)), np.zeros(50), cv=cv)
+
+
+def test_cross_validation_and_ensemble_endpoints(client, headers):
+    split_id = client.post('/api/preprocess/split', headers=headers, json={
+        'features': ['Pclass', 'Fare'], 'target': 'Survived', 'include_data': False
+    }).get_json()['split_id']
+    model_id = client.post('/api/model/init', json={'algorithm': 'logistic', 'model_type': 'classification'}
+                           ).get_json()['model_id']
+
+    response = client.post('/api/model/predict', json={'split_id': split_id, 'model_id': model_id, 'ensemble': True})
+    assert response.status_code == 400
+    response = client.post('/api/model/evaluate', json={'split_id': split_id, 'model_id': model_id, 'cv': 4,
+                                                         'n_jobs': 1})
+    assert response.status_code == 200
+    metrics = response.get_json()['metrics']
+    assert len(metrics['folds']) == 4 and 0 <= metrics['mean']['accuracy'] <= 1
+
+    response = client.post('/api/model/predict', json={'split_id': split_id, 'model_id': model_id, 'ensemble': True})
+    assert response.status_code == 200
+    assert response.get_json()['samples_predicted'] == 20
+    assert client.post('/api/model/evaluate', json={'split_id': split_id, 'model_id': model_id, 'cv': 'x'}
+                       ).status_code == 400
+    assert client.post('/api/model/evaluate', json={'split_id': split_id, 'model_id': model_id, 'cv': 1000}
+                       ).status_code == 400
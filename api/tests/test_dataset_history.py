@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from models.dataset_history import DatasetHistory
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'a': [1.0, None, 3.0], 'b': ['x', 'y', 'z']})
+
+
+def test_versions_share_untouched_columns(frame):
+    history = DatasetHistory()
+    history.reset(frame)
+    filled = frame.assign(a=frame['a'].fillna(0))
+    history.commit(filled, 'fill a', ['a'], [{'kind': 'fill', 'column': 'a'}])
+    first, second = history._versions
+    assert second['data']['b'] is first['data']['b']
+    assert second['changed'] == ['a']
+
+    restored, steps, changed, version = history.undo()
+    pd.testing.assert_frame_equal(restored, frame)
+    assert (steps, changed, version) == ([], ['a'], 0)
+    restored, steps, _, version = history.redo()
+    pd.testing.assert_frame_equal(restored, filled)
+    assert steps == [{'kind': 'fill', 'column': 'a'}] and version == 1
+
+
+def test_undo_redo_limits_and_branches(frame):
+    history = DatasetHistory()
+    history.reset(frame)
+    with pytest.raises(ValueError, match='Nothing to undo'):
+        history.undo()
+    history.commit(frame.drop(columns=['b']), 'drop b', ['b'])
+    with pytest.raises(ValueError, match='Nothing to redo'):
+        history.redo()
+    history.undo()
+    # Committing after an undo drops the redo branch
+    history.commit(frame.head(2), 'head', None)
+    listed = history.list_versions()
+    assert [version['version'] for version in listed['versions']] == [0, 2]
+    assert listed['can_undo'] and not listed['can_redo']
+    # A changed index invalidates every column
+    assert history.undo()[2] is None
+
+
+def test_checkout_and_version_limit(frame):
+    history = DatasetHistory(max_versions=3)
+    history.reset(frame)
+    for value in range(1, 5):
+        history.commit(frame.assign(a=float(value)), f'set {value}', ['a'])
+    assert [version['version'] for version in history.list_versions()['versions']] == [2, 3, 4]
+    restored, _, _, version = history.checkout(2)
+    assert version == 2 and restored['a'].tolist() == [2.0] * 3
+    with pytest.raises(LookupError):
+        history.checkout(0)
+
+
+def test_undo_restores_the_dataset(client, headers):
+    def state():
+        return client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+
+    columns = state()
+    client.post('/api/preprocess/delete-column', headers=headers, json={'column': 'Name'})
+    client.post('/api/preprocess/handle-missing-values', headers=headers, json={'column': 'Age', 'method': 'remove'})
+    assert client.get('/api/preprocess/shape', headers=headers).get_json()['rows'] == 78
+
+    missing = client.get('/api/preprocess/missing', headers=headers).get_json()['data']
+    assert {entry['column']: entry['missing_count'] for entry in missing}['Age'] == 0
+
+    response = client.post('/api/preprocess/undo', headers=headers)
+    assert response.status_code == 200 and response.get_json()['rows'] == 100
+    # Cached statistics follow the restored version
+    missing = client.get('/api/preprocess/missing', headers=headers).get_json()['data']
+    assert {entry['column']: entry['missing_count'] for entry in missing}['Age'] == 22
+    assert client.get('/api/preprocess/pipeline', headers=headers).get_json()['steps'] == [
+        {'kind': 'drop', 'column': 'Name'}
+    ]
+    assert client.post('/api/preprocess/undo', headers=headers).get_json()['columns'] == len(columns)
+    assert state() == columns
+    assert client.post('/api/preprocess/undo', headers=headers).status_code == 409
+
+    assert client.post('/api/preprocess/redo', headers=headers).status_code == 200
+    assert 'Name' not in state()
+    history = client.get('/api/preprocess/history', headers=headers).get_json()
+    assert history['can_redo'] and len(history['versions']) == 3
+
+    last = history['versions'][-1]['version']
+    assert client.post('/api/preprocess/checkout', headers=headers, json={'version': last}
+                       ).get_json()['rows'] == 78
+    assert client.post('/api/preprocess/checkout', headers=headers, json={'version': 999}).status_code == 404
+    assert client.post('/api/preprocess/checkout', headers=headers, json={'version': 'x'}).status_code == 400
+    assert client.post('/api/preprocess/redo', headers=headers).status_code == 409
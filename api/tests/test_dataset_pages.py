@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+
+def test_pages_cover_every_row_once(client, headers):
+    rows, cursor = [], None
+    while True:
+        query = {'limit': 30} if cursor is None else {'limit': 30, 'cursor': cursor}
+        body = client.get('/api/dataset', headers=headers, query_string=query).get_json()
+        rows.extend(record['PassengerId'] for record in body['data'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert body['total_rows'] == 100
+    assert len(rows) == 100 and len(set(rows)) == 100
+
+
+def test_cursor_without_limit_uses_default_page(client, headers):
+    body = client.get('/api/dataset?cursor=90', headers=headers).get_json()
+    assert len(body['data']) == 10
+    assert body['next_cursor'] is None
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-5', 'cursor=abc', 'cursor=-1&limit=5'])
+def test_invalid_page_arguments(client, headers, query):
+    response = client.get(f'/api/dataset?{query}', headers=headers)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_stream_is_ndjson(client, headers):
+    response = client.get('/api/dataset?stream=true&chunk_size=7&cursor=50', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['X-Total-Rows'] == '100'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(records) == 50
+    assert records[0]['PassengerId'] == client.get(
+        '/api/dataset?limit=1&cursor=50', headers=headers
+    ).get_json()['data'][0]['PassengerId']
+
+
+def test_stream_reads_one_version(client, headers):
+    # An update published while the stream is being read does not show up half way through it
+    response = client.get('/api/dataset?stream=true&chunk_size=10', headers=headers)
+    chunks = iter(response.response)
+    first = [json.loads(line) for line in next(chunks).decode().splitlines()]
+    update = client.post('/api/preprocess/delete-column', headers=headers, json={'column': 'Name'})
+    assert update.status_code == 200
+    rest = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert len(first) + len(rest) == 100
+    assert all('Name' in record for record in first + rest)
+    assert 'Name' not in client.get('/api/dataset?limit=1', headers=headers).get_json()['columns']
@@ -0,0 +1,111 @@
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+from models.dataset_registry import DatasetRegistry
+from models.preprocessing import DataPreprocessor
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DatasetRegistry(max_resident=1, spill_dir=str(tmp_path / 'spill'), shared=None)
+
+
+def _resident(registry):
+    return [entry['dataset_id'] for entry in registry.list_datasets()['datasets'] if entry['resident']]
+
+
+def _fill_age(dataset):
+    with dataset.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'median')
+        dataset.commit_preprocessed(preprocessor.df, 'fill Age', ['Age'], preprocessor.pipeline.steps)
+
+
+def test_spilled_dataset_reloads_with_its_state(registry):
+    first = registry.create('first')
+    _fill_age(first)
+    expected = first.preprocessed_df.copy()
+
+    registry.create('second')
+    listed = {entry['dataset_id']: entry for entry in registry.list_datasets()['datasets']}
+    assert listed['first']['resident'] is False
+    assert os.listdir(listed['first']['spill_path'])
+
+    restored = registry.get('first')
+    assert restored is not first
+    pd.testing.assert_frame_equal(restored.preprocessed_df.fillna(0), expected.fillna(0))
+    assert [step['kind'] for step in restored.pipeline.steps] == ['fill']
+    # Restoring the first one spilled the second
+    assert registry.list_datasets()['datasets'][0]['dataset_id'] == 'first'
+
+
+def test_spill_directory_is_private(registry):
+    registry.create('first')
+    registry.create('second')
+    mode = os.stat(registry.spill_dir).st_mode
+    assert stat.S_IMODE(mode) & 0o077 == 0
+
+
+def test_held_dataset_is_not_spilled(registry):
+    registry.create('first')
+    registry.acquire('first')
+    registry.create('second')
+    assert _resident(registry) == ['first', 'second']
+    registry.release('first')
+    # Spilling was put off until the hold ended
+    assert _resident(registry) == ['second']
+
+
+def test_memory_limit_spills_least_recently_used(tmp_path):
+    registry = DatasetRegistry(max_resident=10, max_memory_bytes=1, spill_dir=str(tmp_path), shared=None)
+    registry.create('first')
+    registry.create('second')
+    assert _resident(registry) == ['second']
+
+
+def test_unknown_and_invalid_ids(registry):
+    with pytest.raises(LookupError):
+        registry.get('missing')
+    with pytest.raises(LookupError):
+        registry.remove('missing')
+    with pytest.raises(ValueError):
+        registry.create('../escape')
+
+
+def test_remove_deletes_spill_files(registry):
+    registry.create('first')
+    registry.create('second')
+    path = next(entry['spill_path'] for entry in registry.list_datasets()['datasets'] if not entry['resident'])
+    registry.remove('first')
+    assert not os.path.exists(path)
+
+
+def test_requests_select_datasets(client, headers):
+    response = client.get('/api/shape', headers=headers)
+    assert response.status_code == 200
+    client.post('/api/preprocess/delete-column', headers=headers, json={'column': 'Name'})
+    # The default dataset is a different one
+    assert 'Name' in client.get('/api/preprocess/head').get_json()['columns']
+    assert 'Name' not in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+
+
+def test_unknown_dataset_is_a_json_404(client):
+    for response in (client.get('/api/preprocess/head?dataset_id=missing'),
+                     client.post('/api/preprocess/delete-column', headers={'X-Dataset-ID': 'missing'},
+                                 json={'column': 'Name'})):
+        assert response.status_code == 404
+        assert response.get_json() == {'error': "Dataset 'missing' not found"}
+
+
+def test_dataset_endpoints(client):
+    response = client.post('/api/datasets', json={'dataset_id': 'api-test', 'filename': 'sample.csv'})
+    assert response.status_code == 200
+    try:
+        ids = [entry['dataset_id'] for entry in client.get('/api/datasets').get_json()['datasets']]
+        assert 'api-test' in ids
+        assert client.post('/api/datasets', json={'dataset_id': 'bad id'}).status_code == 400
+    finally:
+        assert client.delete('/api/datasets/api-test').status_code == 200
+    assert client.delete('/api/datasets/api-test').status_code == 404
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.downsampling import hexbin, lttb, minmax_decimate, reduce_columns
+
+
+def _containing_cells(x, y, result):
+    # In units of half a column and a third of a row the hexagon is |u| <= 0.5, |u| + |v| <= 1
+    width = 2 * result['hexagon'][0][0]
+    third = result['hexagon'][2][1]
+    u = np.abs(x[:, None] - np.asarray(result['x'])[None, :]) / width
+    v = np.abs(y[:, None] - np.asarray(result['y'])[None, :]) / third
+    return (u <= 0.5 + 1e-9) & (u + v <= 1 + 1e-9)
+
+
+def test_hexbin_cells_contain_their_points():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=2000), rng.normal(scale=10, size=2000)
+    result = hexbin(x, y, 12)
+    assert sum(result['counts']) == len(x)
+    assert len(result['hexagon']) == 6
+    inside = _containing_cells(x, y, result)
+    assert inside.any(axis=1).all()
+    # Points on a shared edge may sit in two cells, the counts still add up per cell
+    owner = inside.argmax(axis=1)
+    interior = inside.sum(axis=1) == 1
+    counts = np.bincount(owner[interior], minlength=len(result['counts']))
+    assert (counts <= result['counts']).all()
+
+
+def test_hexbin_degenerate_and_empty_input():
+    result = hexbin(np.ones(5), np.array([1.0, 2.0, 3.0, np.nan, 4.0]), 10)
+    assert sum(result['counts']) == 4
+    assert _containing_cells(np.ones(4), np.array([1.0, 2.0, 3.0, 4.0]), result).any(axis=1).all()
+    assert hexbin(np.array([np.nan]), np.array([1.0]), 10) == {'x': [], 'y': [], 'counts': [], 'hexagon': []}
+
+
+def test_decimation_keeps_extremes_and_ends():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 100)
+    y[1234] = 50.0
+    kept = minmax_decimate(x, y, 100)
+    assert len(kept['x']) <= 100 and 50.0 in kept['y']
+    shaped = lttb(x[::-1].copy(), y[::-1].copy(), 100)
+    assert len(shaped['x']) == 100
+    assert shaped['x'][0] == 0 and shaped['x'][-1] == 9999
+    assert shaped['x'] == sorted(shaped['x'])
+
+
+def test_datetime_gaps_are_dropped():
+    when = pd.Series(pd.to_datetime(['2024-01-01', None, '2024-01-03']))
+    result = reduce_columns(when, pd.Series([1.0, 2.0, 3.0]), resolution=4, mode='lttb')
+    assert len(result['x']) == 2
+    histogram = reduce_columns(when, resolution=4)
+    assert sum(histogram['counts']) == 2
+    assert histogram['edges'][0] == pd.Timestamp('2024-01-01').value
+
+
+def test_modes_and_invalid_requests():
+    numbers = pd.Series(np.arange(10, dtype=float))
+    labels = pd.Series(list('aabbbcccc') + [None])
+    assert reduce_columns(labels, resolution=2)['other_count'] == 3
+    summary = reduce_columns(labels, numbers, resolution=10)
+    assert summary['mode'] == 'categories' and summary['category_axis'] == 'x'
+    assert summary['categories'][0] == 'c' and summary['mean'][0] == pytest.approx(6.5)
+    with pytest.raises(ValueError):
+        reduce_columns(numbers, mode='bogus')
+    with pytest.raises(ValueError):
+        reduce_columns(labels, mode='histogram')
+    with pytest.raises(ValueError):
+        reduce_columns(numbers, mode='hexbin')
+
+
+def test_visualization_endpoint(client, headers):
+    response = client.get('/api/visualization-data?x_column=Age&y_column=Fare&resolution=8', headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['mode'] == 'hexbin' and sum(body['counts']) == 78
+    response = client.get('/api/visualization-data?x_column=Age&resolution=8&mode=lttb', headers=headers)
+    assert response.status_code == 400
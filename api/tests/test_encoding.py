@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.pipeline import hash_codes
+from models.preprocessing import DataPreprocessor
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'city': ['a', 'b', 'a', 'c', 'a', 'b', None, 'd'],
+        'y': [1.0, 0.0, 1.0, 0.0, 0.0, 1.0, 1.0, 0.0]
+    })
+
+
+def test_onehot_limit_and_top_k(frame):
+    preprocessor = DataPreprocessor(frame.copy())
+    assert 'one-hot limit' in preprocessor.encode_categorical('city', 'onehot', max_categories=3)['error']
+    result = preprocessor.encode_categorical('city', 'onehot', top_k=2)
+    assert result['columns'] == ['city_a', 'city_b', 'city_other']
+    encoded = preprocessor.df[result['columns']].astype(int)
+    assert encoded.sum().tolist() == [3, 2, 2]
+    # Missing values get no column at all
+    assert encoded.iloc[6].sum() == 0
+    assert 'city' not in preprocessor.df.columns
+
+
+def test_sparse_indicators_match_dense(frame):
+    dense = DataPreprocessor(frame.copy())
+    sparse = DataPreprocessor(frame.copy())
+    columns = dense.encode_categorical('city', 'hashing', n_features=4)['columns']
+    assert sparse.encode_categorical('city', 'hashing', n_features=4, sparse=True)['sparse'] is True
+    assert all(isinstance(sparse.df[column].dtype, pd.SparseDtype) for column in columns)
+    np.testing.assert_array_equal(sparse.df[columns].sparse.to_dense().to_numpy(dtype=int),
+                                  dense.df[columns].to_numpy(dtype=int))
+
+
+def test_hashing_edge_cases():
+    assert hash_codes(pd.Series([None, np.nan], dtype=object), 8).tolist() == [-1, -1]
+    codes = hash_codes(pd.Series(['x', 'y', 'x', None]), 8)
+    assert codes[0] == codes[2] and codes[3] == -1 and 0 <= codes[1] < 8
+    preprocessor = DataPreprocessor(pd.DataFrame({'empty': [None, None], 'other': [None, 'x']}, dtype=object))
+    assert 'error' in preprocessor.encode_categorical('empty', 'hashing', n_features=0)
+    columns = preprocessor.encode_categorical('empty', 'hashing', n_features=2)['columns']
+    assert not preprocessor.df[columns].to_numpy().any()
+
+
+def test_frequency_encoding(frame):
+    preprocessor = DataPreprocessor(frame.copy())
+    preprocessor.encode_categorical('city', 'frequency')
+    assert preprocessor.df['city_freq'].tolist() == pytest.approx(
+        [3 / 7, 2 / 7, 3 / 7, 1 / 7, 3 / 7, 2 / 7, 0.0, 1 / 7]
+    )
+
+
+def test_target_encoding_is_out_of_fold(frame):
+    preprocessor = DataPreprocessor(frame.copy())
+    preprocessor.encode_categorical('city', 'target', target='y', smoothing=0.0)
+    encoded = preprocessor.df['city_target']
+    # 'c' and 'd' appear once, their own label never reaches their feature
+    for row in (3, 7):
+        assert encoded[row] != frame['y'][row]
+    step = preprocessor.pipeline.steps[-1]
+    assert dict(zip(step['categories'], step['table']))['a'] == pytest.approx(2 / 3)
+    assert step['default'] == pytest.approx(frame['y'].mean())
+
+
+def test_target_encoding_needs_a_numeric_target(frame):
+    preprocessor = DataPreprocessor(frame.assign(label=list('xyxyxyxy')))
+    assert 'existing target' in preprocessor.encode_categorical('city', 'target')['error']
+    assert 'numeric target' in preprocessor.encode_categorical('city', 'target', target='label')['error']
+    with pytest.raises(ValueError, match="Column 'town' not found"):
+        preprocessor.encode_categorical('town', 'label')
+
+
+def test_encode_endpoint(client, headers):
+    def encode(**body):
+        return client.post('/api/preprocess/encode', headers=headers, json=body)
+
+    response = encode(column='Embarked', method='onehot', sparse='true')
+    assert response.status_code == 200 and response.get_json()['sparse'] is True
+    assert encode(column='Embarked', method='label').get_json() == {'error': "Column 'Embarked' not found"}
+    assert encode(column='Embarked', method='label').status_code == 400
+    assert encode(column='Sex', method='onehot', sparse='maybe').status_code == 400
+    assert encode(column='Sex', method='hashing', n_features='many').status_code == 400
+    assert encode(method='label').status_code == 400
+    response = encode(column='Sex', method='target', target='Survived')
+    assert response.status_code == 200
+    assert 'Sex_target' in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+
+
+@pytest.mark.parametrize('path', ['/api/describe?approx=maybe', '/api/dataset?stream=2',
+                                  '/api/preprocess/numerical-columns?approx=on'])
+def test_query_flags_reject_unknown_values(client, headers, path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 400
+    assert 'must be true or false' in response.get_json()['error']
@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pytest
+
+from models.hyperparameter_search import HyperparameterSearch
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 3))
+    return X, (X[:, 0] + 0.3 * rng.normal(size=120) > 0).astype(int)
+
+
+def _events(search, data):
+    events = list(search.run(*data))
+    return [event for event in events if event['event'] == 'trial'], events[-1]
+
+
+def test_grid_runs_every_combination(data):
+    search = HyperparameterSearch('classification', {
+        'logistic': {'C': [0.1, 1.0]}, 'decision_tree': {'max_depth': [1, 2, 3]}
+    }, strategy='grid', early_stopping=False, n_jobs=1)
+    trials, summary = _events(search, data)
+    assert len(trials) == 5 and sorted(trial['trial_id'] for trial in trials) == list(range(5))
+    assert summary['n_trials'] == 5 and summary['scoring'] == 'accuracy'
+    assert summary['best']['mean_score'] == max(trial['mean_score'] for trial in trials)
+
+
+def test_random_ranges_are_sampled_within_bounds():
+    search = HyperparameterSearch('regression', {
+        'random_forest': {'n_estimators': {'low': 5, 'high': 20, 'type': 'int'}, 'max_features': [0.5, 1.0]},
+        'sgd': {'alpha': {'low': 1e-5, 'high': 1e-1, 'log': True}}
+    }, n_iter=6)
+    forests = [params for algorithm, params in search.candidates if algorithm == 'random_forest']
+    alphas = [params['alpha'] for algorithm, params in search.candidates if algorithm == 'sgd']
+    assert len(forests) == 3 and len(alphas) == 3
+    assert all(isinstance(params['n_estimators'], int) and 5 <= params['n_estimators'] <= 20 for params in forests)
+    assert all(1e-5 <= alpha <= 1e-1 for alpha in alphas)
+
+
+def test_halving_promotes_the_best_third(data):
+    search = HyperparameterSearch('classification', {'decision_tree': {'max_depth': [1, 2, 3, 4, 5, 6, 7, 8, 9]}},
+                                  strategy='grid', n_jobs=1)
+    search.strategy = 'halving'
+    events = list(search.run(*data))
+    rungs = [event for event in events if event['event'] == 'rung']
+    assert [len(rung['promoted']) for rung in rungs] == [3, 1, 1]
+    assert rungs[-1]['n_samples'] == 120
+    assert events[-1]['best']['trial_id'] in rungs[-1]['promoted']
+
+
+def test_failed_and_pruned_trials_are_counted(data):
+    search = HyperparameterSearch('classification', {'logistic': {'C': [1.0, 1.0, 1.0, -1.0]}},
+                                  strategy='grid', n_jobs=1)
+    trials, summary = _events(search, data)
+    assert summary['n_failed'] == 1
+    failed = next(trial for trial in trials if trial['status'] == 'failed')
+    assert failed['params'] == {'C': -1.0} and failed['error']
+
+
+def test_trailing_trials_are_pruned(data):
+    search = HyperparameterSearch('classification', {'logistic': {'C': [1.0, 1.0, 1.0, 1e-6]}},
+                                  strategy='grid', n_jobs=1)
+    trials, summary = _events(search, data)
+    assert summary['n_pruned'] == 1
+    pruned = next(trial for trial in trials if trial['status'] == 'pruned')
+    assert pruned['params'] == {'C': 1e-6} and len(pruned['scores']) < 3
+    search.early_stopping = False
+    assert _events(search, data)[1]['n_pruned'] == 0
+
+
+@pytest.mark.parametrize('arguments', [
+    ('nonsense', {'logistic': {}}), ('classification', {'linear': {}}), ('classification', {}),
+    ('classification', {'logistic': {}}, 'bayes')
+])
+def test_invalid_searches(arguments):
+    with pytest.raises(ValueError):
+        HyperparameterSearch(*arguments)
+
+
+@pytest.fixture
+def split_id(client, headers):
+    return client.post('/api/preprocess/split', headers=headers, json={
+        'features': ['Pclass', 'Fare'], 'target': 'Survived', 'include_data': False
+    }).get_json()['split_id']
+
+
+def _stream(client, **body):
+    response = client.post('/api/model/search', json={'model_type': 'classification', 'n_jobs': 1, **body})
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_search_stream_registers_the_winner(client, split_id):
+    response, events = _stream(client, split_id=split_id, strategy='grid', space={'logistic': {'C': [0.1, 1.0]}})
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['X-Total-Trials'] == '2'
+    assert [event['event'] for event in events] == ['trial', 'trial', 'summary']
+    summary = events[-1]
+    model = client.get(f"/api/model/models/{summary['model_id']}").get_json()
+    assert model['versions'][0]['search_score'] == summary['best']['mean_score']
+
+
+def test_search_errors(client, split_id):
+    response, _ = _stream(client, split_id=split_id, space={'logistic': {}}, strategy='bayes')
+    assert response.status_code == 400
+    response, _ = _stream(client, split_id='nope', space={'logistic': {}})
+    assert response.status_code == 404
+    assert _stream(client, split_id=split_id, space={'logistic': {}}, refit='maybe')[0].status_code == 400
+    # Failures after the stream started arrive as the last event
+    response, events = _stream(client, split_id=split_id, space={'logistic': {}}, cv=500)
+    assert response.status_code == 200
+    assert events[-1]['event'] == 'error'
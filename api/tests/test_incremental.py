@@ -0,0 +1,169 @@
+import time
+
+import numpy as np
+import pytest
+
+import controllers.model_controller
+from models.dataset import Dataset
+from models.incremental import ChunkStream
+from models.loader import DatasetLoader
+from models.ml_models import MLModel
+from models.training_jobs import TrainingJobQueue
+
+FEATURES = ['Pclass', 'Age', 'Fare']
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = TrainingJobQueue(max_workers=1)
+    monkeypatch.setattr(controllers.model_controller, 'training_jobs', queue)
+    yield queue
+    if queue._executor is not None:
+        queue._executor.shutdown(cancel_futures=True)
+        queue._manager.shutdown()
+
+
+def _removed_age():
+    dataset = Dataset()
+    with dataset.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'remove')
+        preprocessor.scale_features(['Fare'], 'standard')
+        dataset.commit_preprocessed(preprocessor.df, 'prepare', None, preprocessor.pipeline.steps)
+    return dataset
+
+
+def _stream(dataset, **options):
+    _, pipeline = dataset.snapshot()
+    return ChunkStream(DatasetLoader(), dataset.filename, pipeline, FEATURES, 'Survived', **options)
+
+
+def test_stream_matches_the_loaded_rows():
+    dataset = _removed_age()
+    stream = _stream(dataset, chunk_size=7)
+    chunks = list(stream)
+
+    assert len(chunks) == 15
+    X = np.concatenate([X for X, _ in chunks])
+    y = np.concatenate([y for _, y in chunks])
+    frame = dataset.snapshot()[0]
+    np.testing.assert_allclose(X, frame[FEATURES].to_numpy(dtype=np.float64))
+    np.testing.assert_array_equal(y, frame['Survived'].to_numpy())
+    assert (stream.rows_read, stream.rows_trained, stream.rows_skipped) == (100, 78, 22)
+    np.testing.assert_array_equal(stream.classes(), [0, 1])
+
+
+def test_rows_with_missing_features_are_skipped():
+    # No remove step, so rows with a missing Age are read and then skipped
+    stream = _stream(Dataset())
+    list(stream)
+    assert (stream.rows_trained, stream.rows_skipped) == (78, 22)
+
+
+def test_holdout_is_the_same_every_epoch():
+    stream = _stream(_removed_age(), chunk_size=10, holdout=0.3)
+    first = np.concatenate([X for X, _ in stream])
+    second = np.concatenate([X for X, _ in stream])
+    np.testing.assert_array_equal(first, second)
+
+    X_holdout, y_holdout = stream.holdout_set()
+    # Counted on the first pass only
+    assert stream.rows_trained + len(X_holdout) == 78
+    assert len(X_holdout) == len(y_holdout) > 0
+
+
+def test_train_incremental_needs_partial_fit_and_classes():
+    model = MLModel()
+    model.get_model('linear', 'regression')
+    with pytest.raises(ValueError, match='cannot be trained incrementally'):
+        model.train_incremental([])
+
+    model = MLModel()
+    model.get_model('sgd', 'classification')
+    with pytest.raises(ValueError, match='classes are required'):
+        model.train_incremental([])
+    with pytest.raises(ValueError, match='No complete rows'):
+        model.train_incremental([(np.empty((0, 2)), np.empty(0))], classes=[0, 1])
+
+
+def _init(client, algorithm='sgd', model_type='classification'):
+    response = client.post('/api/model/init', json={'algorithm': algorithm, 'model_type': model_type})
+    return response.get_json()['model_id']
+
+
+def test_stream_training_endpoint(client, headers):
+    client.post('/api/preprocess/handle-missing-values', headers=headers, json={'column': 'Age', 'method': 'remove'})
+    model_id = _init(client)
+    response = client.post('/api/model/train', headers=headers, json={
+        'stream': True, 'model_id': model_id, 'features': FEATURES, 'target': 'Survived',
+        'chunk_size': 25, 'epochs': 2, 'holdout': 0.2
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['training_samples'] + body['holdout_samples'] == 78
+    assert body['skipped_rows'] == 22 and body['epochs'] == 2 and body['version'] == 1
+    assert 'accuracy' in body['metrics']
+
+    # The saved model replays the preprocessing on raw rows
+    response = client.post('/api/model/predict', json={
+        'model_id': model_id, 'rows': [{'Pclass': 1, 'Age': 30.0, 'Fare': 50.0}]
+    })
+    assert response.status_code == 200
+
+
+def test_stream_from_another_source(client, headers):
+    model_id = _init(client, 'sgd', 'regression')
+    response = client.post('/api/model/train', headers=headers, json={
+        'stream': 'true', 'model_id': model_id, 'features': ['Pclass', 'Fare'], 'target': 'Survived',
+        'source': 'sample.csv'
+    })
+    assert response.status_code == 200
+    assert response.get_json()['training_samples'] == 100
+
+    response = client.post('/api/model/train', headers=headers, json={
+        'stream': True, 'model_id': model_id, 'features': ['Pclass'], 'target': 'Survived',
+        'source': '../missing.csv'
+    })
+    assert response.status_code == 404
+    assert "'../missing.csv' not found" in response.get_json()['error']
+
+
+@pytest.mark.parametrize('body, error', [
+    ({}, 'features are required'),
+    ({'features': ['Pclass'], 'target': 'Survived', 'chunk_size': 0}, 'must be positive'),
+    ({'features': ['Pclass'], 'target': 'Survived', 'holdout': 1}, 'holdout in [0, 1)'),
+    ({'features': ['Pclass'], 'target': 'Survived', 'epochs': 'two'}, 'must be integers'),
+    ({'features': ['Pclass']}, 'target is required'),
+    ({'features': ['Pclass', 'Missing'], 'target': 'Survived'}, 'Missing'),
+])
+def test_stream_training_validation(client, headers, body, error):
+    model_id = _init(client)
+    response = client.post('/api/model/train', headers=headers, json={'stream': True, 'model_id': model_id, **body})
+    assert response.status_code == 400
+    assert error in response.get_json()['error']
+
+
+def test_non_incremental_algorithm_is_rejected(client, headers):
+    model_id = _init(client, 'logistic')
+    response = client.post('/api/model/train', headers=headers, json={
+        'stream': True, 'model_id': model_id, 'features': ['Pclass'], 'target': 'Survived'
+    })
+    assert response.status_code == 400
+    assert 'sgd, naive_bayes, minibatch_kmeans' in response.get_json()['error']
+
+
+def test_async_stream_training(client, headers, queue):
+    model_id = _init(client, 'naive_bayes')
+    response = client.post('/api/model/train', headers=headers, json={
+        'stream': True, 'async': True, 'model_id': model_id, 'features': FEATURES, 'target': 'Survived'
+    })
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    deadline = time.time() + 60
+    while queue._jobs[job_id]['finished_at'] is None:
+        assert time.time() < deadline, 'job did not finish'
+        time.sleep(0.05)
+    status = client.get(f'/api/model/jobs/{job_id}').get_json()
+    assert status['status'] == 'completed', status['error']
+    assert status['training_samples'] == 78 and status['version'] == 1
+    assert client.get(f'/api/model/models/{model_id}').get_json()['versions'][0]['streamed'] is True
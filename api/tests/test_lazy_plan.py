@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+
+from models.dataset import Dataset
+from models.lazy_plan import LogicalPlan, check_columns, make_op, optimize_ops, parse_bool
+
+OPS = [
+    ('fill', {'column': 'Age', 'method': 'median'}),
+    ('cast', {'column': 'Ticket', 'dtype': 'string'}),
+    ('scale', {'columns': ['Age', 'Fare'], 'method': 'standard'}),
+    ('fill', {'column': 'Embarked', 'method': 'mode'}),
+    ('encode', {'column': 'Sex', 'method': 'label'}),
+    ('scale', {'columns': ['SibSp'], 'method': 'standard'}),
+    ('drop', {'column': 'Ticket'}),
+    ('fill', {'column': 'Age', 'method': 'mean'}),
+    ('drop', {'column': 'Name'}),
+    ('fill', {'column': 'Cabin', 'method': 'remove'}),
+]
+
+
+def _ops():
+    return [make_op(op, **params) for op, params in OPS]
+
+
+def test_optimizer_removes_dead_work_and_fuses():
+    optimized, notes = optimize_ops(_ops())
+    kinds = [op['op'] for op in optimized]
+    assert 'cast' not in kinds and kinds.count('drop_many') == 1
+    assert optimized[0] == {'op': 'drop_many', 'columns': ['Name', 'Ticket']}
+    assert any('removed cast of Ticket' in note for note in notes)
+
+    fills, _ = optimize_ops([make_op('fill', column='Age', method='median'), make_op('drop', column='Name'),
+                             make_op('fill', column='Fare', method='mean'), make_op('fill', column='Age', method='mean')])
+    assert fills == [{'op': 'drop_many', 'columns': ['Name']},
+                     {'op': 'fill_many', 'methods': {'Age': 'median', 'Fare': 'mean'}}]
+
+
+def test_drops_stay_behind_steps_that_read_the_column():
+    ops = [make_op('encode', column='Sex', method='label'), make_op('drop', column='Sex'),
+           make_op('scale', columns=['Age', 'Fare'], method='normalizer'), make_op('drop', column='Fare')]
+    optimized, _ = optimize_ops(ops)
+    assert [op['op'] for op in optimized] == ['encode', 'drop_many', 'scale', 'drop_many']
+    assert optimized[2]['columns'] == ['Age', 'Fare']
+
+
+def test_optimized_plan_gives_the_same_frame():
+    eager, lazy = Dataset('api/data/sample.csv'), Dataset('api/data/sample.csv')
+    eager.apply_operations(_ops(), 'eager', optimize=False)
+    result = lazy.apply_operations(_ops(), 'lazy', optimize=True)
+    assert result['executed'] < len(OPS)
+    pd.testing.assert_frame_equal(lazy.preprocessed_df, eager.preprocessed_df)
+    # The recorded steps replay to the same features on raw rows
+    raw = eager.df.loc[eager.preprocessed_df.index]
+    features = ['Age', 'Fare', 'SibSp', 'Sex_encoded']
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(lazy.pipeline.compile(features).transform(raw)),
+        pd.DataFrame(eager.pipeline.compile(features).transform(raw))
+    )
+
+
+@pytest.mark.parametrize('op, params', [
+    ('pivot', {'column': 'Age'}), ('fill', {'column': 'Age'}), ('fill', {'column': 'Age', 'method': 'max'}),
+    ('encode', {'column': 'Sex', 'method': 'binary'}), ('cast', {'column': 'Age', 'dtype': 'bogus'}),
+    ('encode', {'column': 'Sex', 'method': 'onehot', 'sparse': 'perhaps'})
+])
+def test_invalid_operations(op, params):
+    with pytest.raises(ValueError):
+        make_op(op, **params)
+
+
+def test_aliases_and_flags():
+    assert make_op('handle-missing-values', column='Age', method='remove') == {'op': 'drop_rows', 'column': 'Age',
+                                                                              'method': 'remove'}
+    assert make_op('encode', column='Sex', method='onehot', sparse='false')['sparse'] is False
+    assert [parse_bool(value) for value in ('yes', '0', 1, True, '')] == [True, False, True, True, False]
+
+
+def test_queued_steps_may_use_columns_created_earlier():
+    plan = LogicalPlan()
+    columns = ['Sex', 'Age']
+    plan.extend([make_op('encode', column='Sex', method='onehot')], columns)
+    plan.extend([make_op('drop', column='Sex_male')], columns)
+    with pytest.raises(ValueError, match='Fare'):
+        plan.extend([make_op('drop', column='Age'), make_op('drop', column='Fare')], columns)
+    # A rejected batch queues nothing
+    assert len(plan.ops) == 2
+    with pytest.raises(ValueError):
+        check_columns([make_op('fill', column='Sex_encoded', method='mode')], columns)
+
+
+def test_lazy_endpoints(client, headers):
+    def post(path, **body):
+        return client.post(f'/api/preprocess/{path}', headers=headers, json=body)
+
+    assert post('lazy', enabled='false').get_json()['lazy'] is False
+    assert post('lazy', enabled='nope').status_code == 400
+    assert post('lazy', enabled=True).get_json()['lazy'] is True
+
+    assert post('handle-missing-values', column='Age', method='median').status_code == 202
+    assert post('delete-column', column='Name').status_code == 202
+    assert post('delete-column', column='Missing').status_code == 400
+    plan = client.get('/api/preprocess/plan', headers=headers).get_json()
+    assert len(plan['steps']) == 2 and plan['enabled'] is True
+    # Nothing ran yet
+    assert 'Name' in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+
+    response = post('execute')
+    assert response.status_code == 200 and response.get_json()['steps'] == 2
+    assert 'Name' not in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+    assert post('execute').get_json()['steps'] == 0
+
+    post('delete-column', column='Ticket')
+    assert client.delete('/api/preprocess/plan', headers=headers).status_code == 200
+    assert client.get('/api/preprocess/plan', headers=headers).get_json()['steps'] == []
+
+    # Reading the dataset runs whatever is queued
+    post('delete-column', column='Cabin')
+    rows = client.get('/api/dataset', headers=headers).get_json()
+    assert client.get('/api/preprocess/plan', headers=headers).get_json()['steps'] == []
+    assert 'Cabin' not in client.get('/api/preprocess/head', headers=headers).get_json()['columns']
+    assert rows
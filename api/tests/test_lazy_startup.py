@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from models.dataset import Dataset
+from tests.conftest import API_DIR
+
+PROBE = '''
+import json, sys
+from app import app
+from models.dataset_registry import dataset_registry
+dataset = dataset_registry.get()
+startup = {'sklearn': 'sklearn' in sys.modules, 'loaded': dataset.loaded}
+app.test_client().get('/api/shape')
+print(json.dumps({'startup': startup, 'loaded': dataset.loaded}))
+'''
+
+
+def test_startup_defers_imports_and_loading():
+    # A fresh interpreter, the test session has long imported everything
+    output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': API_DIR}, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result['startup'] == {'sklearn': False, 'loaded': False}
+    assert result['loaded'] is True
+
+
+def test_dataset_loads_on_first_access():
+    dataset = Dataset('api/data/sample.csv')
+    assert not dataset.loaded
+    assert dataset.memory_usage()['total'] == 0
+    assert dataset.get_shape() == {'rows': 100, 'columns': 12}
+    assert dataset.loaded
+
+
+def test_eager_dataset_and_missing_file():
+    assert Dataset('api/data/sample.csv', lazy=False).loaded
+    dataset = Dataset('api/data/missing.csv')
+    with pytest.raises(FileNotFoundError):
+        dataset.df
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.loader import DatasetLoader
+
+SAMPLE = 'api/data/sample.csv'
+
+
+@pytest.fixture
+def wide_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'id': np.arange(1000),
+        'score': rng.normal(size=1000),
+        'city': rng.choice(['a', 'b', 'c'], 1000),
+        'note': [f'n{i}' for i in range(1000)]
+    })
+    path = tmp_path / 'wide.csv'
+    df.to_csv(path, index=False)
+    return str(path), df
+
+
+def test_chunked_csv_load_matches_read_csv():
+    expected = pd.read_csv(SAMPLE)
+    loaded = DatasetLoader(chunksize=7).load(SAMPLE)
+    pd.testing.assert_frame_equal(loaded, expected)
+
+
+def test_dtype_optimizations_are_opt_in(wide_csv):
+    path, _ = wide_csv
+    assert DatasetLoader().load(path).dtypes.to_dict() == pd.read_csv(path).dtypes.to_dict()
+
+    optimized = DatasetLoader(chunksize=300, downcast_ints=True, downcast_floats=True,
+                              categorical_threshold=0.5).load(path)
+    assert optimized['id'].dtype == np.int16
+    assert optimized['score'].dtype == np.float32
+    assert isinstance(optimized['city'].dtype, pd.CategoricalDtype)
+    # Every value is unique, so the column is not worth a category
+    assert optimized['note'].dtype == object
+
+
+def test_categories_are_merged_across_chunks(wide_csv):
+    path, df = wide_csv
+    loaded = DatasetLoader(chunksize=100, categorical_threshold=0.5).load(path)
+    assert loaded['city'].astype(str).tolist() == df['city'].tolist()
+
+
+def test_late_text_in_a_numeric_column(tmp_path):
+    # The schema sample only sees numbers, the full load must still keep the text
+    path = tmp_path / 'late.csv'
+    pd.DataFrame({'value': ['1.5'] * 50 + ['n/a?'] + ['2.5'] * 49}).to_csv(path, index=False)
+    loaded = DatasetLoader(chunksize=20, sample_rows=10).load(str(path))
+    assert len(loaded) == 100
+    assert 'n/a?' in loaded['value'].astype(str).tolist()
+
+
+@pytest.mark.parametrize('extension', ['parquet', 'feather'])
+def test_columnar_files(tmp_path, wide_csv, extension):
+    pytest.importorskip('pyarrow')
+    _, df = wide_csv
+    path = str(tmp_path / f'wide.{extension}')
+    getattr(df, f'to_{extension}')(path)
+    pd.testing.assert_frame_equal(DatasetLoader().load(path), df)
+
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet', 'feather'])
+def test_iter_chunks_bounds_chunk_size(tmp_path, wide_csv, extension):
+    if extension != 'csv':
+        pytest.importorskip('pyarrow')
+    _, df = wide_csv
+    path = str(tmp_path / f'wide.{extension}')
+    if extension == 'csv':
+        df.to_csv(path, index=False)
+    elif extension == 'parquet':
+        df.to_parquet(path)
+    else:
+        # One record batch for the whole table
+        df.to_feather(path, chunksize=len(df))
+    chunks = list(DatasetLoader(chunksize=300).iter_chunks(path, ['id', 'city']))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    assert list(chunks[0].columns) == ['id', 'city']
+    assert pd.concat(chunks)['id'].tolist() == df['id'].tolist()
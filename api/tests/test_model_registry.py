@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+from models.ml_models import MLModel
+from models.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(root=str(tmp_path), cache_size=1, shared=None)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, 2))
+    return X, X[:, 0] * 2 + X[:, 1]
+
+
+def _linear():
+    ml_model = MLModel()
+    ml_model.get_model('linear', 'regression')
+    return ml_model
+
+
+def test_versions_are_saved_and_reloaded(registry, data):
+    X, y = data
+    ml_model = _linear()
+    model_id = registry.register(ml_model)
+    ml_model.train(X, y)
+    assert registry.save(model_id, ml_model, training_samples=40) == 1
+    ml_model.train(X[:10], y[:10] + 1)
+    assert registry.save(model_id, ml_model) == 2
+
+    # The cache holds one version, the first one comes back from its memory-mapped dump
+    first = registry.get(model_id, 1)
+    assert first.algorithm == 'linear' and first.model_type == 'regression'
+    np.testing.assert_allclose(first.model.predict(X), y, atol=1e-9)
+    assert isinstance(first.model.coef_, np.memmap)
+    assert registry.get(model_id) is not first
+
+    meta = registry.describe(model_id)
+    assert [version['version'] for version in meta['versions']] == [1, 2]
+    assert meta['versions'][0]['training_samples'] == 40
+
+
+def test_restart_rebuilds_the_draft_from_the_latest_version(registry, data):
+    ml_model = _linear()
+    model_id = registry.register(ml_model)
+    ml_model.train(*data)
+    registry.save(model_id, ml_model)
+
+    restarted = ModelRegistry(root=registry.root, shared=None)
+    assert [meta['model_id'] for meta in restarted.list_models()] == [model_id]
+    draft = restarted.draft(model_id)
+    assert draft.algorithm == 'linear'
+    # get() without a version returns the draft from now on, it has to be the fitted latest version
+    np.testing.assert_allclose(restarted.get(model_id).model.predict(data[0]), data[1], atol=1e-9)
+
+
+def test_released_draft_is_written_to_disk(registry):
+    model_id = registry.register(_linear())
+    registry.release(model_id)
+    assert os.path.exists(os.path.join(registry.root, model_id, 'draft.joblib'))
+    assert registry.draft(model_id).algorithm == 'linear'
+    assert registry.describe(model_id)['versions'] == []
+
+
+def test_unknown_models(registry):
+    model_id = registry.register(_linear())
+    for call in (lambda: registry.get('missing'), lambda: registry.describe('../escape'),
+                 lambda: registry.get(model_id, 3), lambda: registry.delete('missing')):
+        with pytest.raises(LookupError):
+            call()
+    registry.delete(model_id)
+    with pytest.raises(LookupError):
+        registry.get(model_id)
+
+
+def test_model_endpoints(client):
+    model_id = client.post('/api/model/init', json={'algorithm': 'linear', 'model_type': 'regression'}
+                           ).get_json()['model_id']
+    rows = [{'a': float(i), 'b': float(i % 3)} for i in range(20)]
+    response = client.post('/api/model/train', json={
+        'model_id': model_id, 'X_train': rows, 'y_train': [row['a'] - row['b'] for row in rows], 'features': ['a', 'b']
+    })
+    assert response.status_code == 200 and response.get_json()['version'] == 1
+    assert client.get(f'/api/model/models/{model_id}').get_json()['versions'][0]['training_samples'] == 20
+    prediction = client.post('/api/model/predict', json={
+        'model_id': model_id, 'version': 1, 'features': [[4.0, 1.0]], 'feature_names': ['a', 'b']
+    }).get_json()
+    assert prediction['predictions'][0] == pytest.approx(3.0)
+
+    assert client.delete(f'/api/model/models/{model_id}').status_code == 200
+    assert client.get(f'/api/model/models/{model_id}').status_code == 404
+    assert client.post('/api/model/train', json={
+        'model_id': model_id, 'X_train': rows, 'y_train': [0] * 20, 'features': ['a', 'b']
+    }).status_code == 404
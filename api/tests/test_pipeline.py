@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.pipeline import CompiledPipeline, PreprocessingPipeline
+from models.preprocessing import DataPreprocessor
+
+
+@pytest.fixture
+def raw():
+    return pd.read_csv('api/data/sample.csv')
+
+
+def _preprocess(raw):
+    preprocessor = DataPreprocessor(raw.copy())
+    preprocessor.handle_missing_values('Embarked', 'remove')
+    preprocessor.handle_missing_values('Age', 'median')
+    preprocessor.cast_column('Pclass', 'float')
+    preprocessor.encode_categorical('Sex', 'label')
+    preprocessor.encode_categorical('Embarked', 'onehot', top_k=2)
+    preprocessor.encode_categorical('Ticket', 'hashing', n_features=4)
+    preprocessor.encode_categorical('Cabin', 'frequency')
+    preprocessor.scale_features(['Age', 'Fare'], 'standard')
+    preprocessor.scale_features(['Age'], 'minmax')
+    preprocessor.scale_features(['SibSp', 'Parch'], 'normalizer')
+    preprocessor.delete_column('Name')
+    return preprocessor
+
+
+def test_replay_matches_the_preprocessed_frame(raw):
+    preprocessor = _preprocess(raw)
+    features = [column for column in preprocessor.df.columns
+                if column not in ('PassengerId', 'Survived', 'Sex', 'Ticket', 'Cabin')]
+    compiled = preprocessor.pipeline.compile(features)
+    # Row removal is not replayed, the raw rows are the ones that survived it
+    rows = raw.loc[preprocessor.df.index]
+    expected = preprocessor.df[features].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(compiled.transform(rows), expected, atol=1e-9)
+    assert compiled.inputs == {'Age', 'Fare', 'Pclass', 'Sex', 'Embarked', 'Ticket', 'Cabin', 'SibSp', 'Parch'}
+
+
+def test_scalings_are_fused_and_unused_steps_pruned(raw):
+    compiled = _preprocess(raw).pipeline.compile(['Age', 'Sex_encoded'])
+    kinds = [op[0] for op in compiled.ops]
+    assert kinds.count('affine') == 1
+    assert set(kinds) == {'fill', 'affine', 'label'}
+    assert compiled.inputs == {'Age', 'Sex'}
+
+
+def test_unseen_values_and_missing_inputs(raw):
+    compiled = _preprocess(raw).pipeline.compile(['Sex_encoded', 'Embarked_S', 'Embarked_other', 'Cabin_freq'])
+    rows = pd.DataFrame({'Sex': ['unknown', 'male'], 'Embarked': ['Q', None], 'Cabin': ['Z99', None]})
+    np.testing.assert_array_equal(compiled.transform(rows), [[-1, 0, 1, 0], [1, 0, 0, 0]])
+    with pytest.raises(ValueError, match='Missing input column'):
+        compiled.transform(rows.drop(columns=['Cabin']))
+
+
+def test_target_encoding_replays_the_full_means(raw):
+    preprocessor = DataPreprocessor(raw.copy())
+    preprocessor.encode_categorical('Sex', 'target', target='Survived', smoothing=0.0)
+    compiled = preprocessor.pipeline.compile(['Sex_target'])
+    means = raw.groupby('Sex')['Survived'].mean()
+    replayed = compiled.transform(pd.DataFrame({'Sex': ['female', 'male', 'other']}))[:, 0]
+    np.testing.assert_allclose(replayed, [means['female'], means['male'], raw['Survived'].mean()])
+
+
+def test_pipeline_bookkeeping():
+    pipeline = PreprocessingPipeline()
+    pipeline.record('fill', column='a', method='mean', value=1.0)
+    pipeline.record('drop_rows', column='b')
+    copy = pipeline.copy()
+    copy.record('drop', column='a')
+    assert len(pipeline.steps) == 2
+    assert pipeline.describe() == [{'kind': 'fill', 'column': 'a', 'method': 'mean'},
+                                   {'kind': 'drop_rows', 'column': 'b'}]
+    assert CompiledPipeline(pipeline.steps, ['a']).ops[0][0] == 'fill'
+
+
+def test_predict_raw_rows(client, headers):
+    client.post('/api/preprocess/handle-missing-values', headers=headers, json={'column': 'Age', 'method': 'mean'})
+    client.post('/api/preprocess/encode', headers=headers, json={'column': 'Sex', 'method': 'label'})
+    split_id = client.post('/api/preprocess/split', headers=headers, json={
+        'features': ['Age', 'Sex_encoded', 'Fare'], 'target': 'Survived', 'include_data': False
+    }).get_json()['split_id']
+    model_id = client.post('/api/model/init', json={'algorithm': 'logistic', 'model_type': 'classification'}
+                           ).get_json()['model_id']
+    client.post('/api/model/train', json={'model_id': model_id, 'split_id': split_id})
+
+    rows = [{'Age': None, 'Sex': 'female', 'Fare': 80.0}, {'Age': 30, 'Sex': 'male', 'Fare': 7.5}]
+    response = client.post('/api/model/predict', json={'model_id': model_id, 'rows': rows})
+    assert response.status_code == 200 and response.get_json()['samples_predicted'] == 2
+    response = client.post('/api/model/predict', json={'model_id': model_id, 'rows': [{'Age': 1}]})
+    assert response.status_code == 400
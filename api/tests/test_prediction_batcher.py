@@ -0,0 +1,123 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from models.prediction_batcher import PredictionBatcher
+
+
+class SumModel:
+    # Predicts the row sums and records the batch sizes it was called with
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, X):
+        time.sleep(self.delay)
+        if np.isnan(X).any():
+            raise ValueError('Input contains NaN')
+        self.calls.append(len(X))
+        return X.sum(axis=1).tolist()
+
+    def predict_ensemble(self, X):
+        return [-value for value in self.predict(X)]
+
+
+def _concurrently(batcher, model, payloads, ensemble=False):
+    results = [None] * len(payloads)
+    start = threading.Barrier(len(payloads))
+
+    def run(position):
+        start.wait()
+        try:
+            results[position] = batcher.predict(model, payloads[position], ensemble)
+        except Exception as e:
+            results[position] = e
+
+    threads = [threading.Thread(target=run, args=(position,)) for position in range(len(payloads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_share_batches():
+    batcher = PredictionBatcher(max_wait_ms=100)
+    model = SumModel()
+    payloads = [np.full((position + 1, 2), float(position)) for position in range(8)]
+    results = _concurrently(batcher, model, payloads)
+    assert results == [[2.0 * position] * (position + 1) for position in range(8)]
+    assert len(model.calls) < 8 and sum(model.calls) == 36
+    stats = batcher.stats()
+    assert stats['requests'] == 8 and stats['rows'] == 36 and stats['latency_ms']['p50'] is not None
+
+
+def test_batch_size_limit_and_single_rows():
+    batcher = PredictionBatcher(max_batch_size=2, max_wait_ms=100)
+    model = SumModel()
+    results = _concurrently(batcher, model, [[1.0, 2.0]] * 6)
+    assert results == [[3.0]] * 6
+    assert max(model.calls) <= 2
+
+
+def test_bad_payload_only_fails_its_own_request():
+    batcher = PredictionBatcher(max_wait_ms=100)
+    model = SumModel()
+    payloads = [np.ones((2, 2)), np.array([[np.nan, 1.0]]), np.ones((1, 2)), np.ones((1, 3))]
+    results = _concurrently(batcher, model, payloads, ensemble=True)
+    assert results[0] == [-2.0, -2.0] and results[2] == [-2.0] and results[3] == [-3.0]
+    assert isinstance(results[1], ValueError)
+
+
+def test_invalid_shape_and_timeout():
+    batcher = PredictionBatcher(timeout=0.05)
+    with pytest.raises(ValueError):
+        batcher.predict(SumModel(), np.ones((2, 2, 2)))
+    with pytest.raises(TimeoutError):
+        batcher.predict(SumModel(delay=0.5), np.ones((1, 2)))
+
+
+def test_configure_validates():
+    batcher = PredictionBatcher()
+    batcher.configure(max_batch_size=8, max_wait_ms=0)
+    assert (batcher.max_batch_size, batcher.max_wait_ms) == (8, 0)
+    with pytest.raises(ValueError):
+        batcher.configure(max_batch_size=0)
+    with pytest.raises(ValueError):
+        batcher.configure(max_wait_ms=-1)
+
+
+def test_batching_endpoints(client):
+    response = client.post('/api/model/predict/config', json={'max_batch_size': 0})
+    assert response.status_code == 400
+    assert client.post('/api/model/predict/config', json={'max_wait_ms': 'soon'}).status_code == 400
+    stats = client.get('/api/model/predict/stats').get_json()
+    assert {'requests', 'rows', 'batches', 'latency_ms', 'max_batch_size'} <= set(stats)
+
+
+def test_binary_and_columnar_predictions(client):
+    model_id = client.post('/api/model/init', json={'algorithm': 'linear', 'model_type': 'regression'}
+                           ).get_json()['model_id']
+    rows = [{'a': float(i), 'b': float(i % 4)} for i in range(12)]
+    client.post('/api/model/train', json={'model_id': model_id, 'X_train': rows, 'features': ['a', 'b'],
+                                          'y_train': [row['a'] + 2 * row['b'] for row in rows]})
+
+    body = np.array([[1.0, 1.0], [2.0, 0.0]], dtype='<f4').tobytes()
+    response = client.post(f'/api/model/predict?model_id={model_id}&n_features=2&dtype=float32', data=body,
+                           content_type='application/octet-stream')
+    assert response.get_json()['predictions'] == pytest.approx([3.0, 2.0])
+    response = client.post('/api/model/predict', json={
+        'model_id': model_id, 'features': {'b': [1.0], 'a': [1.0]}, 'feature_names': ['a', 'b']
+    })
+    assert response.get_json()['predictions'] == pytest.approx([3.0])
+
+    for query, data in (('n_features=2', body[:12]), ('n_features=2&dtype=int8', body), ('', body)):
+        response = client.post(f'/api/model/predict?model_id={model_id}&{query}', data=data,
+                               content_type='application/octet-stream')
+        assert response.status_code == 400
+    response = client.post('/api/model/predict', json={
+        'model_id': model_id, 'features': {'a': [1.0]}, 'feature_names': ['a', 'b']
+    })
+    assert response.status_code == 400
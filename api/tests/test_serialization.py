@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.serialization import column_to_list, prepare_records
+
+
+def test_missing_values_become_none():
+    assert column_to_list(pd.Series([1.5, np.nan])) == [1.5, None]
+    assert column_to_list(pd.Series([1, None], dtype='Int64')) == [1, None]
+    assert column_to_list(pd.Series(['a', np.nan])) == ['a', None]
+    assert column_to_list(pd.Series(pd.to_datetime(['2024-01-01', None])))[1] is None
+    assert column_to_list(pd.Series(['x', None], dtype='category')) == ['x', None]
+
+
+def test_values_are_python_scalars():
+    values = column_to_list(pd.Series([np.int64(1), np.float32(2.5), 'x'], dtype=object))
+    assert values == [1, 2.5, 'x']
+    assert all(not isinstance(value, np.generic) for value in values)
+    assert type(column_to_list(pd.Series([1, 2], dtype=np.int8))[0]) is int
+    assert type(column_to_list(pd.Series([True, False]))[0]) is bool
+
+
+def test_prepare_records(app):
+    df = pd.DataFrame({'a': [1, 2], 'b': [np.nan, 0.5], 3: ['x', None]})
+    records = prepare_records(df)
+    assert records == [{'a': 1, 'b': None, '3': 'x'}, {'a': 2, 'b': 0.5, '3': None}]
+    # Strict JSON, NaN would not parse in a browser
+    json.loads(app.json.dumps(records))
+
+
+def test_empty_frame():
+    assert prepare_records(pd.DataFrame({'a': []})) == []
@@ -0,0 +1,182 @@
+import importlib.util
+import json
+import os
+import stat
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.dataset import Dataset
+from models.dataset_registry import DatasetRegistry
+from models.ml_models import MLModel
+from models.model_registry import ModelRegistry
+from models.shared_store import KEEP_GENERATIONS, SharedDataset, SharedStore, read_frame, write_frame
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(str(tmp_path / 'shared'))
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'x': np.arange(5, dtype=np.float64),
+        'n': np.arange(5),
+        'name': ['a', 'b', None, 'd', 'e'],
+        'flag': pd.array([True, None, False, True, False], dtype='boolean')
+    })
+
+
+def test_frame_round_trip_uses_json_metadata(tmp_path, frame):
+    path = str(tmp_path / 'frame')
+    names, files = write_frame(frame, path)
+    assert files == ['c0.npy', 'c1.npy', None, None]
+
+    with open(os.path.join(path, 'frame.json')) as handle:
+        meta = json.load(handle)
+    assert meta['names'] == names and meta['index'] == {'start': 0, 'stop': 5, 'step': 1, 'name': None}
+    pd.testing.assert_frame_equal(read_frame(path), frame)
+
+
+def test_frame_with_custom_index(tmp_path, frame):
+    filtered = frame.iloc[[0, 2, 4]]
+    write_frame(filtered, str(tmp_path / 'frame'))
+    pd.testing.assert_frame_equal(read_frame(str(tmp_path / 'frame')), filtered)
+
+
+def test_shared_directory_is_private(tmp_path):
+    store = SharedStore(str(tmp_path / 'shared'))
+    assert stat.S_IMODE(os.stat(store.root).st_mode) == 0o700
+
+    writable = tmp_path / 'writable'
+    writable.mkdir()
+    os.chmod(writable, 0o777)
+    with pytest.raises(PermissionError, match='not writable by others'):
+        SharedStore(str(writable))
+
+
+def test_publish_and_attach(store, frame):
+    shared = store.dataset('d1')
+    assert shared.version() == 0 and shared.attach() is None
+    with shared.exclusive():
+        first = shared.publish(frame, [{'kind': 'fill', 'column': 'x'}], 'data.csv', 'load', raw_df=frame)
+
+    state = store.dataset('d1').attach()
+    assert state['generation'] == first and state['raw'] == first
+    assert state['filename'] == 'data.csv' and state['label'] == 'load'
+    assert state['pipeline_steps'] == [{'kind': 'fill', 'column': 'x'}]
+    pd.testing.assert_frame_equal(state['df'], frame)
+    pd.testing.assert_frame_equal(state['raw_df'], frame)
+    # Workers already holding that raw frame do not map it again
+    assert store.dataset('d1').attach(raw_generation=first)['raw_df'] is None
+    assert store.dataset_ids() == ['d1'] and store.has_dataset('d1')
+
+
+def test_unchanged_columns_are_linked_and_old_generations_collected(store, frame):
+    shared = store.dataset('d1')
+    with shared.exclusive():
+        shared.publish(frame, [], 'data.csv', 'load', raw_df=frame)
+        second = shared.publish(frame.assign(x=frame['x'] * 2), [], 'data.csv', 'scale x', columns=['x'])
+    path = lambda generation, name: os.path.join(shared.path, f'g{generation}', name)
+    assert os.stat(path(1, 'c1.npy')).st_ino == os.stat(path(2, 'c1.npy')).st_ino
+    assert os.stat(path(1, 'c0.npy')).st_ino != os.stat(path(2, 'c0.npy')).st_ino
+
+    with shared.exclusive():
+        for _ in range(KEEP_GENERATIONS):
+            latest = shared.publish(frame, [], 'data.csv', 'again', columns=None)
+    generations = sorted(name for name in os.listdir(shared.path) if name.startswith('g'))
+    assert generations == [f'g{generation}' for generation in range(latest - KEEP_GENERATIONS + 1, latest + 1)]
+    assert f'g{second}' not in generations
+    # The raw frame is still referenced by the kept generations
+    assert os.path.isdir(os.path.join(shared.path, 'raw1'))
+
+
+def test_exclusive_is_reentrant(store):
+    shared = store.dataset('d1')
+    with shared.exclusive():
+        with shared.exclusive():
+            assert shared._depth == 2
+    assert shared._depth == 0 and shared._lock_file is None
+
+
+def test_datasets_sync_across_workers(store):
+    # Each Dataset plays a worker process attached to the same shared dataset
+    writer = Dataset(shared=store.dataset('d1'))
+    writer.load_data()
+    reader = Dataset(shared=SharedDataset(store.dataset('d1').path))
+    rows = len(reader.preprocessed_df)
+
+    with writer.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'remove')
+        writer.commit_preprocessed(preprocessor.df, 'remove Age', None, preprocessor.pipeline.steps)
+
+    synced = reader.preprocessed_df
+    assert len(synced) == rows - 22
+    assert [step['kind'] for step in reader.pipeline.steps] == ['drop_rows']
+    assert reader.history.list_versions()['current'] == 1
+
+
+def test_registries_share_datasets(store):
+    first = DatasetRegistry(shared=store)
+    first.create('shared-one')
+    second = DatasetRegistry(shared=store)
+    assert len(second.get('shared-one').preprocessed_df) == 100
+
+    second.remove('shared-one')
+    assert not store.has_dataset('shared-one')
+    with pytest.raises(LookupError):
+        DatasetRegistry(shared=store).get('shared-one')
+
+
+def test_model_drafts_and_current_are_shared(tmp_path, store):
+    root = str(tmp_path / 'models')
+    ml_model = MLModel()
+    ml_model.get_model('linear', 'regression')
+    model_id = ModelRegistry(root=root, shared=store).register(ml_model)
+    ModelRegistry(root=root, shared=store).set_current(model_id)
+
+    other = ModelRegistry(root=root, shared=store)
+    assert other.current() == model_id
+    assert other.get(model_id).algorithm == 'linear'
+    assert ModelRegistry(root=root, shared=None).current() is None
+
+
+def _load_conf(monkeypatch, allow=None):
+    # Set here so the config's setdefault does not leak shared mode into later tests
+    monkeypatch.setenv('MLFLOW_SHARED_DIR', '/nonexistent')
+    if allow is None:
+        monkeypatch.delenv('MLFLOW_ALLOW_PER_PROCESS_STATE', raising=False)
+    else:
+        monkeypatch.setenv('MLFLOW_ALLOW_PER_PROCESS_STATE', allow)
+    monkeypatch.delenv('MLFLOW_WORKERS', raising=False)
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', CONF_PATH)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+    return conf
+
+
+def _server(workers):
+    return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+
+def test_gunicorn_defaults_to_one_worker(monkeypatch):
+    conf = _load_conf(monkeypatch)
+    assert conf.workers == 1
+    conf.on_starting(_server(1))
+
+
+def test_gunicorn_refuses_several_workers(monkeypatch):
+    conf = _load_conf(monkeypatch)
+    with pytest.raises(RuntimeError, match='3 workers requested'):
+        conf.on_starting(_server(3))
+
+
+def test_gunicorn_allows_several_workers_when_asked(monkeypatch):
+    conf = _load_conf(monkeypatch, allow='1')
+    conf.on_starting(_server(3))
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.sketches import ColumnSketch, DatasetSketches, HyperLogLog, KLLSketch, ReservoirSample
+
+
+def test_hyperloglog_estimate_within_error():
+    sketch = HyperLogLog()
+    for start in range(0, 50_000, 10_000):
+        sketch.update(np.arange(start, start + 10_000))
+    sketch.update(np.arange(1000))  # Repeats do not count
+    assert sketch.estimate() == pytest.approx(50_000, rel=3 * sketch.relative_error)
+    small = HyperLogLog()
+    small.update(np.array(['a', 'b', 'a']))
+    assert round(small.estimate()) == 2
+
+
+def test_hyperloglog_merge_equals_union():
+    left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(np.arange(0, 6000))
+    right.update(np.arange(4000, 10_000))
+    both.update(np.arange(0, 10_000))
+    left.merge(right)
+    np.testing.assert_array_equal(left.registers, both.registers)
+
+
+def test_kll_quantiles_within_rank_error():
+    values = np.random.default_rng(0).permutation(100_000).astype(float)
+    sketch = KLLSketch(seed=0)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+    fractions = [0.1, 0.25, 0.5, 0.75, 0.9]
+    for fraction, estimate in zip(fractions, sketch.quantiles(fractions)):
+        assert abs(estimate / len(values) - fraction) <= sketch.rank_error
+    assert KLLSketch().quantiles([0.5]) == [None]
+
+
+def test_column_sketch_moments_are_exact():
+    series = pd.Series(np.random.default_rng(1).normal(size=5000))
+    series[::7] = np.nan
+    sketch = ColumnSketch(series.dtype)
+    for start in range(0, len(series), 777):
+        sketch.update(series.iloc[start:start + 777])
+    count, mean, std, low, *_, high = sketch.describe()
+    assert count == series.count()
+    assert mean == pytest.approx(series.mean())
+    assert std == pytest.approx(series.std())
+    assert (low, high) == (series.min(), series.max())
+    assert sketch.missing == series.isna().sum()
+
+
+def test_text_sketch_counts_missing_as_a_value():
+    sketch = ColumnSketch(np.dtype(object))
+    sketch.update(pd.Series(['a', 'b', None, 'a']))
+    assert sketch.distinct_count() == 3
+    assert sketch.quantiles is None
+
+
+def test_reservoir_sample_is_unique_and_bounded():
+    sample = ReservoirSample(size=100, seed=0)
+    for _ in range(10):
+        sample.update(1000)
+    assert sample.seen == 10_000
+    assert len(set(sample.positions.tolist())) == 100
+    assert sample.positions.max() < 10_000
+    # Later rows get in too
+    assert (sample.positions >= 5000).any()
+
+
+def test_dataset_sketches_rebuild_changed_columns():
+    sketches = DatasetSketches()
+    frame = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'y': ['a', 'b', 'c']})
+    sketches.update(frame)
+    first = sketches.get(frame)
+    assert sketches.get(frame)['x'] is first['x']
+    changed = frame.assign(x=frame['x'].astype(str))
+    assert not sketches.get(changed)['x'].numeric
+    positions = sketches.sample_positions(len(frame), 2)
+    assert len(positions) == 2 and list(positions) == sorted(positions)
+
+
+def test_approximate_endpoints(client, headers):
+    exact = client.get('/api/describe', headers=headers).get_json()
+    approximate = client.get('/api/describe?approx=true', headers=headers).get_json()
+    assert approximate['approximate'] is True
+    assert set(approximate['error_bounds']) == {'distinct_relative_error', 'quantile_rank_error'}
+    assert approximate['columns'] == exact['columns']
+    # Count, mean, min and max are exact, only the quartiles are estimates
+    for position in (0, 1, 3, 7):
+        assert approximate['data'][position]['Age'] == pytest.approx(exact['data'][position]['Age'])
+
+    numerical = client.get('/api/preprocess/numerical-columns?approx=true', headers=headers).get_json()
+    ages = next(column for column in numerical['columns'] if column['name'] == 'Age')
+    assert numerical['approximate'] is True and ages['max'] == pytest.approx(exact['data'][7]['Age'])
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from models.shared_store import SharedStore
+from models.split_store import SplitStore
+
+
+def _arrays(rows=10):
+    X = np.arange(rows * 2, dtype=np.float64).reshape(rows, 2)
+    y = np.arange(rows) % 2
+    return X[:8], X[8:], y[:8], y[8:]
+
+
+def test_split_round_trip():
+    store = SplitStore(shared=None)
+    X_train, X_test, y_train, y_test = _arrays()
+    split_id = store.save(X_train, X_test, y_train, y_test, ['a', 'b'], 'y')
+
+    split = store.get(split_id)
+    np.testing.assert_array_equal(split['X_train'], X_train)
+    np.testing.assert_array_equal(split['y_test'], y_test)
+    assert split['features'] == ['a', 'b']
+    assert split['target'] == 'y'
+
+
+def test_oldest_split_is_evicted():
+    store = SplitStore(max_splits=2, shared=None)
+    first = store.save(*_arrays(), ['a', 'b'], 'y')
+    store.save(*_arrays(), ['a', 'b'], 'y')
+    store.save(*_arrays(), ['a', 'b'], 'y')
+    with pytest.raises(LookupError, match='Unknown split_id'):
+        store.get(first)
+
+
+def test_delete():
+    store = SplitStore(shared=None)
+    split_id = store.save(*_arrays(), ['a', 'b'], 'y')
+    assert store.delete(split_id)
+    assert not store.delete(split_id)
+    with pytest.raises(LookupError):
+        store.get(split_id)
+
+
+def test_shared_split_is_visible_to_another_store(tmp_path):
+    shared = SharedStore(str(tmp_path / 'shared'))
+    X_train, X_test, y_train, y_test = _arrays()
+    split_id = SplitStore(shared=shared).save(X_train, X_test, y_train, y_test, ['a', 'b'], 'y')
+
+    # Another worker process has its own SplitStore on the same directory
+    split = SplitStore(shared=shared).get(split_id)
+    np.testing.assert_array_equal(split['X_train'], X_train)
+    assert split['target'] == 'y'
+
+
+def test_train_from_split_id(client, headers):
+    response = client.post('/api/preprocess/split', headers=headers, json={
+        'features': ['Pclass', 'Fare'], 'target': 'Survived', 'include_data': False
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert 'X_train' not in body
+    assert body['train_size'] + body['test_size'] == 100
+
+    client.post('/api/model/init', json={'algorithm': 'logistic', 'model_type': 'classification', 'params': {}})
+    response = client.post('/api/model/train', json={'split_id': body['split_id']})
+    assert response.status_code == 200
+    assert response.get_json()['training_samples'] == body['train_size']
+
+
+@pytest.mark.parametrize('path', ['/api/model/train', '/api/model/evaluate', '/api/model/predict'])
+def test_unknown_split_id(client, path):
+    response = client.post(path, json={'split_id': 'nope'})
+    assert response.status_code == 404
+    assert 'Unknown split_id' in response.get_json()['error']
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from models.training_jobs import TrainingJobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = TrainingJobQueue(max_workers=1)
+    yield queue
+    if queue._executor is not None:
+        queue._executor.shutdown(cancel_futures=True)
+        queue._manager.shutdown()
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 3))
+    return X, (X[:, 0] > 0).astype(int)
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while queue._jobs[job_id]['finished_at'] is None:
+        assert time.time() < deadline, 'job did not finish'
+        time.sleep(0.05)
+    return queue.status(job_id)
+
+
+def test_completed_job_hands_over_the_model(queue, data):
+    received = []
+    job_id = queue.submit(LogisticRegression(), *data, on_complete=received.append, metadata={'model_id': 'm'})
+    status = _wait(queue, job_id)
+    assert status['status'] == 'completed' and status['progress'] == 1.0
+    assert status['model_id'] == 'm' and status['error'] is None
+    assert received[0].predict(data[0]).shape == (60,)
+
+
+def test_failed_fit_is_reported(queue, data):
+    X, y = data
+    X = X.copy()
+    X[0, 0] = np.nan
+    status = _wait(queue, queue.submit(LogisticRegression(), X, y))
+    assert status['status'] == 'failed'
+    assert 'NaN' in status['error']
+
+
+def test_failing_completion_marks_the_job_failed(queue, data):
+    def install(model):
+        raise RuntimeError('model store is full')
+
+    status = _wait(queue, queue.submit(LogisticRegression(), *data, on_complete=install))
+    assert status == {**status, 'status': 'failed', 'error': 'model store is full'}
+
+
+def test_cancelled_job_never_completes(queue, data):
+    received = []
+    job_id = queue.submit(LogisticRegression(), *data, on_complete=received.append)
+    assert queue.cancel(job_id) is True
+    assert _wait(queue, job_id)['status'] == 'cancelled'
+    assert received == []
+    assert queue.cancel(job_id) is False
+    with pytest.raises(LookupError):
+        queue.cancel('missing')
+
+
+def test_finished_jobs_are_pruned(queue, data):
+    queue.max_finished = 1
+    first = queue.submit(LogisticRegression(), *data)
+    _wait(queue, first)
+    second = queue.submit(LogisticRegression(), *data)
+    _wait(queue, second)
+    assert [job['job_id'] for job in queue.list_jobs()] == [second]
+    queue.ttl_seconds = 0
+    assert queue.list_jobs() == []
+    with pytest.raises(LookupError):
+        queue.status(second)
+
+
+def test_unknown_job_is_a_404(client):
+    assert client.get('/api/model/jobs/missing').status_code == 404
+    assert client.post('/api/model/jobs/missing/cancel').status_code == 404
@@ -0,0 +1,92 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.transport import ARROW_STREAM_MIMETYPE, NUMPY_BUFFERS_MIMETYPE, to_arrow_stream, to_numpy_buffers
+
+
+def decode_numpy_buffers(body):
+    # Reference reader for the layout written by to_numpy_buffers
+    (length,) = struct.unpack_from('<I', body)
+    header = json.loads(body[4:4 + length])
+    data = body[4 + length:]
+    columns = {}
+    for info in header['columns']:
+        buffers = [data[entry['offset']:entry['offset'] + entry['length']] for entry in info['buffers']]
+        if info['kind'] == 'utf8':
+            offsets = np.frombuffer(buffers[0], dtype='<i8')
+            values = [buffers[1][start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+        else:
+            values = np.frombuffer(buffers[0], dtype=info['dtype']).tolist()
+        if 'validity' in info:
+            entry = info['validity']
+            valid = np.unpackbits(np.frombuffer(data[entry['offset']:entry['offset'] + entry['length']], np.uint8),
+                                  bitorder='little')[:header['rows']]
+            values = [value if flag else None for value, flag in zip(values, valid)]
+        columns[info['name']] = values
+    return header, columns
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'ints': [1, 2, 3],
+        'floats': [0.5, np.nan, 2.0],
+        'nullable': pd.array([1, None, 3], dtype='Int64'),
+        'text': ['a', None, 'ü'],
+        'when': pd.to_datetime(['2024-01-01', None, '2024-01-03'])
+    })
+
+
+def test_numpy_buffers_round_trip(frame):
+    body = to_numpy_buffers(frame, metadata={'total_rows': 3})
+    header, columns = decode_numpy_buffers(body)
+
+    assert header['rows'] == 3
+    assert header['metadata'] == {'total_rows': 3}
+    assert columns['ints'] == [1, 2, 3]
+    assert columns['floats'][0] == 0.5 and columns['floats'][1] is None
+    assert columns['nullable'] == [1, None, 3]
+    assert columns['text'] == ['a', None, 'ü']
+    assert columns['when'][0] == pd.Timestamp('2024-01-01').value and columns['when'][1] is None
+
+
+def test_numpy_buffers_are_aligned(frame):
+    body = to_numpy_buffers(frame)
+    (length,) = struct.unpack_from('<I', body)
+    assert (4 + length) % 8 == 0
+    header = json.loads(body[4:4 + length])
+    for info in header['columns']:
+        for entry in info['buffers']:
+            assert entry['offset'] % 8 == 0
+
+
+def test_arrow_stream_round_trip(frame):
+    pa = pytest.importorskip('pyarrow')
+    table = pa.ipc.open_stream(to_arrow_stream(frame, metadata={'rows': 3})).read_all()
+    assert table.column('text').to_pylist() == ['a', None, 'ü']
+    assert table.column('nullable').to_pylist() == [1, None, 3]
+    assert json.loads(table.schema.metadata[b'mlflow']) == {'rows': 3}
+
+
+def test_json_stays_the_default(client, headers):
+    response = client.get('/api/dataset', headers=headers)
+    assert response.mimetype == 'application/json'
+
+
+def test_dataset_as_numpy_buffers(client, headers):
+    response = client.get('/api/dataset', headers={**headers, 'Accept': NUMPY_BUFFERS_MIMETYPE})
+    assert response.mimetype == NUMPY_BUFFERS_MIMETYPE
+    header, columns = decode_numpy_buffers(response.data)
+    assert header['rows'] == 100
+    assert len(columns['PassengerId']) == 100
+
+
+def test_dataset_as_arrow(client, headers):
+    pa = pytest.importorskip('pyarrow')
+    response = client.get('/api/dataset', headers={**headers, 'Accept': ARROW_STREAM_MIMETYPE})
+    assert response.mimetype == ARROW_STREAM_MIMETYPE
+    assert pa.ipc.open_stream(response.data).read_all().num_rows == 100
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.type_conversion import convert_columns, convert_series, validate_dtype
+
+
+@pytest.mark.parametrize('values, dtype, expected', [
+    (['1', '2', '-3'], 'int64', [1, 2, -3]),
+    (['1.0', '2.0'], 'int64', [1, 2]),
+    ([1.0, 2.0], 'int64', [1, 2]),
+    ([True, False], 'int64', [1, 0]),
+    (['1.5', '2'], 'float64', [1.5, 2.0]),
+    (['yes', 'N', ' true ', '0'], 'bool', [True, False, True, False]),
+    ([0, 2, -1], 'bool', [False, True, True]),
+])
+def test_clean_values_convert_strictly(values, dtype, expected):
+    assert convert_series(pd.Series(values), dtype).tolist() == expected
+
+
+def test_object_floats_are_not_truncated():
+    # Python floats in an object column must not take the astype(int64) fast path
+    with pytest.raises(ValueError, match='non-integer'):
+        convert_series(pd.Series([1.5, 2.0], dtype=object), 'int64')
+    assert convert_series(pd.Series([1.5, -2.7], dtype=object), 'int64', errors='coerce').tolist() == [1, -2]
+    assert convert_series(pd.Series(['1.5', 'x']), 'int64', errors='coerce').tolist() == [1, pd.NA]
+
+
+@pytest.mark.parametrize('values, message', [
+    ([2.0 ** 63, 1.0], 'int64 range'),
+    (['9223372036854775808'], 'int64 range'),
+    ([np.inf], 'infinite'),
+    (['abc', '1'], 'Unable to parse'),
+])
+def test_strict_integer_errors(values, message):
+    with pytest.raises(ValueError, match=message):
+        convert_series(pd.Series(values), 'int64')
+
+
+def test_lenient_integers_become_missing():
+    converted = convert_series(pd.Series([2.0 ** 63, -np.inf, 7.9, None]), 'int64', errors='coerce')
+    assert str(converted.dtype) == 'Int64'
+    assert converted.tolist() == [pd.NA, pd.NA, 7, pd.NA]
+    # Largest values that still fit are kept exactly
+    assert convert_series(pd.Series(['9223372036854775807']), 'int64').tolist() == [2 ** 63 - 1]
+    assert str(convert_series(pd.Series([1, 2]), 'Int64').dtype) == 'Int64'
+
+
+def test_booleans_and_missing_values():
+    with pytest.raises(ValueError, match="'maybe'"):
+        convert_series(pd.Series(['yes', 'maybe']), 'bool')
+    converted = convert_series(pd.Series(['yes', 'maybe', None]), 'bool', errors='coerce')
+    assert str(converted.dtype) == 'boolean' and converted.tolist() == [True, pd.NA, pd.NA]
+    assert str(convert_series(pd.Series([True, False]), 'boolean').dtype) == 'boolean'
+
+
+def test_datetimes_with_one_and_mixed_formats():
+    parsed = convert_series(pd.Series(['2024-01-02', '2024-02-03', None]), 'datetime')
+    assert parsed.tolist()[:2] == [pd.Timestamp('2024-01-02'), pd.Timestamp('2024-02-03')]
+    mixed = convert_series(pd.Series(['2024-01-02', 'March 4, 2024']), 'datetime')
+    assert mixed.tolist() == [pd.Timestamp('2024-01-02'), pd.Timestamp('2024-03-04')]
+    assert convert_series(pd.Series(['2024-01-02', 'soon']), 'datetime', errors='coerce').isna().tolist() == \
+           [False, True]
+    with pytest.raises(ValueError):
+        convert_series(pd.Series(['2024-01-02', 'soon']), 'datetime')
+
+
+def test_strings_keep_missing_values():
+    assert convert_series(pd.Series([1, None, 3.5]), 'str').tolist() == ['1.0', None, '3.5']
+    assert convert_series(pd.Series(['a', 'b']), 'category').dtype == 'category'
+
+
+def test_validation():
+    assert validate_dtype('float32') == 'float32'
+    with pytest.raises(ValueError, match="Unsupported type 'decimal'"):
+        convert_series(pd.Series([1]), 'decimal')
+    with pytest.raises(ValueError, match='Nope'):
+        convert_columns(pd.DataFrame({'a': [1]}), ['a', 'Nope'], 'float64')
+
+
+def test_update_type_endpoints(client, headers):
+    response = client.post('/api/update-type', headers=headers, json={'columns': ['Name'], 'dtype': 'int64'})
+    assert response.status_code == 400 and response.get_json()['error_type'] == 'value_error'
+    response = client.post('/api/update-type', headers=headers, json={'columns': ['SibSp', 'Parch'], 'dtype': 'Int64'})
+    assert response.get_json()['new_types'] == {'SibSp': 'Int64', 'Parch': 'Int64'}
+    # The preprocessing endpoint coerces what does not convert
+    response = client.post('/api/preprocess/update-type', headers=headers, json={'column': 'Cabin', 'dtype': 'float64'})
+    assert response.status_code == 200 and response.get_json()['new_type'] == 'float64'
+    response = client.post('/api/preprocess/update-type', headers=headers, json={'column': 'Nope', 'dtype': 'int64'})
+    assert response.status_code == 400
+    assert client.post('/api/preprocess/update-type', headers=headers, json={'column': 'Age'}).status_code == 400
@@ -0,0 +1,216 @@
+import os
+
+import pytest
+
+import utils.context
+from models.model_registry import ModelRegistry
+from models.workspaces import WorkspaceManager, workspaces
+
+ADMIN = {'X-Admin-Token': 'secret'}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return WorkspaceManager(root=str(tmp_path / 'workspaces'), idle_seconds=0,
+                            models=ModelRegistry(root=str(tmp_path / 'models'), shared=None))
+
+
+@pytest.fixture
+def sessions(app):
+    # Sessions are passed as X-Session-ID, so the test client must not send the cookie it gets back
+    client = app.test_client(use_cookies=False)
+    created = []
+
+    def create():
+        response = client.post('/api/workspaces')
+        assert response.status_code == 201
+        session_id = response.get_json()['session_id']
+        created.append(session_id)
+        return {'X-Session-ID': session_id}
+
+    client.create = create
+    yield client
+    for session_id in created:
+        try:
+            workspaces.remove(session_id)
+        except LookupError:
+            pass
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(utils.context, 'ADMIN_TOKEN', 'secret')
+
+
+def _remove_missing_age(workspace):
+    dataset = workspace.datasets.get()
+    with dataset.writer() as preprocessor:
+        preprocessor.handle_missing_values('Age', 'remove')
+        dataset.commit_preprocessed(preprocessor.df, 'remove Age', None, preprocessor.pipeline.steps)
+
+
+def test_acquire_rejects_invalid_and_unknown_ids(manager):
+    with pytest.raises(ValueError, match='Invalid session id'):
+        manager.acquire('bad')
+    with pytest.raises(LookupError, match='not found'):
+        manager.acquire('0' * 32)
+
+
+def test_workspaces_are_isolated(manager):
+    first, second = manager.create(), manager.create()
+    _remove_missing_age(first)
+    assert len(first.datasets.get().preprocessed_df) == 78
+    assert len(second.datasets.get().preprocessed_df) == 100
+    assert first.datasets is not second.datasets
+
+
+def test_idle_workspace_spills_and_restores(manager):
+    workspace = manager.create()
+    manager.acquire(workspace.workspace_id)
+    _remove_missing_age(workspace)
+    # Busy workspaces are never spilled
+    assert manager.spill_idle() == []
+    manager.release(workspace)
+
+    assert manager.spill_idle() == [workspace.workspace_id]
+    described = manager.describe(workspace.workspace_id)
+    assert described['resident_memory'] == 0 and described['spilled_bytes'] > 0
+
+    restored = manager.acquire(workspace.workspace_id)
+    dataset = restored.datasets.get()
+    assert len(dataset.preprocessed_df) == 78
+    assert [step['kind'] for step in dataset.pipeline.steps] == ['drop_rows']
+    manager.release(restored)
+
+
+def test_spill_releases_model_drafts(manager):
+    from models.ml_models import MLModel
+    ml_model = MLModel()
+    ml_model.get_model('linear', 'regression')
+    workspace = manager.create()
+    model_id = manager.models.register(ml_model)
+    workspace.use_model(model_id)
+
+    assert manager.spill_idle() == [workspace.workspace_id]
+    assert model_id not in manager.models._drafts
+    assert manager.models.draft(model_id).algorithm == 'linear'
+
+
+def test_memory_budget_is_enforced(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path / 'workspaces'), memory_budget=1000)
+    workspace = manager.create()
+    with pytest.raises(MemoryError, match='memory budget of 1000 bytes'):
+        workspace.datasets.get().load_data()
+
+
+def test_max_workspaces(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path / 'workspaces'), idle_seconds=3600, max_workspaces=1)
+    manager.create()
+    with pytest.raises(OverflowError, match='All 1 workspaces are in use'):
+        manager.create()
+
+    # Once idle the oldest workspace makes way and is closed
+    manager.idle_seconds = 0
+    oldest = next(iter(manager._workspaces.values()))
+    manager.create()
+    assert oldest.closed
+    with pytest.raises(LookupError):
+        manager.acquire(oldest.workspace_id)
+
+
+def test_remove_deletes_spill_files(manager):
+    workspace = manager.create()
+    workspace.datasets.get().preprocessed_df
+    manager.spill_idle()
+    assert os.path.isdir(workspace.spill_dir)
+
+    manager.remove(workspace.workspace_id)
+    assert not os.path.exists(workspace.spill_dir)
+    with pytest.raises(LookupError):
+        manager.remove(workspace.workspace_id)
+
+
+def test_create_sets_the_session_cookie(client):
+    response = client.post('/api/workspaces')
+    assert response.status_code == 201
+    session_id = response.get_json()['session_id']
+    try:
+        assert 'mlflow_session=' + session_id in response.headers['Set-Cookie']
+        # The test client sends the cookie back
+        assert client.get(f'/api/workspaces/{session_id}').status_code == 200
+    finally:
+        workspaces.remove(session_id)
+
+
+def test_invalid_and_unknown_sessions(sessions):
+    response = sessions.get('/api/preprocess/shape', headers={'X-Session-ID': 'bad'})
+    assert response.status_code == 400
+    response = sessions.get('/api/preprocess/shape', headers={'X-Session-ID': '0' * 32})
+    assert response.status_code == 404
+    assert 'POST /api/workspaces' in response.get_json()['error']
+    # A stale session can still create a new one
+    assert sessions.post('/api/workspaces', headers={'X-Session-ID': '0' * 32}).status_code == 201
+
+
+def test_sessions_do_not_see_each_other(sessions):
+    first, second = sessions.create(), sessions.create()
+    response = sessions.post('/api/preprocess/handle-missing-values', headers=first,
+                             json={'column': 'Age', 'method': 'remove'})
+    assert response.status_code == 200
+
+    assert sessions.get('/api/preprocess/shape', headers=first).get_json()['rows'] == 78
+    assert sessions.get('/api/preprocess/shape', headers=second).get_json()['rows'] == 100
+    assert sessions.get('/api/preprocess/shape').get_json()['rows'] == 100
+
+    first_id, second_id = first['X-Session-ID'], second['X-Session-ID']
+    assert sessions.get(f'/api/workspaces/{second_id}', headers=first).status_code == 404
+    assert sessions.delete(f'/api/workspaces/{second_id}', headers=first).status_code == 404
+    assert sessions.get(f'/api/workspaces/{first_id}').status_code == 404
+
+
+def test_session_models(sessions):
+    first, second = sessions.create(), sessions.create()
+    response = sessions.post('/api/model/init', headers=first,
+                             json={'algorithm': 'linear', 'model_type': 'regression'})
+    model_id = response.get_json()['model_id']
+
+    described = sessions.get(f"/api/workspaces/{first['X-Session-ID']}", headers=first).get_json()
+    assert described['model_id'] == model_id and described['model_ids'] == [model_id]
+    described = sessions.get(f"/api/workspaces/{second['X-Session-ID']}", headers=second).get_json()
+    assert described['model_id'] is None
+
+
+def test_remove_own_workspace(sessions):
+    session = sessions.create()
+    session_id = session['X-Session-ID']
+    response = sessions.delete(f'/api/workspaces/{session_id}', headers=session)
+    assert response.status_code == 200
+    assert sessions.get('/api/preprocess/shape', headers=session).status_code == 404
+
+
+def test_admin_endpoints_need_the_token(sessions, admin):
+    session = sessions.create()
+    assert sessions.get('/api/workspaces', headers=session).status_code == 403
+    assert sessions.post('/api/workspaces/spill-idle').status_code == 403
+    assert sessions.get('/api/workspaces', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    listed = sessions.get('/api/workspaces', headers=ADMIN).get_json()
+    assert session['X-Session-ID'] in [entry['workspace_id'] for entry in listed['workspaces']]
+    assert sessions.get(f"/api/workspaces/{session['X-Session-ID']}", headers=ADMIN).status_code == 200
+
+
+def test_admin_spills_idle_sessions(sessions, admin, monkeypatch):
+    session = sessions.create()
+    session_id = session['X-Session-ID']
+    sessions.post('/api/preprocess/handle-missing-values', headers=session, json={'column': 'Age', 'method': 'remove'})
+    monkeypatch.setattr(workspaces, 'idle_seconds', 0)
+
+    response = sessions.post('/api/workspaces/spill-idle', headers=ADMIN)
+    assert response.status_code == 200 and session_id in response.get_json()['spilled']
+    assert workspaces.describe(session_id)['resident_memory'] == 0
+    assert sessions.get('/api/preprocess/shape', headers=session).get_json()['rows'] == 78
+
+
+def test_token_unset_disables_admin_endpoints(sessions, monkeypatch):
+    monkeypatch.setattr(utils.context, 'ADMIN_TOKEN', None)
+    assert sessions.get('/api/workspaces', headers=ADMIN).status_code == 403
@@ -0,0 +1,86 @@
+import hmac
+import os
+
+from flask import abort, g, jsonify, make_response, request
+from models.dataset_registry import DEFAULT_DATASET_ID, dataset_registry
+from models.lazy_plan import parse_bool
+from models.workspaces import workspaces
+
+SESSION_COOKIE = 'mlflow_session'
+# Listing, sweeping and other operator endpoints need this token in X-Admin-Token, unset disables them
+ADMIN_TOKEN = os.environ.get('MLFLOW_ADMIN_TOKEN')
+# Endpoints that work without a valid session, so a client with a stale cookie can still get a new one
+SESSIONLESS_ENDPOINTS = ('api.create_workspace',)
+
+
+def dataset_id_from_request():
+    dataset_id = request.args.get('dataset_id') or request.headers.get('X-Dataset-ID')
+    if not dataset_id and request.is_json:
+        dataset_id = (request.get_json(silent=True) or {}).get('dataset_id')
+    return dataset_id or DEFAULT_DATASET_ID
+
+
+def flag(data, name, default):
+    # Boolean request option, raises ValueError for anything but a boolean, 0/1 or a true/false string
+    try:
+        return parse_bool(data.get(name, default))
+    except ValueError:
+        raise ValueError(f"'{name}' must be true or false")
+
+
+def session_id_from_request():
+    return request.headers.get('X-Session-ID') or request.args.get('session_id') or request.cookies.get(SESSION_COOKIE)
+
+
+def is_admin_request():
+    token = request.headers.get('X-Admin-Token')
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def open_workspace():
+    # Resolved once before the request, an invalid or unknown session never reaches a controller
+    session_id = session_id_from_request()
+    if not session_id or request.endpoint in SESSIONLESS_ENDPOINTS:
+        return None
+    try:
+        g.workspace = workspaces.acquire(session_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    return None
+
+
+def current_workspace():
+    # Requests without a session keep using the process-wide registry and model
+    return g.get('workspace')
+
+
+def current_registry():
+    workspace = current_workspace()
+    return workspace.datasets if workspace is not None else dataset_registry
+
+
+def current_dataset():
+    # Held until the request ends so the registry does not spill it while the request still writes to it
+    registry = current_registry()
+    dataset_id = dataset_id_from_request()
+    held = g.setdefault('held_datasets', {})
+    key = (id(registry), dataset_id)
+    if key not in held:
+        try:
+            dataset = registry.acquire(dataset_id)
+        except LookupError as e:
+            # Routes resolve the dataset before their own try blocks, so an unknown id is answered here
+            abort(make_response(jsonify({'error': str(e)}), 404))
+        held[key] = (registry, dataset_id, dataset)
+    return held[key][2]
+
+
+def release_request(exception=None):
+    for registry, dataset_id, _ in g.pop('held_datasets', {}).values():
+        registry.release(dataset_id)
+    # The workspace goes last, releasing it lets the idle sweep spill it again
+    workspace = g.pop('workspace', None)
+    if workspace is not None:
+        workspaces.release(workspace)
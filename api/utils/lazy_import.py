@@ -0,0 +1,18 @@
+import importlib
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def import_object(path):
+    # 'package.module:Attribute' -> Attribute, imported on first use only
+    module_name, _, attribute = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+@lru_cache(maxsize=None)
+def optional_module(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
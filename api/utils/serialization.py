@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+
+def column_to_list(series):
+    # Convert a whole column to JSON-safe Python values in one pass, missing -> None
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(
+            dtype, (pd.CategoricalDtype, pd.DatetimeTZDtype)):
+        # Nullable Int/Float/boolean/string columns box natively with pd.NA -> None
+        return series.to_numpy(dtype=object, na_value=None).tolist()
+
+    if dtype.kind in 'iub':
+        return series.to_numpy().tolist()
+
+    if dtype.kind == 'f':
+        values = series.to_numpy()
+        mask = np.isnan(values)
+        if not mask.any():
+            return values.tolist()
+        values = values.astype(object)
+        values[mask] = None
+        return values.tolist()
+
+    values = series.to_numpy(dtype=object)
+    mask = pd.isna(values)
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+    if dtype.kind == 'O':
+        # Object columns can still hold stray NumPy scalars
+        return [value.item() if isinstance(value, np.generic) else value for value in values]
+    return values.tolist()
+
+
+def prepare_records(df):
+    names = [str(column) for column in df.columns]
+    columns = [column_to_list(df.iloc[:, position]) for position in range(df.shape[1])]
+    return [dict(zip(names, row)) for row in zip(*columns)]
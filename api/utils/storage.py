@@ -0,0 +1,14 @@
+import os
+import stat
+import tempfile
+
+
+def private_directory(path=None, prefix='mlflow-'):
+    # Spilled and shared files are read back with pickle and joblib, so nobody else may write to them
+    if path is None:
+        return tempfile.mkdtemp(prefix=prefix)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"'{path}' must be a directory owned by this user and not writable by others")
+    return path
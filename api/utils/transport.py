@@ -0,0 +1,127 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+from flask import Response, request
+from utils.lazy_import import optional_module
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+NUMPY_BUFFERS_MIMETYPE = 'application/vnd.mlflow.numpy-buffers'
+
+# Buffers are padded so every column starts on an 8 byte boundary
+_ALIGNMENT = 8
+
+
+def _supported_mimetypes(accepted):
+    # pyarrow is optional and only imported once a client asks for Arrow data
+    mimetypes = [NUMPY_BUFFERS_MIMETYPE]
+    if ARROW_STREAM_MIMETYPE in accepted and optional_module('pyarrow') is not None:
+        mimetypes.append(ARROW_STREAM_MIMETYPE)
+    return mimetypes
+
+
+def negotiate_columnar_mimetype():
+    # Only explicit requests get a binary body, */* keeps the JSON default
+    accepted = [(mimetype, quality) for mimetype, quality in request.accept_mimetypes if quality > 0]
+    supported = _supported_mimetypes({mimetype for mimetype, _ in accepted})
+    requested = [(quality, mimetype) for mimetype, quality in accepted if mimetype in supported]
+    if not requested:
+        return None
+    return max(requested, key=lambda item: item[0])[1]
+
+
+def _arrow_table(df):
+    pa = optional_module('pyarrow')
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns cannot be inferred, send them as strings
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def to_arrow_stream(df, metadata=None):
+    pa = optional_module('pyarrow')
+    table = _arrow_table(df)
+    if metadata:
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[b'mlflow'] = json.dumps(metadata).encode('utf-8')
+        table = table.replace_schema_metadata(schema_metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _column_buffers(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+
+    mask = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            # Nullable Int/Float/boolean columns: fill the holes, send a validity mask
+            values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+        else:
+            values = series.to_numpy()
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        return {'kind': 'numeric', 'dtype': values.dtype.str}, [values.tobytes()], mask
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype='datetime64[ns]').view('<i8')
+        return {'kind': 'datetime', 'dtype': '<i8', 'unit': 'ns'}, [values.tobytes()], mask
+
+    encoded = [b'' if missing else str(value).encode('utf-8')
+               for value, missing in zip(series.to_numpy(), mask)]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {'kind': 'utf8', 'dtype': '<i8'}, [offsets.tobytes(), b''.join(encoded)], mask
+
+
+def to_numpy_buffers(df, metadata=None):
+    # Layout: <uint32 header length><JSON header><aligned column buffers>
+    columns = []
+    chunks = []
+    offset = 0
+
+    def append(buffer):
+        nonlocal offset
+        start = offset
+        chunks.append(buffer)
+        offset += len(buffer)
+        padding = -offset % _ALIGNMENT
+        if padding:
+            chunks.append(b'\x00' * padding)
+            offset += padding
+        return {'offset': start, 'length': len(buffer)}
+
+    for name in df.columns:
+        info, buffers, mask = _column_buffers(df[name])
+        info['name'] = str(name)
+        info['buffers'] = [append(buffer) for buffer in buffers]
+        if mask.any():
+            info['validity'] = append(np.packbits(~mask, bitorder='little').tobytes())
+        columns.append(info)
+
+    header = json.dumps({
+        'rows': int(len(df)),
+        'columns': columns,
+        'metadata': metadata or {}
+    }).encode('utf-8')
+    header += b' ' * (-(len(header) + 4) % _ALIGNMENT)
+    return struct.pack('<I', len(header)) + header + b''.join(chunks)
+
+
+def columnar_response(df, metadata=None):
+    mimetype = negotiate_columnar_mimetype()
+    if mimetype is None:
+        return None
+    if mimetype == ARROW_STREAM_MIMETYPE:
+        body = to_arrow_stream(df, metadata)
+    else:
+        body = to_numpy_buffers(df, metadata)
+    return Response(body, status=200, mimetype=mimetype)